@@ -0,0 +1,153 @@
+"""
+Restaurant recommendation API used by ``templates/index.html``.
+
+    uvicorn api:app --host 0.0.0.0 --port 8000 --workers 2
+
+One ``AsyncVectorStore`` (Motor + async Gemini client, with embedding and
+response caches) is created per worker process at startup and shared by all
+requests.  Endpoints:
+
+* ``POST /token``                 – OAuth2 password flow, returns a bearer JWT
+* ``GET  /api/recommend``         – ``?query=...&limit=3``
+* ``POST /api/recommend/batch``   – many queries in one request, optionally
+  streamed as NDJSON (one line per query, in completion order)
+"""
+import json
+import logging
+import secrets
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, status
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from jose import JWTError, jwt
+from pydantic import BaseModel, Field
+
+from config import settings
+from services.telemetry import REGISTRY, metrics_allowed, parse_networks, span
+from services.vector_store import AsyncVectorStore, public_response
+
+logger = logging.getLogger(__name__)
+
+ALGORITHM = "HS256"
+
+# Anyone could mint tokens with the placeholder secret or log in as admin/admin
+_insecure = settings.insecure_defaults()
+if _insecure and not settings.DEBUG:
+    raise RuntimeError(f"Set {' and '.join(_insecure)} before starting the recommendation API "
+                       f"(the defaults are only allowed with DEBUG=true)")
+if _insecure:
+    logger.warning("Recommendation API running with default %s (DEBUG only)", " and ".join(_insecure))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.store = AsyncVectorStore()
+    logger.info("Recommendation API ready (collection %s.%s)", settings.DB_NAME, settings.COLLECTION_NAME)
+    yield
+    app.state.store.close()
+
+
+app = FastAPI(title="TrendWave Recommendations", lifespan=lifespan)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=[o.strip() for o in settings.API_CORS_ORIGINS.split(",") if o.strip()],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Authorization", "Content-Type"],
+)
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+
+
+# -----------------------------------------------------------------------------
+#  Auth
+# -----------------------------------------------------------------------------
+
+def create_access_token(username: str) -> str:
+    expires = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return jwt.encode({"sub": username, "exp": expires}, settings.SECRET_KEY, algorithm=ALGORITHM)
+
+
+def current_username(token: str = Depends(oauth2_scheme)) -> str:
+    try:
+        username = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        username = None
+    if not username:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail="Invalid or expired token",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return username
+
+
+@app.post("/token")
+async def login(form: OAuth2PasswordRequestForm = Depends()):
+    # Constant-time comparisons; check both so timing does not reveal which was wrong
+    user_ok = secrets.compare_digest(form.username.encode(), settings.API_USERNAME.encode())
+    password_ok = secrets.compare_digest(form.password.encode(), settings.API_PASSWORD.encode())
+    if not (user_ok and password_ok):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail="Incorrect username or password",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return {"access_token": create_access_token(form.username), "token_type": "bearer"}
+
+
+# -----------------------------------------------------------------------------
+#  Recommendations
+# -----------------------------------------------------------------------------
+
+@app.get("/api/recommend")
+async def recommend(query: str = Query(..., min_length=1, max_length=500),
+                    limit: int = Query(3, ge=1, le=20),
+                    _user: str = Depends(current_username)):
+    with span("recommend"):
+        response = await app.state.store.get_recommendations(query, limit)
+    return public_response(response)
+
+
+class BatchRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1)
+    limit: int = Field(3, ge=1, le=20)
+    generate: bool = True
+    concurrency: int = Field(8, ge=1, le=64)
+    stream: bool = False
+
+
+@app.post("/api/recommend/batch")
+async def recommend_batch(body: BatchRequest, _user: str = Depends(current_username)):
+    if len(body.queries) > settings.RECOMMEND_BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"At most {settings.RECOMMEND_BATCH_MAX_QUERIES} queries per batch")
+    store = app.state.store
+    if body.stream:
+        async def lines():
+            async for item in store.iter_recommendations_batch(
+                    body.queries, body.limit, body.generate, body.concurrency):
+                yield json.dumps(public_response(item)) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    with span("recommend_batch"):
+        responses = await store.get_recommendations_batch(
+            body.queries, body.limit, body.generate, body.concurrency)
+    return {"results": [public_response(r) for r in responses]}
+
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok", "ts": datetime.utcnow().isoformat()}
+
+
+_metrics_networks = parse_networks(settings.METRICS_ALLOW_NETWORKS)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics(request: Request):
+    client = request.client.host if request.client else None
+    if not metrics_allowed(client, request.headers.get("Authorization"),
+                           settings.METRICS_TOKEN, _metrics_networks):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
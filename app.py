@@ -2,14 +2,11 @@ import os
 import logging
 from datetime import datetime
 
-from flask import Flask, jsonify, redirect, url_for, current_app
+from flask import Flask, Response, abort, flash, jsonify, redirect, render_template, request, url_for, current_app
 from flask_cors import CORS
-from flask_login import LoginManager, current_user
+from flask_login import LoginManager, current_user, login_required
 from dotenv import load_dotenv
 
-# ▶︎ NEW Google GenAI SDK import (correct)
-import google.genai as genai
-
 # ---------------------------------------------------------------------------- #
 #  Environment & constants
 # ---------------------------------------------------------------------------- #
@@ -24,10 +21,7 @@ EMBED_MODEL   = "gemini-embedding-001"       # 768‑dim embedding model
 if not GENAI_API_KEY:
     raise RuntimeError("⚠️  GEMINI_API_KEY environment variable is missing!")
 
-# Configure the client once
-client = genai.Client(
-    vertexai=True, project=PROJECT_ID, location='us-central1'
-)
+# The GenAI client itself is created lazily in routes/chat.py (get_genai_client)
 
 # ---------------------------------------------------------------------------- #
 #  Flask factory
@@ -36,8 +30,11 @@ login_manager = LoginManager()
 
 from extensions import mongo_col
 from models.user import User
+from routes.admin import admin_bp
 from routes.auth import auth_bp
 from routes.chat import chat_bp
+from services import query_log, telemetry, warmup
+from services.domains import DOMAINS
 
 
 def create_app() -> Flask:
@@ -51,6 +48,57 @@ def create_app() -> Flask:
         SESSION_COOKIE_SAMESITE="Lax",
         TEXT_MODEL=TEXT_MODEL,
         EMBED_MODEL=EMBED_MODEL,
+        # Query embeddings from concurrent requests are batched for up to this
+        # long (0 disables batching) or until the batch is full.
+        EMBED_BATCH_WINDOW_MS=float(os.getenv("EMBED_BATCH_WINDOW_MS", "10")),
+        EMBED_BATCH_MAX_SIZE=int(os.getenv("EMBED_BATCH_MAX_SIZE", "32")),
+        # Latency budgets (seconds): the whole chat request, and caps per stage
+        REQUEST_DEADLINE_S=float(os.getenv("REQUEST_DEADLINE_S", "30")),
+        HISTORY_TIMEOUT_S=float(os.getenv("HISTORY_TIMEOUT_S", "1.5")),
+        # Saving history still gets this long once the request deadline is spent
+        HISTORY_WRITE_MIN_S=float(os.getenv("HISTORY_WRITE_MIN_S", "0.5")),
+        EMBED_TIMEOUT_S=float(os.getenv("EMBED_TIMEOUT_S", "5")),
+        SEARCH_TIMEOUT_S=float(os.getenv("SEARCH_TIMEOUT_S", "5")),
+        # Structured follow-ups answered from cached candidates: on | off | compare
+        # ("compare" still answers with the LLM but logs the template's savings)
+        FAST_ANSWERS=os.getenv("FAST_ANSWERS", "on").lower(),
+        # Extra Vertex regions to hedge slow query embeds into, e.g. "us-east4,europe-west4"
+        GENAI_HEDGE_LOCATIONS=[l.strip() for l in os.getenv("GENAI_HEDGE_LOCATIONS", "").split(",") if l.strip()],
+        # Restaurants handed to the model per search, and how many are fetched
+        # for reranking (0 disables it); diversity trades relevance for variety (0-1)
+        SEARCH_RESULT_LIMIT=int(os.getenv("SEARCH_RESULT_LIMIT", "4")),
+        RERANK_CANDIDATES=int(os.getenv("RERANK_CANDIDATES", "20")),
+        RERANK_DIVERSITY=float(os.getenv("RERANK_DIVERSITY", "0.3")),
+        # "Near me" queries: search radius, weight of proximity vs. similarity,
+        # and the most nearby restaurants handed to $vectorSearch as a filter
+        GEO_RADIUS_KM=float(os.getenv("GEO_RADIUS_KM", "2")),
+        GEO_WEIGHT=float(os.getenv("GEO_WEIGHT", "0.3")),
+        GEO_MAX_CANDIDATES=int(os.getenv("GEO_MAX_CANDIDATES", "500")),
+        # Memory allowed for in-memory indexes of loaded domain partitions
+        DOMAIN_PARTITION_BUDGET_MB=float(os.getenv("DOMAIN_PARTITION_BUDGET_MB", "256")),
+        # Answers to identical searches are reused for this long (0 disables)
+        RESPONSE_CACHE_TTL_S=float(os.getenv("RESPONSE_CACHE_TTL_S", "600")),
+        RESPONSE_CACHE_SIZE=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")),
+        # Scrubbed query log (unset disables it), rotated by size
+        QUERY_LOG_PATH=os.getenv("QUERY_LOG_PATH", ""),
+        QUERY_LOG_MAX_MB=float(os.getenv("QUERY_LOG_MAX_MB", "10")),
+        QUERY_LOG_BACKUPS=int(os.getenv("QUERY_LOG_BACKUPS", "5")),
+        # Startup cache warm-up from the query log: top queries replayed, time
+        # budget, whether answers are generated too, and queries in flight
+        WARMUP_QUERIES=int(os.getenv("WARMUP_QUERIES", "50")),
+        WARMUP_BUDGET_S=float(os.getenv("WARMUP_BUDGET_S", "30")),
+        WARMUP_GENERATE=os.getenv("WARMUP_GENERATE", "true").lower() in ("1", "true", "yes", "on"),
+        WARMUP_CONCURRENCY=int(os.getenv("WARMUP_CONCURRENCY", "4")),
+        # /admin diagnostics (profiler, allocations, cache sizes): off unless
+        # enabled, and only for these signed-in users
+        ADMIN_ENDPOINTS=os.getenv("ADMIN_ENDPOINTS", "false").lower() in ("1", "true", "yes", "on"),
+        ADMIN_EMAILS={e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()},
+        ADMIN_PROFILE_MAX_S=float(os.getenv("ADMIN_PROFILE_MAX_S", "60")),
+        # /metrics is served to this bearer token or these source networks only
+        METRICS_TOKEN=os.getenv("METRICS_TOKEN", ""),
+        METRICS_ALLOW_NETWORKS=telemetry.parse_networks(os.getenv("METRICS_ALLOW_NETWORKS", "127.0.0.1/32,::1/128")),
+        # Chat sessions untouched this long are deleted by the Firestore TTL policy
+        CHAT_SESSION_TTL_DAYS=float(os.getenv("CHAT_SESSION_TTL_DAYS", "90")),
     )
 
     # Logging & CORS
@@ -58,6 +106,12 @@ def create_app() -> Flask:
                         format="%(asctime)s %(levelname)s — %(message)s")
     CORS(app, supports_credentials=True)
 
+    # Request IDs, latency histograms and in-flight tracking
+    telemetry.init_app(app)
+    # Query log and the `flask warm-cache` command
+    query_log.init_app(app)
+    warmup.init_app(app)
+
     # Flask‑Login setup
     login_manager.init_app(app)
     login_manager.login_view = "auth.login"
@@ -69,6 +123,7 @@ def create_app() -> Flask:
     # Blueprints
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(chat_bp, url_prefix="/")
+    app.register_blueprint(admin_bp, url_prefix="/admin")
 
     @app.route("/")
     def index():
@@ -76,10 +131,31 @@ def create_app() -> Flask:
             return redirect(url_for("chat.chat"))
         return redirect(url_for("auth.login"))
 
+    @app.route("/select-domain", methods=["GET", "POST"])
+    @login_required
+    def select_domain():
+        if request.method == "POST":
+            domain = request.form.get("domain")
+            if domain not in DOMAINS:
+                flash("Please choose one of the listed domains.", "error")
+            elif current_user.set_domain(domain):
+                return redirect(url_for("chat.chat"))
+            else:
+                flash("Could not save your selection, please try again.", "error")
+        return render_template("select_domain.html", current_domain=current_user.domain)
+
     @app.route("/healthz")
     def healthz():
         return jsonify({"status": "ok", "ts": datetime.utcnow().isoformat()})
 
+    @app.route("/metrics")
+    def metrics():
+        if not telemetry.metrics_allowed(request.remote_addr, request.headers.get("Authorization"),
+                                         app.config["METRICS_TOKEN"], app.config["METRICS_ALLOW_NETWORKS"]):
+            abort(403)
+        return Response(telemetry.REGISTRY.render(),
+                        mimetype="text/plain; version=0.0.4")
+
     app.logger.info("Mongo collection attached: %s", mongo_col is not None)
     app.logger.info("Gemini text model: %s | embed model: %s", TEXT_MODEL, EMBED_MODEL)
 
@@ -0,0 +1,66 @@
+"""
+Recommendations for a file of queries, written as NDJSON.
+
+    # One query per line in queries.txt; skip Gemini, results only
+    python batch_recommend.py queries.txt --limit 5 --no-generate --out recs.ndjson
+
+    # With recommendations, 16 generations in flight
+    cat queries.txt | python batch_recommend.py - --concurrency 16
+
+Queries are embedded in batched calls and scored against the whole restaurant
+embedding matrix with one matrix product per batch (see
+``AsyncVectorStore.iter_recommendations_batch``), so no per-query
+``$vectorSearch`` round trips are made.  Lines are written as each query
+completes; every line carries the ``index`` of its query in the input.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+
+from services.vector_store import AsyncVectorStore, public_response
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s",
+                    stream=sys.stderr)
+logger = logging.getLogger(__name__)
+
+
+def read_queries(path):
+    fh = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    with fh:
+        return [line.strip() for line in fh if line.strip()]
+
+
+async def run(args):
+    queries = read_queries(args.queries)
+    out = sys.stdout if args.out in (None, "-") else open(args.out, "w", encoding="utf-8")
+    store = AsyncVectorStore()
+    started = time.perf_counter()
+    count = 0
+    try:
+        async for item in store.iter_recommendations_batch(
+                queries, args.limit, generate=not args.no_generate, concurrency=args.concurrency):
+            out.write(json.dumps(public_response(item)) + "\n")
+            out.flush()
+            count += 1
+    finally:
+        store.close()
+        if out is not sys.stdout:
+            out.close()
+    logger.info("Wrote recommendations for %d queries in %.1fs", count, time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch restaurant recommendations as NDJSON")
+    parser.add_argument("queries", help="file with one query per line, or - for stdin")
+    parser.add_argument("--limit", type=int, default=3, help="restaurants per query")
+    parser.add_argument("--no-generate", action="store_true", help="skip the Gemini recommendation text")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent Gemini generations")
+    parser.add_argument("--out", help="output file (default stdout)")
+    asyncio.run(run(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Offline load test for ``POST /api/chat``.
+
+Runs the real Flask app in-process against the local stand-ins from
+``benchmarks.fakes`` and drives it with concurrent simulated users, then
+reports end-to-end and per-stage latency percentiles plus throughput.
+
+    python -m benchmarks.chat_load --users 32 --requests 20 --generate-ms 900
+
+Pass ``--firestore-emulator`` to keep the real Firestore client pointed at
+``FIRESTORE_EMULATOR_HOST`` instead of the in-memory fake.
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+QUERIES = [
+    "cheap pizza in Brooklyn",
+    "romantic italian dinner",
+    "sushi with outdoor seating",
+    "dog friendly cafe in Manhattan",
+    "best thai food",
+    "vegan brunch",
+    "korean bbq in Queens",
+    "family friendly burgers",
+    "pizza near me",
+    "closest sushi place",
+]
+FOLLOW_UPS = [
+    "what is the address?",
+    "how expensive is it?",
+    "what is the rating?",
+    "is it good for kids?",
+]
+
+
+def _prepare_env(use_emulator: bool):
+    """Make app/extensions importable without any real credentials."""
+    os.environ.setdefault("GEMINI_API_KEY", "bench")
+    os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "trendwave-bench")
+    os.environ["MONGODB_ATLAS_URI"] = ""
+    if not use_emulator:
+        # Lets firestore.Client() start with anonymous credentials; the fake
+        # replaces it before any request is served.
+        os.environ.setdefault("FIRESTORE_EMULATOR_HOST", "localhost:8681")
+
+
+def build_app(args):
+    _prepare_env(args.firestore_emulator)
+
+    from benchmarks.fakes import FakeCollection, FakeFirestore, FakeGenAIClient, synthetic_restaurants
+    import models.user as user_module
+    import routes.chat as chat_module
+    from app import create_app
+    from flask import g
+
+    genai_client = FakeGenAIClient(embed_ms=args.embed_ms, generate_ms=args.generate_ms,
+                                   jitter=args.jitter, dim=args.dim, seed=args.seed)
+    collection = FakeCollection(synthetic_restaurants(args.restaurants, dim=args.dim, seed=args.seed))
+
+    chat_module._client = genai_client
+    chat_module.mongo_col = collection
+    if not args.firestore_emulator:
+        store = FakeFirestore(read_ms=args.firestore_ms, write_ms=args.firestore_ms)
+        chat_module.db = store
+        user_module.db = store
+
+    app = create_app()
+    app.config["SESSION_COOKIE_SECURE"] = False  # test client talks plain HTTP
+
+    stage_samples = defaultdict(list)
+    samples_lock = threading.Lock()
+
+    @app.after_request
+    def _collect_stage_timings(response):
+        timings = g.get("stage_timings") or {}
+        with samples_lock:
+            for stage, secs in timings.items():
+                stage_samples[stage].append(secs)
+        return response
+
+    return app, genai_client, stage_samples
+
+
+def _percentiles(values):
+    if not values:
+        return {"count": 0}
+    arr = np.asarray(values) * 1000.0
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {"count": len(values), "mean_ms": round(float(arr.mean()), 2),
+            "p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2)}
+
+
+def run(args):
+    from flask_login import FlaskLoginClient
+
+    app, genai_client, stage_samples = build_app(args)
+    from models.user import User
+    app.test_client_class = FlaskLoginClient
+
+    users = [User.create(f"bench{i}@example.com", "bench-password") for i in range(args.users)]
+    latencies, errors = [], []
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(args.users)
+
+    def simulate(user, seed):
+        rng = random.Random(seed)
+        client = app.test_client(user=user)
+        # Somewhere inside the synthetic catalog's bounding box
+        location = {"lat": 40.72 + rng.uniform(-0.1, 0.1), "lng": -74.0 + rng.uniform(-0.1, 0.1)}
+        start_barrier.wait()
+        for i in range(args.requests):
+            msg = rng.choice(FOLLOW_UPS) if i and rng.random() < args.follow_up_ratio else rng.choice(QUERIES)
+            t0 = time.perf_counter()
+            resp = client.post("/api/chat", json={"message": msg, "location": location})
+            elapsed = time.perf_counter() - t0
+            with lock:
+                latencies.append(elapsed)
+                if resp.status_code != 200:
+                    errors.append(resp.status_code)
+            if args.think_ms:
+                time.sleep(rng.expovariate(1000.0 / args.think_ms))
+
+    threads = [threading.Thread(target=simulate, args=(u, args.seed + i)) for i, u in enumerate(users)]
+    wall = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - wall
+
+    return {
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "requests": len(latencies),
+        "errors": len(errors),
+        "wall_s": round(wall, 3),
+        "rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "latency": _percentiles(latencies),
+        "stages": {stage: _percentiles(v) for stage, v in sorted(stage_samples.items())},
+        "upstream_calls": {"embed": genai_client.embed_calls,
+                           "generate": genai_client.generate_calls},
+    }
+
+
+def _print_report(report):
+    print(f"{report['requests']} requests, {report['errors']} errors, "
+          f"{report['rps']} req/s over {report['wall_s']}s")
+    print(f"upstream calls: {report['upstream_calls']}")
+    print(f"{'stage':<16}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+    rows = [("total", report["latency"])] + list(report["stages"].items())
+    for name, st in rows:
+        if st.get("count"):
+            print(f"{name:<16}{st['count']:>8}{st['p50_ms']:>10.1f}{st['p95_ms']:>10.1f}{st['p99_ms']:>10.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=16, help="concurrent simulated users")
+    parser.add_argument("--requests", type=int, default=10, help="messages per user")
+    parser.add_argument("--follow-up-ratio", type=float, default=0.4)
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause between messages")
+    parser.add_argument("--restaurants", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=3072)
+    parser.add_argument("--embed-ms", type=float, default=80)
+    parser.add_argument("--generate-ms", type=float, default=900)
+    parser.add_argument("--firestore-ms", type=float, default=15)
+    parser.add_argument("--jitter", type=float, default=0.3, help="lognormal sigma of upstream latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--firestore-emulator", action="store_true")
+    parser.add_argument("--out", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    _print_report(report)
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
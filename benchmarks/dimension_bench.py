@@ -0,0 +1,102 @@
+"""
+Recall/memory trade-off of reduced embedding dimensionality.
+
+Truncates a full 3072-d corpus to each candidate size with
+``services.embeddings.truncate_normalize`` semantics, then reports recall@k of
+exact search at that size against exact search at full size, query latency and
+the vector memory per document and for the whole index.
+
+    python -m benchmarks.dimension_bench --n 5000 --dims 3072 1536 768 256 --out dims.json
+
+Synthetic vectors decay in per-component variance the way Matryoshka-trained
+embeddings do, so the numbers are indicative only; for a real answer dump the
+stored vectors (``--load embeddings.npy``) and benchmark those.
+"""
+import argparse
+import json
+import platform
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.vector_search_bench import recall_at_k
+from services.embeddings import FULL_DIM
+from services.local_index import ExactIndex, normalize
+
+
+def matryoshka_embeddings(n: int, dim: int, clusters: int = 64, decay: float = 0.002, seed: int = 0):
+    """Clustered unit vectors whose signal is concentrated in the leading components."""
+    rng = np.random.default_rng(seed)
+    scale = np.exp(-decay * np.arange(dim, dtype=np.float32)).astype(np.float32)
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32) * scale
+    labels = rng.integers(0, clusters, size=n)
+    noise = rng.standard_normal((n, dim), dtype=np.float32) * scale * 0.6
+    return normalize(centers[labels] + noise)
+
+
+def _queries(data: np.ndarray, n: int, noise: float = 0.3, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    picks = data[rng.integers(0, len(data), size=n)]
+    return normalize(picks + rng.standard_normal(picks.shape, dtype=np.float32) * noise / np.sqrt(data.shape[1]))
+
+
+def bench_dims(data, queries, dims, k):
+    ids = list(range(len(data)))
+    truth = ExactIndex().build(ids, data).search_batch(queries, k)
+    rows = []
+    for dim in dims:
+        dim = min(dim, data.shape[1])
+        index = ExactIndex().build(ids, data[:, :dim])
+        reduced = normalize(queries[:, :dim])
+        lat = []
+        found = []
+        for q in reduced:
+            t0 = time.perf_counter()
+            found.append(index.search(q, k))
+            lat.append(time.perf_counter() - t0)
+        lat = np.asarray(lat) * 1000.0
+        row = {
+            "dim": dim,
+            "bytes_per_vector_f32": dim * 4,
+            "bytes_per_vector_bson": dim * 8,   # Atlas stores doubles unless quantised
+            "index_mb": index.nbytes / 2 ** 20,
+            "p50_ms": float(np.percentile(lat, 50)),
+            "p95_ms": float(np.percentile(lat, 95)),
+            f"recall@{k}": recall_at_k(truth, found, k),
+        }
+        rows.append(row)
+        print(f"{dim:>6}{row['bytes_per_vector_f32']:>12,}{row['index_mb']:>11.1f}"
+              f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row[f'recall@{k}']:>9.3f}")
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--n", type=int, default=5000, help="corpus size")
+    parser.add_argument("--dims", type=int, nargs="+", default=[FULL_DIM, 1536, 768, 256, 128])
+    parser.add_argument("--load", help="benchmark full-size embeddings from this .npy file")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    if args.load:
+        data = normalize(np.load(args.load).astype(np.float32))
+    else:
+        data = matryoshka_embeddings(args.n, FULL_DIM, seed=args.seed)
+    queries = _queries(data, args.queries, seed=args.seed + 1)
+
+    print(f"{'dim':>6}{'bytes/vec':>12}{'index MB':>11}{'p50 ms':>10}{'p95 ms':>10}{'recall':>9}")
+    rows = bench_dims(data, queries, args.dims, args.k)
+
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump({"timestamp": datetime.utcnow().isoformat(), "host": platform.node(),
+                       "n": len(data), "k": args.k, "source": args.load or "synthetic",
+                       "results": rows}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
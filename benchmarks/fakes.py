@@ -0,0 +1,485 @@
+"""
+Local stand-ins for Gemini, MongoDB Atlas and Firestore used by the benchmarks.
+
+They implement just enough of each client's surface for the code paths in
+``routes/chat.py``, ``models/user.py`` and ``reeebrand.py``:
+
+* ``FakeGenAIClient`` – deterministic embeddings (feature hashing, so similar
+  texts get similar vectors) and canned generations, with configurable latency.
+* ``FakeCollection`` – an in-memory collection supporting ``find``,
+  ``update_one`` and ``aggregate`` with ``$vectorSearch`` (exact cosine search).
+  ``FakeAsyncCollection`` wraps one behind Motor's async interface.
+* ``FakeFirestore`` – an in-memory document store with ``where``/``limit``.
+"""
+import asyncio
+import copy
+import hashlib
+import itertools
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+from google.api_core.exceptions import FailedPrecondition
+from google.cloud import firestore
+
+EMBED_DIM = 3072  # gemini-embedding-001 default output size
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def hash_embed(text: str, dim: int = EMBED_DIM) -> np.ndarray:
+    """Feature-hash words and character trigrams into a unit vector."""
+    vec = np.zeros(dim, dtype=np.float32)
+    words = _TOKEN_RE.findall(text.lower())
+    grams = words + [w[i:i + 3] for w in words for i in range(max(1, len(w) - 2))]
+    for tok in grams:
+        h = int.from_bytes(hashlib.blake2b(tok.encode(), digest_size=8).digest(), "little")
+        vec[h % dim] += 1.0 if (h >> 63) & 1 else -1.0
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+# -----------------------------------------------------------------------------
+#  Gemini
+# -----------------------------------------------------------------------------
+
+class _Latency:
+    def __init__(self, mean_ms: float, jitter: float, seed: int):
+        self.mean = mean_ms / 1000.0
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sleep(self):
+        if self.mean <= 0:
+            return
+        with self._lock:
+            factor = self._rng.lognormvariate(0, self.jitter) if self.jitter else 1.0
+        time.sleep(self.mean * factor)
+
+
+class _FakeModels:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def embed_content(self, model, contents, config=None, **_):
+        owner = self._owner
+        with owner._lock:
+            owner.embed_calls += 1
+        owner.embed_latency.sleep()
+        texts = [contents] if isinstance(contents, str) else list(contents)
+        dim = getattr(config, "output_dimensionality", None) or owner.dim
+        return SimpleNamespace(embeddings=[
+            SimpleNamespace(values=hash_embed(t, dim).tolist()) for t in texts
+        ])
+
+    def generate_content(self, model, contents, config=None, **_):
+        owner = self._owner
+        with owner._lock:
+            owner.generate_calls += 1
+        owner.generate_latency.sleep()
+        return SimpleNamespace(text=f"[fake {model}] Here is my recommendation.")
+
+
+class _FakeAsyncModels:
+    """``client.aio.models``: the sync fakes, run off the event loop."""
+
+    def __init__(self, models):
+        self._models = models
+
+    async def embed_content(self, *args, **kwargs):
+        return await asyncio.to_thread(self._models.embed_content, *args, **kwargs)
+
+    async def generate_content(self, *args, **kwargs):
+        return await asyncio.to_thread(self._models.generate_content, *args, **kwargs)
+
+
+class FakeGenAIClient:
+    """Drop-in for ``google.genai.Client`` with deterministic outputs."""
+
+    def __init__(self, embed_ms: float = 80, generate_ms: float = 900,
+                 jitter: float = 0.3, dim: int = EMBED_DIM, seed: int = 0):
+        self.dim = dim
+        self.embed_latency = _Latency(embed_ms, jitter, seed)
+        self.generate_latency = _Latency(generate_ms, jitter, seed + 1)
+        # Calls arrive from many request threads at once
+        self._lock = threading.Lock()
+        self.embed_calls = 0
+        self.generate_calls = 0
+        self.models = _FakeModels(self)
+        self.aio = SimpleNamespace(models=_FakeAsyncModels(self.models))
+
+
+# -----------------------------------------------------------------------------
+#  MongoDB
+# -----------------------------------------------------------------------------
+
+def _get_path(doc, path):
+    for part in path.split("."):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(part)
+    return doc
+
+
+def _matches(doc, flt):
+    for key, cond in (flt or {}).items():
+        val = _get_path(doc, key)
+        if isinstance(cond, dict):
+            for op, arg in cond.items():
+                if op == "$exists" and (val is not None) != bool(arg):
+                    return False
+                if op == "$in" and val not in arg:
+                    return False
+                if op == "$eq" and val != arg:
+                    return False
+                if op == "$ne" and val == arg:
+                    return False
+        elif val != cond:
+            return False
+    return True
+
+
+def _project(doc, spec, score=None):
+    if not spec:
+        return copy.deepcopy(doc)
+    out = {}
+    if spec.get("_id", 1):
+        out["_id"] = doc.get("_id")
+    for key, val in spec.items():
+        if key == "_id":
+            continue
+        if isinstance(val, dict) and "$meta" in val:
+            out[key] = score
+        elif isinstance(val, dict) and "$slice" in val:
+            if key in doc:
+                out[key] = copy.deepcopy(doc[key][:val["$slice"]])
+        elif val and key in doc:
+            out[key] = copy.deepcopy(doc[key])
+    return out
+
+
+class FakeCollection:
+    """In-memory collection with exact ``$vectorSearch`` support."""
+
+    def __init__(self, docs=None):
+        self._docs = {}
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._matrix_ids = None
+        self.indexes = []
+        if docs:
+            self.insert_many(docs)
+
+    # -- writes ---------------------------------------------------------------
+    def insert_many(self, docs):
+        with self._lock:
+            for d in docs:
+                d = dict(d)
+                d.setdefault("_id", uuid.uuid4().hex)
+                self._docs[d["_id"]] = d
+            self._matrix = None
+
+    def update_one(self, flt, update):
+        with self._lock:
+            for doc in self._docs.values():
+                if _matches(doc, flt):
+                    doc.update(update.get("$set", {}))
+                    for k in update.get("$unset", {}):
+                        doc.pop(k, None)
+                    self._matrix = None
+                    return SimpleNamespace(matched_count=1, modified_count=1)
+        return SimpleNamespace(matched_count=0, modified_count=0)
+
+    def create_index(self, keys, **kwargs):
+        self.indexes.append((keys, kwargs))
+        return kwargs.get("name", "index")
+
+    # -- reads ----------------------------------------------------------------
+    def find(self, flt=None, projection=None, **_):
+        with self._lock:
+            docs = [d for d in self._docs.values() if _matches(d, flt)]
+        return iter([_project(d, projection) for d in docs])
+
+    def find_one(self, flt=None, projection=None, **_):
+        return next(self.find(flt, projection), None)
+
+    def count_documents(self, flt, **_):
+        return sum(1 for _ in self.find(flt))
+
+    def _embedding_matrix(self, path):
+        with self._lock:
+            if self._matrix is None:
+                rows = [(k, d[path]) for k, d in self._docs.items() if d.get(path) is not None]
+                self._matrix_ids = [k for k, _ in rows]
+                mat = np.asarray([v for _, v in rows], dtype=np.float32)
+                norms = np.linalg.norm(mat, axis=1, keepdims=True)
+                self._matrix = mat / np.where(norms == 0, 1, norms)
+            return self._matrix, self._matrix_ids
+
+    def aggregate(self, pipeline, **_):
+        docs, scores = None, {}
+        for stage in pipeline:
+            (op, arg), = stage.items()
+            if op == "$vectorSearch":
+                mat, ids = self._embedding_matrix(arg["path"])
+                q = np.asarray(arg["queryVector"], dtype=np.float32)
+                q /= (np.linalg.norm(q) or 1.0)
+                sims = mat @ q
+                # Atlas reports cosine similarity mapped to [0, 1]
+                order = np.argsort(-sims)
+                docs = []
+                for i in order:
+                    doc = self._docs[ids[i]]
+                    if _matches(doc, arg.get("filter")):
+                        docs.append(doc)
+                        scores[id(doc)] = float((1 + sims[i]) / 2)
+                    if len(docs) >= arg["limit"]:
+                        break
+            elif op == "$match":
+                docs = [d for d in (docs if docs is not None else self._docs.values()) if _matches(d, arg)]
+            elif op == "$limit":
+                docs = list(docs if docs is not None else self._docs.values())[:arg]
+            elif op == "$project":
+                docs = [_project(d, arg, scores.get(id(d))) for d in docs]
+            else:
+                raise NotImplementedError(f"FakeCollection does not support {op}")
+        return iter(docs or [])
+
+
+class _AsyncCursor:
+    def __init__(self, docs):
+        self._docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._docs)
+        except StopIteration:
+            raise StopAsyncIteration from None
+
+    async def to_list(self, length=None):
+        docs = list(self._docs)
+        return docs if length is None else docs[:length]
+
+
+class FakeAsyncCollection:
+    """Motor-style async view of a ``FakeCollection``."""
+
+    def __init__(self, collection: FakeCollection):
+        self.sync = collection
+
+    def find(self, flt=None, projection=None, **kwargs):
+        return _AsyncCursor(self.sync.find(flt, projection, **kwargs))
+
+    async def find_one(self, flt=None, projection=None, **kwargs):
+        return self.sync.find_one(flt, projection, **kwargs)
+
+    async def count_documents(self, flt, **kwargs):
+        return self.sync.count_documents(flt, **kwargs)
+
+    def aggregate(self, pipeline, **kwargs):
+        return _AsyncCursor(self.sync.aggregate(pipeline, **kwargs))
+
+
+CUISINES = ["Italian", "Pizza", "Chinese", "Japanese", "Sushi", "Mexican", "Thai", "Indian",
+            "French", "American", "Burgers", "Vegan", "Korean", "Greek", "Bakery", "Cafe"]
+BOROUGHS = ["Manhattan", "Brooklyn", "Queens", "Bronx", "Staten Island"]
+STREETS = ["Broadway", "Bleecker Street", "Atlantic Avenue", "Court Street", "Lexington Avenue",
+           "Bedford Avenue", "Steinway Street", "Arthur Avenue", "Mott Street", "Smith Street"]
+_ADJ = ["Golden", "Little", "Blue", "Happy", "Royal", "Urban", "Rustic", "Lucky", "Green", "Old"]
+_NOUN = ["Dragon", "Garden", "Kitchen", "Table", "Spoon", "Oven", "Corner", "House", "Bistro", "Grill"]
+
+
+def synthetic_restaurants(n: int, dim: int = EMBED_DIM, seed: int = 42):
+    """Generate ``n`` restaurants shaped like ``whatscooking.restaurants``."""
+    rng = random.Random(seed)
+    names = itertools.cycle(f"{a} {b}" for a in _ADJ for b in _NOUN)
+    docs = []
+    for i in range(n):
+        cuisine = rng.choice(CUISINES)
+        borough = rng.choice(BOROUGHS)
+        street = rng.choice(STREETS)
+        name = f"{next(names)} {cuisine}" + (f" {i}" if i >= len(_ADJ) * len(_NOUN) else "")
+        lon, lat = -74.0 + rng.uniform(-0.15, 0.15), 40.72 + rng.uniform(-0.15, 0.15)
+        doc = {
+            "_id": f"r{i:06d}",
+            "name": name,
+            "cuisine": cuisine,
+            "borough": borough,
+            "address": {"building": str(rng.randint(1, 999)), "street": street,
+                        "zipcode": str(10000 + rng.randint(1, 400)), "coord": [lon, lat]},
+            "location": {"type": "Point", "coordinates": [lon, lat]},
+            "stars": round(rng.uniform(1.5, 5.0) * 2) / 2,
+            "priceRange": rng.randint(1, 4),
+            "OutdoorSeating": rng.random() < 0.4,
+            "DogsAllowed": rng.random() < 0.2,
+        }
+        text = f"{name} {cuisine} {street} {borough}"
+        doc["embedding"] = hash_embed(text, dim).tolist()
+        docs.append(doc)
+    return docs
+
+
+# -----------------------------------------------------------------------------
+#  Firestore
+# -----------------------------------------------------------------------------
+
+_OPS = {
+    "==": lambda a, b: a == b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+}
+
+
+def _resolve_sentinels(data):
+    return {k: (datetime.utcnow() if v is firestore.SERVER_TIMESTAMP else v)
+            for k, v in data.items()}
+
+
+class _Snapshot:
+    def __init__(self, doc_id, data, reference=None, update_time=None):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+        self.reference = reference
+        self.update_time = update_time
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+
+class _DocRef:
+    def __init__(self, store, coll, doc_id):
+        self._store, self._coll, self.id = store, coll, doc_id
+
+    def get(self, **_):
+        self._store.io_wait(write=False)
+        with self._store.lock:
+            data = self._store.data[self._coll].get(self.id)
+            return _Snapshot(self.id, copy.deepcopy(data), self, self.update_time())
+
+    def update_time(self):
+        return self._store.update_times.get((self._coll, self.id))
+
+    def _touch(self):
+        self._store.update_times[(self._coll, self.id)] = next(self._store.clock)
+
+    def set(self, data, merge=False, **_):
+        self._store.io_wait(write=True)
+        with self._store.lock:
+            docs = self._store.data[self._coll]
+            base = docs.get(self.id, {}) if merge else {}
+            docs[self.id] = {**base, **_resolve_sentinels(data)}
+            self._touch()
+
+    def update(self, data, **_):
+        self._store.io_wait(write=True)
+        with self._store.lock:
+            docs = self._store.data[self._coll]
+            if self.id not in docs:
+                raise KeyError(f"No document to update: {self._coll}/{self.id}")
+            docs[self.id].update(_resolve_sentinels(data))
+            self._touch()
+
+    def delete(self, option=None, **_):
+        with self._store.lock:
+            self._check(option)
+            self._store.data[self._coll].pop(self.id, None)
+            self._store.update_times.pop((self._coll, self.id), None)
+
+    def _check(self, option):
+        if option is not None and option.last_update_time != self.update_time():
+            raise FailedPrecondition(f"{self._coll}/{self.id} was modified")
+
+
+class _Query:
+    def __init__(self, store, coll, filters=(), limit_=None):
+        self._store, self._coll, self._filters, self._limit = store, coll, list(filters), limit_
+
+    def where(self, field, op, value):
+        return _Query(self._store, self._coll, self._filters + [(field, op, value)], self._limit)
+
+    def limit(self, n):
+        return _Query(self._store, self._coll, self._filters, n)
+
+    def stream(self, **_):
+        with self._store.lock:
+            items = list(self._store.data[self._coll].items())
+        out = []
+        for doc_id, data in items:
+            if all(_OPS[op](data.get(f), v) for f, op, v in self._filters):
+                ref = _DocRef(self._store, self._coll, doc_id)
+                out.append(_Snapshot(doc_id, copy.deepcopy(data), ref, ref.update_time()))
+                if self._limit is not None and len(out) >= self._limit:
+                    break
+        return iter(out)
+
+
+class _CollectionRef(_Query):
+    def document(self, doc_id=None):
+        return _DocRef(self._store, self._coll, doc_id or uuid.uuid4().hex[:20])
+
+
+class _Batch:
+    def __init__(self, store):
+        self._store = store
+        self._ops = []
+        self._checks = []
+
+    def set(self, ref, data, merge=False):
+        self._ops.append(lambda: ref.set(data, merge=merge))
+
+    def update(self, ref, data):
+        self._ops.append(lambda: ref.update(data))
+
+    def delete(self, ref, option=None):
+        self._checks.append(lambda: ref._check(option))
+        self._ops.append(ref.delete)
+
+    def commit(self):
+        # All or nothing, like Firestore: preconditions are checked first
+        with self._store.lock:
+            for check in self._checks:
+                check()
+            for op in self._ops:
+                op()
+        self._ops.clear()
+        self._checks.clear()
+
+
+class FakeFirestore:
+    """Thread-safe in-memory replacement for ``firestore.Client``."""
+
+    def __init__(self, read_ms: float = 0, write_ms: float = 0):
+        self.lock = threading.RLock()
+        self.data = {}
+        self.update_times = {}
+        self.clock = itertools.count(1)
+        self._read_ms = read_ms / 1000.0
+        self._write_ms = write_ms / 1000.0
+
+    def io_wait(self, write: bool):
+        delay = self._write_ms if write else self._read_ms
+        if delay:
+            time.sleep(delay)
+
+    def collection(self, name):
+        with self.lock:
+            self.data.setdefault(name, {})
+        return _CollectionRef(self, name)
+
+    def batch(self):
+        return _Batch(self)
+
+    def write_option(self, last_update_time=None, **_):
+        return SimpleNamespace(last_update_time=last_update_time)
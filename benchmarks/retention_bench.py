@@ -0,0 +1,126 @@
+"""
+Chat session compaction against the in-memory Firestore fake or the emulator.
+
+Seeds ``--sessions`` chat sessions, a ``--stale`` fraction of them idle for
+longer than the compaction cutoff, runs ``services.retention.compact_sessions``
+and checks the outcome.  ``--chatty`` keeps writing to stale sessions during
+the run, so some deletes must fail their precondition and those sessions must
+survive.
+
+    python -m benchmarks.retention_bench --sessions 5000 --stale 0.6 --batch-size 200
+    FIRESTORE_EMULATOR_HOST=localhost:8681 python -m benchmarks.retention_bench --firestore-emulator
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+
+def _client(args):
+    if args.firestore_emulator:
+        from google.cloud import firestore
+        return firestore.Client(project=os.getenv("GOOGLE_CLOUD_PROJECT", "trendwave-bench"))
+    from benchmarks.fakes import FakeFirestore
+    return FakeFirestore(read_ms=args.firestore_ms, write_ms=args.firestore_ms)
+
+
+def seed_sessions(db, n: int, stale: float, older_than_days: float, seed: int = 0):
+    """Write ``n`` sessions; returns the ids of the stale ones."""
+    from services.retention import SESSIONS
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    stale_ids = []
+    batch, pending = db.batch(), 0
+    for i in range(n):
+        uid = f"bench-user-{i:06d}"
+        old = rng.random() < stale
+        updated = now - timedelta(days=older_than_days * (1 + rng.random()) if old else rng.random())
+        messages = []
+        for turn in range(rng.randint(1, 5)):
+            stamp = (updated - timedelta(minutes=10 - turn)).isoformat()
+            messages += [{"role": "user", "content": f"question {turn} call me on 212-555-01{turn:02d}",
+                          "timestamp": stamp},
+                         {"role": "assistant", "content": "an answer " * 40, "timestamp": stamp}]
+        batch.set(db.collection(SESSIONS).document(uid),
+                  {"user_id": uid, "messages": messages, "updated_at": updated})
+        pending += 1
+        if old:
+            stale_ids.append(uid)
+        if pending == 400:
+            batch.commit()
+            batch, pending = db.batch(), 0
+    batch.commit()
+    return stale_ids
+
+
+def _chat_while_compacting(db, ids, stop: threading.Event, touched: set, seed: int):
+    from google.cloud import firestore
+    from services.retention import SESSIONS
+
+    rng = random.Random(seed)
+    while not stop.is_set() and ids:
+        uid = rng.choice(ids)
+        try:
+            db.collection(SESSIONS).document(uid).update({"updated_at": firestore.SERVER_TIMESTAMP})
+            touched.add(uid)
+        except Exception:
+            pass   # already compacted
+        time.sleep(0.001)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--stale", type=float, default=0.5, help="fraction of idle sessions")
+    parser.add_argument("--older-than-days", type=float, default=30)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--chatty", action="store_true", help="update stale sessions during the run")
+    parser.add_argument("--firestore-ms", type=float, default=0, help="fake per-operation latency")
+    parser.add_argument("--firestore-emulator", action="store_true",
+                        help="use the emulator at FIRESTORE_EMULATOR_HOST instead of the fake")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    from services.retention import ARCHIVES, SESSIONS, compact_sessions
+
+    db = _client(args)
+    stale_ids = seed_sessions(db, args.sessions, args.stale, args.older_than_days, args.seed)
+
+    stop, touched = threading.Event(), set()
+    chatter = None
+    if args.chatty:
+        chatter = threading.Thread(target=_chat_while_compacting,
+                                   args=(db, stale_ids, stop, touched, args.seed), daemon=True)
+        chatter.start()
+    stats = compact_sessions(db, args.older_than_days, batch_size=args.batch_size)
+    stop.set()
+    if chatter:
+        chatter.join()
+
+    remaining = {s.id for s in db.collection(SESSIONS).stream()}
+    archives = sum(1 for _ in db.collection(ARCHIVES).stream())
+    report = {
+        "sessions": args.sessions, "stale": len(stale_ids), **stats,
+        "remaining_sessions": len(remaining), "archive_records": archives,
+        "docs_per_s": round(stats["scanned"] / stats["seconds"], 1) if stats["seconds"] else None,
+        "touched_during_run": len(touched),
+    }
+    print(json.dumps(report, indent=2))
+    expected_left = args.sessions - stats["deleted"]
+    assert len(remaining) == expected_left, "deleted count does not match the sessions left"
+    assert stats["archived"] == archives, "every deleted session needs an archive record"
+    stale = set(stale_ids)
+    assert all(f"bench-user-{i:06d}" in remaining for i in range(args.sessions)
+               if f"bench-user-{i:06d}" not in stale), "an active session was deleted"
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump({"timestamp": datetime.utcnow().isoformat(), **report}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
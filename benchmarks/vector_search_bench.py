@@ -0,0 +1,197 @@
+"""
+Micro-benchmark for vector search backends.
+
+Builds every backend in ``services.local_index`` over synthetic (or loaded)
+embedding sets at restaurant scale and 10x/100x that, then reports build time,
+memory, query latency and recall@k against exact search.  Results are written
+as JSON so runs can be compared over time.
+
+    python -m benchmarks.vector_search_bench --base 5000 --scales 1 10 --out vs.json
+
+``--atlas`` additionally times ``$vectorSearch`` against the live collection
+in ``extensions.mongo_col`` (recall measured against exact search over the
+vectors read back from that collection).  ``hnswlib`` is benchmarked too when
+it is installed.
+"""
+import argparse
+import json
+import platform
+import time
+from datetime import datetime
+
+import numpy as np
+
+from services.local_index import ExactIndex, IVFIndex, QuantizedIndex, normalize
+
+EMBED_DIM = 3072  # gemini-embedding-001
+
+
+def synthetic_embeddings(n: int, dim: int, clusters: int = 64, spread: float = 0.35, seed: int = 0):
+    """Clustered unit vectors: a crude but ANN-realistic stand-in for real embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = normalize(rng.standard_normal((clusters, dim), dtype=np.float32))
+    labels = rng.integers(0, clusters, size=n)
+    noise = rng.standard_normal((n, dim), dtype=np.float32) * (spread / np.sqrt(dim))
+    return normalize(centers[labels] + noise)
+
+
+def make_queries(data: np.ndarray, n: int, noise: float = 0.2, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    picks = data[rng.integers(0, len(data), size=n)]
+    jitter = rng.standard_normal(picks.shape, dtype=np.float32) * (noise / np.sqrt(data.shape[1]))
+    return normalize(picks + jitter)
+
+
+def recall_at_k(truth, found, k):
+    hits = [len({i for i, _ in t[:k]} & {i for i, _ in f[:k]}) for t, f in zip(truth, found)]
+    return float(np.mean(hits)) / k
+
+
+def _time_queries(index, queries, k):
+    lat = []
+    results = []
+    for q in queries:
+        t0 = time.perf_counter()
+        results.append(index.search(q, k))
+        lat.append(time.perf_counter() - t0)
+    lat = np.asarray(lat) * 1000.0
+    return results, {"p50_ms": float(np.percentile(lat, 50)),
+                     "p95_ms": float(np.percentile(lat, 95)),
+                     "mean_ms": float(lat.mean())}
+
+
+class _HnswIndex:
+    name = "hnsw"
+
+    def __init__(self, m=16, ef_construction=200, ef=64):
+        import hnswlib
+        self._hnswlib = hnswlib
+        self.m, self.ef_construction, self.ef = m, ef_construction, ef
+
+    def build(self, ids, vectors):
+        mat = normalize(vectors)
+        self.ids = list(ids)
+        self.index = self._hnswlib.Index(space="ip", dim=mat.shape[1])
+        self.index.init_index(max_elements=len(mat), M=self.m, ef_construction=self.ef_construction)
+        self.index.add_items(mat, np.arange(len(mat)))
+        self.index.set_ef(self.ef)
+        self._nbytes = mat.nbytes + len(mat) * self.m * 2 * 4
+        return self
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def search(self, query, k):
+        labels, dists = self.index.knn_query(normalize(query), k=k)
+        return [(self.ids[l], 1.0 - float(d)) for l, d in zip(labels[0], dists[0])]
+
+
+def _backends(args):
+    backends = [ExactIndex(), QuantizedIndex()]
+    for nprobe in args.nprobe:
+        ivf = IVFIndex(nprobe=nprobe, seed=args.seed)
+        ivf.name = f"ivf(nprobe={nprobe})"
+        backends.append(ivf)
+    try:
+        backends.append(_HnswIndex())
+    except ImportError:
+        pass
+    return backends
+
+
+def bench_dataset(label, ids, data, queries, args):
+    exact = ExactIndex().build(ids, data)
+    truth = [exact.search(q, args.k) for q in queries]
+    rows = []
+    for backend in _backends(args):
+        t0 = time.perf_counter()
+        backend.build(ids, data)
+        build_s = time.perf_counter() - t0
+        found, lat = _time_queries(backend, queries, args.k)
+        row = {"dataset": label, "n": len(ids), "dim": data.shape[1], "backend": backend.name,
+               "build_s": round(build_s, 4), "memory_mb": round(backend.nbytes / 2**20, 2),
+               f"recall@{args.k}": round(recall_at_k(truth, found, args.k), 4),
+               **{k: round(v, 4) for k, v in lat.items()}}
+        rows.append(row)
+        print(f"{label:<14}{backend.name:<16}{row['build_s']:>9.3f}s{row['memory_mb']:>10.1f}MB"
+              f"{row['p50_ms']:>9.3f}ms{row['p95_ms']:>9.3f}ms{row[f'recall@{args.k}']:>8.3f}")
+    return rows
+
+
+def bench_atlas(args, query_count):
+    """Time ``$vectorSearch`` on the live collection and measure its recall."""
+    from extensions import mongo_col
+    if mongo_col is None:
+        print("Skipping Atlas backend: MongoDB is not configured")
+        return []
+    docs = list(mongo_col.find({"embedding": {"$exists": True}}, {"embedding": 1}))
+    ids = [d["_id"] for d in docs]
+    data = normalize([d["embedding"] for d in docs])
+    queries = make_queries(data, query_count, seed=args.seed + 1)
+    exact = ExactIndex().build(ids, data)
+    truth = [exact.search(q, args.k) for q in queries]
+
+    found, lat = [], []
+    for q in queries:
+        pipeline = [
+            {"$vectorSearch": {"index": args.atlas_index, "queryVector": q.tolist(), "path": "embedding",
+                               "numCandidates": args.atlas_candidates, "limit": args.k}},
+            {"$project": {"_id": 1, "score": {"$meta": "vectorSearchScore"}}},
+        ]
+        t0 = time.perf_counter()
+        res = list(mongo_col.aggregate(pipeline))
+        lat.append((time.perf_counter() - t0) * 1000.0)
+        found.append([(r["_id"], r["score"]) for r in res])
+    row = {"dataset": "atlas", "n": len(ids), "dim": data.shape[1], "backend": "atlas $vectorSearch",
+           "build_s": None, "memory_mb": None,
+           f"recall@{args.k}": round(recall_at_k(truth, found, args.k), 4),
+           "p50_ms": round(float(np.percentile(lat, 50)), 4),
+           "p95_ms": round(float(np.percentile(lat, 95)), 4),
+           "mean_ms": round(float(np.mean(lat)), 4)}
+    print(f"{'atlas':<14}{row['backend']:<16}{'-':>10}{'-':>12}"
+          f"{row['p50_ms']:>9.3f}ms{row['p95_ms']:>9.3f}ms{row[f'recall@{args.k}']:>8.3f}")
+    return [row]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base", type=int, default=5000, help="restaurant-scale corpus size")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10],
+                        help="multiples of --base to benchmark (100x at 3072 dims needs ~6 GB RAM)")
+    parser.add_argument("--dim", type=int, default=EMBED_DIM)
+    parser.add_argument("--load", help="benchmark embeddings from this .npy file instead of synthetic data")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--atlas", action="store_true", help="also benchmark Atlas $vectorSearch")
+    parser.add_argument("--atlas-index", default="vector_index_1")
+    parser.add_argument("--atlas-candidates", type=int, default=100)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    print(f"{'dataset':<14}{'backend':<16}{'build':>10}{'memory':>12}{'p50':>11}{'p95':>11}{'recall':>8}")
+    rows = []
+    if args.load:
+        data = normalize(np.load(args.load))
+        ids = list(range(len(data)))
+        rows += bench_dataset("loaded", ids, data, make_queries(data, args.queries, seed=args.seed + 1), args)
+    else:
+        for scale in args.scales:
+            n = args.base * scale
+            data = synthetic_embeddings(n, args.dim, seed=args.seed)
+            queries = make_queries(data, args.queries, seed=args.seed + 1)
+            rows += bench_dataset(f"{scale}x", list(range(n)), data, queries, args)
+            del data
+    if args.atlas:
+        rows += bench_atlas(args, args.queries)
+
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump({"timestamp": datetime.utcnow().isoformat(), "host": platform.node(),
+                       "numpy": np.__version__, "k": args.k, "results": rows}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
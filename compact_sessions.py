@@ -0,0 +1,52 @@
+"""
+Archive and delete idle chat sessions in Firestore (see ``services/retention.py``).
+
+    # How many sessions would be compacted
+    python compact_sessions.py --dry-run
+
+    # Compact sessions idle for 30+ days, 200 per write batch, and write the
+    # run's metrics for the node_exporter textfile collector
+    python compact_sessions.py --older-than-days 30 --metrics-out /var/lib/node_exporter/retention.prom
+
+Run it daily from cron, Cloud Scheduler or a Cloud Run job.  With
+``FIRESTORE_EMULATOR_HOST`` set it runs against the Firestore emulator.
+"""
+import argparse
+import json
+import logging
+import os
+
+from extensions import db
+from services.retention import compact_sessions
+from services.telemetry import REGISTRY
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive and delete idle chat sessions")
+    parser.add_argument("--older-than-days", type=float,
+                        default=float(os.getenv("CHAT_COMPACT_AFTER_DAYS", "30")))
+    parser.add_argument("--archive-ttl-days", type=float,
+                        default=float(os.getenv("CHAT_ARCHIVE_TTL_DAYS", "365")),
+                        help="expire_at of archive records (0 keeps them forever)")
+    parser.add_argument("--batch-size", type=int, default=200, help="sessions per write batch (max 250)")
+    parser.add_argument("--max-docs", type=int, help="stop after this many sessions")
+    parser.add_argument("--dry-run", action="store_true", help="only count matching sessions")
+    parser.add_argument("--metrics-out", help="write Prometheus metrics of the run to this file")
+    args = parser.parse_args(argv)
+
+    stats = compact_sessions(db, args.older_than_days, batch_size=args.batch_size,
+                             archive_ttl_days=args.archive_ttl_days or None,
+                             dry_run=args.dry_run, max_docs=args.max_docs)
+    if args.metrics_out:
+        tmp = args.metrics_out + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(REGISTRY.render())
+        os.replace(tmp, args.metrics_out)   # the collector never sees a partial file
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,16 @@
 import os
+from typing import List
+
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Placeholders shipped as defaults; api.py refuses to start with them unless DEBUG
+DEFAULT_SECRET_KEY = "your-secret-key-here"
+DEFAULT_API_PASSWORD = "admin"
+
 class Settings(BaseSettings):
     # MongoDB Atlas Configuration
     MONGODB_URI: str = os.getenv("MONGODB_URI", "")
@@ -14,9 +20,34 @@ class Settings(BaseSettings):
     
     # Google Gemini Configuration
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
+    EMBED_MODEL: str = os.getenv("EMBED_MODEL", "models/gemini-embedding-001")
+    EMBED_BATCH_WINDOW_MS: float = float(os.getenv("EMBED_BATCH_WINDOW_MS", "10"))
+    EMBED_BATCH_MAX_SIZE: int = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+    
+    # Recommendation API (api.py)
+    RECOMMEND_MODEL: str = os.getenv("RECOMMEND_MODEL", "gemini-1.5-flash")
+    RECOMMEND_CACHE_TTL_S: float = float(os.getenv("RECOMMEND_CACHE_TTL_S", "300"))
+    RECOMMEND_MATRIX_TTL_S: float = float(os.getenv("RECOMMEND_MATRIX_TTL_S", "3600"))
+    RECOMMEND_BATCH_MAX_QUERIES: int = int(os.getenv("RECOMMEND_BATCH_MAX_QUERIES", "500"))
+    API_USERNAME: str = os.getenv("API_USERNAME", "admin")
+    API_PASSWORD: str = os.getenv("API_PASSWORD", DEFAULT_API_PASSWORD)
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+    API_CORS_ORIGINS: str = os.getenv("API_CORS_ORIGINS", "*")
+    # /metrics is served to this bearer token or these source networks only
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
+    METRICS_ALLOW_NETWORKS: str = os.getenv("METRICS_ALLOW_NETWORKS", "127.0.0.1/32,::1/128")
     
     # Application Settings
     DEBUG: bool = os.getenv("DEBUG", "False").lower() in ("true", "1", "t")
-    SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
+    SECRET_KEY: str = os.getenv("SECRET_KEY", DEFAULT_SECRET_KEY)
+
+    def insecure_defaults(self) -> List[str]:
+        """Names of credentials still empty or at their placeholder defaults."""
+        insecure = []
+        if self.SECRET_KEY in ("", DEFAULT_SECRET_KEY):
+            insecure.append("SECRET_KEY")
+        if self.API_PASSWORD in ("", DEFAULT_API_PASSWORD):
+            insecure.append("API_PASSWORD")
+        return insecure
 
 settings = Settings()
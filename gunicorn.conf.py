@@ -0,0 +1,103 @@
+"""
+Gunicorn configuration for TrendWave.
+
+Chat requests spend almost all of their time waiting on Gemini, MongoDB Atlas
+and Firestore, so we run a small number of processes with many threads each
+(``gthread``) instead of gunicorn's default single-threaded sync workers.
+
+Every knob can be overridden through the environment, e.g.::
+
+    GUNICORN_WORKERS=3 GUNICORN_THREADS=32 gunicorn -c gunicorn.conf.py main:app
+"""
+import math
+import multiprocessing
+import os
+
+# ---------------------------------------------------------------------------- #
+#  Sizing
+# ---------------------------------------------------------------------------- #
+_cpu_count = multiprocessing.cpu_count()
+
+# Throughput we want to sustain and the latency a typical chat takes end-to-end.
+# Little's law gives the number of requests in flight: rps × latency.
+TARGET_RPS         = float(os.getenv("GUNICORN_TARGET_RPS", "20"))
+TARGET_LATENCY_S   = float(os.getenv("GUNICORN_TARGET_LATENCY_S", "4"))
+_in_flight         = max(1, math.ceil(TARGET_RPS * TARGET_LATENCY_S))
+
+bind          = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+worker_class  = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+
+# One process per core is enough: the GIL is released while we wait on sockets.
+workers = int(os.getenv("GUNICORN_WORKERS", str(max(2, _cpu_count))))
+# Exported so per-process budgets (e.g. services/admission.py) can split a global limit.
+os.environ["GUNICORN_WORKERS"] = str(workers)
+
+if worker_class == "gthread":
+    threads = int(os.getenv(
+        "GUNICORN_THREADS",
+        str(min(64, max(4, math.ceil(_in_flight / workers)))),
+    ))
+    # Exported so per-thread pools (services/resilience.py) are sized to match.
+    os.environ["GUNICORN_THREADS"] = str(threads)
+elif worker_class in ("gevent", "eventlet"):
+    # Green workers need the matching package installed (not in requirements.txt).
+    worker_connections = int(os.getenv(
+        "GUNICORN_WORKER_CONNECTIONS",
+        str(max(100, math.ceil(_in_flight / workers) * 4)),
+    ))
+
+# ---------------------------------------------------------------------------- #
+#  Timeouts & keep-alive
+# ---------------------------------------------------------------------------- #
+# A single generate_content call can take tens of seconds; do not let the
+# arbiter kill a worker that is merely waiting on Gemini.
+timeout          = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+# Time given to in-flight chats to finish after SIGTERM before workers are killed.
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "60"))
+# Keep connections from the load balancer open between chat turns.
+keepalive        = int(os.getenv("GUNICORN_KEEPALIVE", "75"))
+
+# Recycle workers periodically to bound memory growth of in-process caches.
+max_requests        = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+# extensions.py opens MongoDB/Firestore connections at import time and those
+# clients are not fork-safe, so every worker must import the app itself.
+preload_app = False
+
+# ---------------------------------------------------------------------------- #
+#  Logging
+# ---------------------------------------------------------------------------- #
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+errorlog  = os.getenv("GUNICORN_ERROR_LOG", "-")
+loglevel  = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+# ---------------------------------------------------------------------------- #
+#  Lifecycle hooks
+# ---------------------------------------------------------------------------- #
+def when_ready(server):
+    server.log.info(
+        "TrendWave ready: %s workers × %s threads (%s), timeout=%ss, graceful=%ss",
+        workers, globals().get("threads", 1), worker_class, timeout, graceful_timeout,
+    )
+
+
+def post_worker_init(worker):
+    # Refill this worker's (empty) caches from the query log while it serves traffic
+    from services.warmup import start_warm_up
+    start_warm_up(worker.wsgi)
+
+
+def worker_int(worker):
+    # SIGINT/SIGQUIT is gunicorn's fast shutdown: in-flight requests are dropped.
+    # Graceful draining only happens on SIGTERM, within graceful_timeout.
+    worker.log.warning("Worker %s interrupted, exiting without draining in-flight requests", worker.pid)
+
+
+def worker_abort(worker):
+    worker.log.warning("Worker %s aborted after exceeding timeout=%ss", worker.pid, timeout)
+
+
+def worker_exit(server, worker):
+    server.log.info("Worker %s exited", worker.pid)
@@ -0,0 +1,149 @@
+"""
+Migrate stored restaurant embeddings to a new output dimensionality.
+
+    # Cut existing 3072-d vectors down to 768 and renormalise (no API calls)
+    python migrate_embeddings.py --dim 768 --mode truncate
+
+    # Re-embed every restaurant at 768 dimensions with gemini-embedding-001
+    python migrate_embeddings.py --dim 768 --mode reembed
+
+    # Same for another interest domain's collection (see services/domains.py)
+    python migrate_embeddings.py --dim 768 --mode reembed --domain AI
+
+Truncation only works when the stored vectors are at least ``--dim`` long;
+growing back to a larger size needs ``--mode reembed``.  Each updated document
+gets ``embedding_dim`` set so partially migrated collections can be resumed.
+
+After migrating, recreate the Atlas vector index with ``numDimensions`` equal
+to ``--dim`` and start the app with ``EMBED_DIM`` set to the same value.
+"""
+import argparse
+import logging
+import os
+import time
+
+from pymongo import UpdateOne
+
+from extensions import mongo_client, mongo_col
+from services.admission import Priority, batch_limiter, is_rate_limited
+from services.domains import DEFAULT_DOMAIN, DOMAINS
+from services.embeddings import DIM_FIELD, truncate_normalize
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+EMBED_MODEL = "gemini-embedding-001"
+
+
+def _pending(dim):
+    return {"embedding": {"$exists": True}, DIM_FIELD: {"$ne": dim}}
+
+
+def truncate_all(collection, dim, batch_size, dry_run=False):
+    updated = skipped = 0
+    ops = []
+    for doc in collection.find(_pending(dim), {"embedding": 1}):
+        vec = doc["embedding"]
+        if len(vec) < dim:
+            skipped += 1
+            continue
+        ops.append(UpdateOne({"_id": doc["_id"]},
+                             {"$set": {"embedding": truncate_normalize(vec, dim), DIM_FIELD: dim}}))
+        if len(ops) >= batch_size:
+            updated += _flush(collection, ops, dry_run)
+    updated += _flush(collection, ops, dry_run)
+    if skipped:
+        logger.warning("%d documents have fewer than %d dimensions; re-embed them with --mode reembed",
+                       skipped, dim)
+    return updated
+
+
+def _embed_batch(client, texts, dim):
+    from google.genai import types
+
+    for attempt in range(5):
+        try:
+            with batch_limiter.slot(Priority.BACKGROUND, op="embed"):
+                response = client.models.embed_content(
+                    model=EMBED_MODEL,
+                    contents=texts,
+                    config=types.EmbedContentConfig(task_type="RETRIEVAL_DOCUMENT",
+                                                    output_dimensionality=dim),
+                )
+            return [truncate_normalize(e.values, dim) for e in response.embeddings]
+        except Exception as e:
+            if not is_rate_limited(e) or attempt == 4:
+                raise
+            logger.warning("Rate limited, retrying in %ds", 2 ** attempt)
+            time.sleep(2 ** attempt)
+
+
+def reembed_all(collection, domain, dim, batch_size, dry_run=False):
+    from google import genai
+
+    client = genai.Client(
+        vertexai=True,
+        project=os.getenv("GOOGLE_CLOUD_PROJECT"),
+        location=os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1"),
+    )
+    updated = 0
+    docs = []
+    for doc in collection.find({DIM_FIELD: {"$ne": dim}}, {"embedding": 0}):
+        docs.append(doc)
+        if len(docs) >= batch_size:
+            updated += _reembed(client, collection, domain, docs, dim, dry_run)
+            docs = []
+    if docs:
+        updated += _reembed(client, collection, domain, docs, dim, dry_run)
+    return updated
+
+
+def _reembed(client, collection, domain, docs, dim, dry_run):
+    try:
+        vectors = _embed_batch(client, [domain.embed_text(d) for d in docs], dim)
+    except Exception as e:
+        logger.error("Failed to embed batch starting at %s: %s", docs[0]["_id"], e)
+        return 0
+    ops = [UpdateOne({"_id": d["_id"]}, {"$set": {"embedding": v, DIM_FIELD: dim}})
+           for d, v in zip(docs, vectors)]
+    return _flush(collection, ops, dry_run)
+
+
+def _flush(collection, ops, dry_run):
+    if not ops:
+        return 0
+    count = len(ops)
+    if not dry_run:
+        collection.bulk_write(ops, ordered=False)
+    logger.info("%s %d documents", "Would update" if dry_run else "Updated", count)
+    ops.clear()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate restaurant embeddings to a new dimensionality")
+    parser.add_argument("--dim", type=int, required=True, help="target dimensionality, e.g. 768")
+    parser.add_argument("--mode", choices=("truncate", "reembed"), default="truncate")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--domain", choices=sorted(DOMAINS), default=DEFAULT_DOMAIN.key)
+    args = parser.parse_args()
+
+    if mongo_col is None:
+        raise SystemExit("MongoDB is not configured (MONGODB_ATLAS_URI)")
+    domain = DOMAINS[args.domain]
+    collection = mongo_col if domain is DEFAULT_DOMAIN else mongo_client[domain.database][domain.collection]
+
+    started = time.time()
+    if args.mode == "truncate":
+        updated = truncate_all(collection, args.dim, args.batch_size, args.dry_run)
+    else:
+        updated = reembed_all(collection, domain, args.dim, args.batch_size, args.dry_run)
+    logger.info("Migration of %s to %d dimensions finished: %d documents in %.1fs",
+                domain, args.dim, updated, time.time() - started)
+    logger.info("Now update the Atlas vector index %s to numDimensions=%d and set EMBED_DIM=%d",
+                domain.vector_index, args.dim, args.dim)
+
+
+if __name__ == "__main__":
+    main()
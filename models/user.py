@@ -6,11 +6,12 @@ from extensions import db
 class User(UserMixin):
     """User model for authentication and user data management."""
     
-    def __init__(self, id, email, password_hash, _is_active=True):
+    def __init__(self, id, email, password_hash, _is_active=True, domain=None):
         self.id = id
         self.email = email
         self.password_hash = password_hash
         self._is_active = _is_active
+        self.domain = domain
 
     @property
     def is_active(self):
@@ -36,7 +37,8 @@ class User(UserMixin):
                     id=user_doc.id,
                     email=user_data.get('email'),
                     password_hash=user_data.get('password'),
-                    _is_active=user_data.get('is_active', True)
+                    _is_active=user_data.get('is_active', True),
+                    domain=user_data.get('domain')
                 )
             return None
         except Exception as e:
@@ -57,7 +59,8 @@ class User(UserMixin):
                     id=user_doc.id,
                     email=user_data.get('email'),
                     password_hash=user_data.get('password'),
-                    _is_active=user_data.get('is_active', True)
+                    _is_active=user_data.get('is_active', True),
+                    domain=user_data.get('domain')
                 )
             return None
         except Exception as e:
@@ -81,6 +84,16 @@ class User(UserMixin):
             print(f"Error creating user {email}: {e}")
             return None
 
+    def set_domain(self, domain):
+        """Stores the user's chosen interest domain."""
+        try:
+            db.collection('users').document(self.id).update({'domain': domain})
+            self.domain = domain
+            return True
+        except Exception as e:
+            print(f"Error setting domain for user {self.id}: {e}")
+            return False
+
     def update_last_login(self):
         """Updates the last login timestamp for the user."""
         try:
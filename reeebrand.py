@@ -1,6 +1,10 @@
 from extensions import mongo_col
 from google import genai
+from services.admission import Priority, batch_limiter, is_rate_limited
+from services.embeddings import DIM_FIELD, configured_dim, restaurant_embed_text, truncate_normalize
+from services.geo import ensure_geo_index
 import os
+import time
 import logging
 from datetime import datetime
 
@@ -26,23 +30,48 @@ except Exception as e:
     raise
 
 embed_model = "gemini-embedding-001"
+embed_dim = configured_dim()  # None keeps the model's full 3072 dimensions
+MAX_RETRIES = 5
+
+
+def embed_document(text):
+    """Embed one document at background priority, backing off on quota errors."""
+    for attempt in range(MAX_RETRIES):
+        try:
+            with batch_limiter.slot(Priority.BACKGROUND, op="embed"):
+                return client.models.embed_content(
+                    model=embed_model,
+                    contents=[text],
+                    config=genai.types.EmbedContentConfig(
+                        task_type="RETRIEVAL_DOCUMENT",
+                        output_dimensionality=embed_dim,
+                    )
+                )
+        except Exception as e:
+            if not is_rate_limited(e) or attempt == MAX_RETRIES - 1:
+                raise
+            delay = 2 ** attempt
+            logger.warning(f"Rate limited, retrying in {delay}s")
+            time.sleep(delay)
+
+# 2dsphere index for "near me" lookups (no-op if it already exists)
+try:
+    ensure_geo_index(mongo_col)
+except Exception as e:
+    logger.warning(f"Could not create the location 2dsphere index: {e}")
 
 # Fetch all documents
 for doc in mongo_col.find({"embedding": {"$exists": True}}):
     try:
-        text_to_embed = f"{doc.get('name', '')} {doc.get('cuisine', '')} {doc.get('address', {}).get('street', '')} {doc.get('borough', '')}"
+        text_to_embed = restaurant_embed_text(doc)
         logger.info(f"Embedding text for {doc['name']}: {text_to_embed}")
-        response = client.models.embed_content(
-            model=embed_model,
-            contents=[text_to_embed],
-            config=genai.types.EmbedContentConfig(task_type="RETRIEVAL_DOCUMENT")
-        )
+        response = embed_document(text_to_embed)
         if hasattr(response, 'embeddings') and response.embeddings:
-            new_embedding = response.embeddings[0].values
+            new_embedding = truncate_normalize(response.embeddings[0].values, embed_dim)
             logger.info(f"Embedding values for {doc['name']}: {new_embedding[:10]}... (length: {len(new_embedding)})")
             mongo_col.update_one(
                 {"_id": doc["_id"]},
-                {"$set": {"embedding": new_embedding}}
+                {"$set": {"embedding": new_embedding, DIM_FIELD: len(new_embedding)}}
             )
             logger.info(f"Updated embedding for {doc['name']} (ID: {doc['_id']})")
         else:
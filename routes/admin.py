@@ -0,0 +1,69 @@
+"""
+Admin-only diagnostics for the worker process that serves the request.
+
+Disabled (404) unless ``ADMIN_ENDPOINTS`` is on; the caller must be signed in
+with an e-mail listed in ``ADMIN_EMAILS``.  Each gunicorn worker profiles only
+itself, so repeat a capture a few times to cover several workers.
+
+* ``GET /admin/profile?seconds=10&interval_ms=10&scope=app`` – collapsed stacks
+  (``flamegraph.pl profile.txt > profile.svg`` or load into speedscope)
+* ``GET /admin/memory?seconds=10&top=25&group=lineno`` – tracemalloc top sites
+* ``GET /admin/caches`` – entries and approximate memory of in-process caches
+"""
+import logging
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request
+from flask_login import current_user
+
+from services.profiling import ProfilerBusy, allocation_snapshot, cache_sizes, sample_stacks
+
+logger = logging.getLogger(__name__)
+
+admin_bp = Blueprint("admin", __name__)
+
+
+@admin_bp.before_request
+def require_admin():
+    if not current_app.config["ADMIN_ENDPOINTS"]:
+        abort(404)
+    if not current_user.is_authenticated:
+        return current_app.login_manager.unauthorized()
+    if (current_user.email or "").lower() not in current_app.config["ADMIN_EMAILS"]:
+        abort(403)
+
+
+def _seconds(default: float = 10.0) -> float:
+    seconds = request.args.get("seconds", default, type=float)
+    return min(max(seconds, 0.1), current_app.config["ADMIN_PROFILE_MAX_S"])
+
+
+@admin_bp.errorhandler(ProfilerBusy)
+def _busy(e):
+    return jsonify({"success": False, "error": str(e)}), 409
+
+
+@admin_bp.route("/profile")
+def profile():
+    seconds = _seconds()
+    interval = min(max(request.args.get("interval_ms", 10, type=float), 1.0), 1000.0) / 1000
+    app_only = request.args.get("scope", "app") != "all"
+    logger.info("Admin %s started a %.1fs stack profile", current_user.email, seconds)
+    result = sample_stacks(seconds, interval, app_only)
+    resp = Response(result["collapsed"] + "\n", mimetype="text/plain")
+    resp.headers["X-Profile-Samples"] = str(result["samples"])
+    return resp
+
+
+@admin_bp.route("/memory")
+def memory():
+    seconds = _seconds()
+    group = request.args.get("group", "lineno")
+    if group not in ("lineno", "filename"):
+        return jsonify({"success": False, "error": "group must be lineno or filename"}), 400
+    logger.info("Admin %s started a %.1fs allocation snapshot", current_user.email, seconds)
+    return jsonify(allocation_snapshot(seconds, request.args.get("top", 25, type=int), group))
+
+
+@admin_bp.route("/caches")
+def caches():
+    return jsonify(cache_sizes())
@@ -1,26 +1,53 @@
 import logging
 import os
+import threading
+import time
 from datetime import datetime
 
-from flask import Blueprint, render_template, request, jsonify, current_app
+import numpy as np
+
+from flask import Blueprint, render_template, request, jsonify, current_app, g
 from flask_login import login_required, current_user
 from google.cloud import firestore
 from google import genai
 from google.genai import types
 import logging
 
-from extensions import db, mongo_col
+from extensions import db, mongo_client, mongo_col
+from services.admission import Overloaded, Priority, genai_limiter
+from services.answers import detect_intent, is_follow_up, render_answer
+from services.coalesce import SingleFlight
+from services.cache import LRUCache
+from services.domains import DEFAULT_DOMAIN, PartitionManager, get_domain
+from services.embed_batcher import EmbedBatcher
+from services.embeddings import FULL_DIM, check_catalog_dim, configured_dim, truncate_normalize
+from services.geo import is_nearby_query, parse_location, proximity
+from services.name_index import normalize_name
+from services.profiling import register_cache
+from services.query_log import query_record
+from services.rerank import rerank
+from services.retention import SESSIONS, session_expiry
+from services.resilience import (
+    CircuitBreaker, CircuitOpen, DEGRADED, Deadline, DeadlineExceeded,
+    current_deadline, hedged, run_with_timeout,
+)
+from services.telemetry import REGISTRY, span, sampled_debug
 
 # Create a module-level logger
 logger = logging.getLogger(__name__)
 
 # Initialize client as None - will be lazy-loaded
 _client = None
+# Extra clients for hedging embeds into other regions, keyed by location
+_regional_clients = {}
 
-def get_genai_client():
-    """Lazy-load and return the Google GenAI client."""
+def get_genai_client(location=None):
+    """Lazy-load and return the Google GenAI client (optionally for another region)."""
     global _client
-    
+
+    if location and location != os.getenv('GOOGLE_CLOUD_LOCATION', 'us-central1'):
+        return _get_regional_client(location)
+
     if _client is None:
         try:
             _client = genai.Client(
@@ -35,30 +62,55 @@ def get_genai_client():
     
     return _client
 
+def _get_regional_client(location):
+    client = _regional_clients.get(location)
+    if client is None:
+        try:
+            client = _regional_clients[location] = genai.Client(
+                vertexai=True,
+                project=os.getenv('GOOGLE_CLOUD_PROJECT'),
+                location=location
+            )
+        except Exception as e:
+            logger.error(f"Failed to initialize GenAI client for {location}: {str(e)}")
+    return client
+
 chat_bp = Blueprint("chat", __name__)
 
+ANSWER_PATH = REGISTRY.counter("trendwave_chat_answers_total",
+                               "Chat answers by how they were produced.", labels=("path",))
+
+# One breaker per upstream dependency; our own load shedding is not a dependency failure
+_breakers = {
+    name: CircuitBreaker(name, ignore=(Overloaded,))
+    for name in ("firestore", "embed", "mongo", "generate")
+}
+
 # -----------------------------------------------------------------------------
 #  Helpers: Firestore chat history
 # -----------------------------------------------------------------------------
 
 def _history_doc(uid):
-    return db.collection("chat_sessions").document(str(uid))
+    return db.collection(SESSIONS).document(str(uid))
 
-def get_chat_history(uid):
+def get_chat_history(uid, timeout=None):
+    """Return the stored messages, or None if history could not be read in time."""
     try:
-        snap = _history_doc(uid).get()
+        snap = _breakers["firestore"].call(_history_doc(uid).get, timeout=timeout)
         return snap.to_dict().get("messages", []) if snap.exists else []
     except Exception as exc:
         logging.warning("Firestore history error: %s", exc)
-        return []
+        return None
 
-def save_chat_history(uid, msgs):
+def save_chat_history(uid, msgs, timeout=None):
     try:
-        _history_doc(uid).set({
+        _breakers["firestore"].call(_history_doc(uid).set, {
             "user_id": str(uid),
             "messages": msgs[-10:],
             "updated_at": firestore.SERVER_TIMESTAMP,
-        })
+            # Firestore TTL policy field; idle sessions are compacted well before
+            "expire_at": session_expiry(current_app.config["CHAT_SESSION_TTL_DAYS"]),
+        }, timeout=timeout)
     except Exception as exc:
         logging.error("Failed to save history: %s", exc)
 
@@ -66,60 +118,446 @@ def save_chat_history(uid, msgs):
 #  Vector search helper
 # -----------------------------------------------------------------------------
 
-def vector_search(query: str):
-    if mongo_col is None:
-        return []
+# Concurrent requests for the same query share one embed + $vectorSearch call
+_search_flight = SingleFlight("vector_search")
 
-    client = get_genai_client()
+# Query texts from concurrent requests are embedded together, one batcher per model
+_query_embedders = {}
+_embedders_lock = threading.Lock()
+
+# Last good candidates per query, served when embed/search fail or time out
+_candidate_cache = LRUCache(maxsize=2048)
+
+# Query embeddings by (model, dimension, normalized query); embeds are deterministic
+_query_vectors = LRUCache(maxsize=4096)
+
+
+def _embed_queries(embed_model: str, texts, location=None):
+    client = get_genai_client(location)
     if client is None:
-        logger.error("Google GenAI client not initialized")
-        return []
-        
-    embed_model = current_app.config["EMBED_MODEL"]
-    
-    try:
+        raise RuntimeError("Google GenAI client not initialized")
+
+    dim = configured_dim()
+    with genai_limiter.slot(Priority.EMBED, op="embed"):
         response = client.models.embed_content(
             model=embed_model,
-            contents=[query],
+            contents=list(texts),
             config=types.EmbedContentConfig(
-                task_type="RETRIEVAL_QUERY"
+                task_type="RETRIEVAL_QUERY",
+                output_dimensionality=dim,
             )
         )
-        
-        # Extract the embedding vector as a list of floats
-        if hasattr(response, 'embedding') and response.embedding:
-            vec = response.embedding.values
-        elif hasattr(response, 'embeddings') and response.embeddings:
-            vec = response.embeddings[0].values
-        else:
-            logger.error("Unexpected response format from embed_content")
-            return []
-        logger.info(f"Generated query vector length: {len(vec)}")    
+    # Extract the embedding vectors as lists of floats, cut to the stored dimension
+    if hasattr(response, 'embeddings') and response.embeddings:
+        return [truncate_normalize(e.values, dim) for e in response.embeddings]
+    if hasattr(response, 'embedding') and response.embedding:
+        return [truncate_normalize(response.embedding.values, dim)]
+    raise RuntimeError("Unexpected response format from embed_content")
+
+
+def get_query_embedder(embed_model: str) -> EmbedBatcher:
+    """Lazy-load the embedding batcher for ``embed_model``."""
+    with _embedders_lock:
+        embedder = _query_embedders.get(embed_model)
+        if embedder is None:
+            embedder = _query_embedders[embed_model] = EmbedBatcher(
+                lambda texts: _embed_queries(embed_model, texts),
+                window_ms=current_app.config["EMBED_BATCH_WINDOW_MS"],
+                max_batch=current_app.config["EMBED_BATCH_MAX_SIZE"],
+                name=embed_model,
+            )
+        return embedder
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def vector_search(query: str, location=None, domain=DEFAULT_DOMAIN):
+    """Top ``domain`` results for ``query``; with a ``(lat, lng)`` location, only nearby ones."""
+    partition = get_partition(domain)
+    if partition is None:
+        return []
+
+    embedder = get_query_embedder(current_app.config["EMBED_MODEL"])
+    nearby = nearby_restaurants(partition, *location) if location and partition.geo else None
+    # Users within ~100 m of each other share searches and cached candidates
+    area = (round(location[0], 3), round(location[1], 3)) if nearby else None
+    key = (domain.key, embedder.name, normalize_query(query), area)
+    cfg = {name: current_app.config[name] for name in _SEARCH_SETTINGS}
+    deadline = current_deadline()
+    try:
+        results = _search_flight.do(
+            key, _embed_and_search, query, embedder, deadline, cfg, partition, nearby,
+            timeout=deadline.remaining(),
+        )
+    except Overloaded:
+        raise
     except Exception as e:
-        logger.error(f"Error generating embedding: {str(e)}")
+        cached = _candidate_cache.get(key)
+        if cached is not None:
+            logger.warning("Vector search failed (%s); serving cached candidates", e)
+            DEGRADED.inc(stage="search")
+            return list(cached)
+        logger.error(f"Vector search failed: {str(e)}")
         return []
+    _candidate_cache.put(key, results)
+    return list(results)
+
 
-    pipeline = [
-        {"$vectorSearch": {
-            "index": "vector_index_1",
-            "queryVector": vec,
-            "path": "embedding",
-            "numCandidates": 100,
-            "limit": 5,
-        }},
-        {"$project": {
-            "name": 1, "cuisine": 1, "address": 1, "stars": 1,
-            "priceRange": 1, "OutdoorSeating": 1, "DogsAllowed": 1,
-            "score": {"$meta": "vectorSearchScore"}, "_id": 0,
-        }}
+# App settings read by _embed_and_search, which may run outside the app context
+_SEARCH_SETTINGS = (
+    "GENAI_HEDGE_LOCATIONS", "EMBED_TIMEOUT_S", "SEARCH_TIMEOUT_S", "SEARCH_RESULT_LIMIT",
+    "RERANK_CANDIDATES", "RERANK_DIVERSITY", "GEO_RADIUS_KM", "GEO_WEIGHT",
+)
+
+
+def embed_query(query: str, embedder: EmbedBatcher, deadline: Deadline, cfg):
+    """Query embedding, from ``_query_vectors`` when this query was embedded before."""
+    vec_key = (embedder.name, configured_dim(), normalize_query(query))
+    vec = _query_vectors.get(vec_key)
+    if vec is not None:
+        return vec
+    # Embeds are idempotent: hedge the batched call with a direct one, in
+    # another region when GENAI_HEDGE_LOCATIONS is set, else the same one.
+    embed_timeout = cfg["EMBED_TIMEOUT_S"]
+    attempts = [lambda: embedder.embed(query, timeout=deadline.remaining(embed_timeout))]
+    attempts += [
+        lambda loc=loc: _embed_queries(embedder.name, [query], location=loc)[0]
+        for loc in (cfg["GENAI_HEDGE_LOCATIONS"] or [None])
     ]
     try:
-        results = list(mongo_col.aggregate(pipeline))
-        logger.info(f"Vector search returned {len(results)} candidates: {results}")
-        return results
+        with span("embed"):
+            vec = _breakers["embed"].call(
+                hedged, attempts, deadline.remaining(embed_timeout), op="embed", default_delay=0.3)
+        logger.debug("Generated query vector length: %d", len(vec))
+    except Exception as e:
+        logger.error(f"Error generating embedding: {str(e)}")
+        raise
+    _query_vectors.put(vec_key, vec)
+    return vec
+
+
+def _embed_and_search(query: str, embedder: EmbedBatcher, deadline: Deadline, cfg, partition, nearby=None):
+    vec = embed_query(query, embedder, deadline, cfg)
+
+    # Over-fetch (with embeddings) so the rerank stage has something to choose from
+    limit = cfg["SEARCH_RESULT_LIMIT"]
+    fetch = max(limit, cfg["RERANK_CANDIDATES"], _GEO_FETCH_LIMIT if nearby else 0)
+    search = {
+        "index": partition.domain.vector_index,
+        "queryVector": vec,
+        "path": "embedding",
+        "numCandidates": max(100, 5 * fetch),
+        "limit": fetch,
+    }
+    # "_id" identifies candidates in the query log and in nearby filtering
+    projection = {**partition.domain.projection, "_id": 1, "score": {"$meta": "vectorSearchScore"}}
+    if fetch > limit:
+        projection["embedding"] = 1
+    if nearby:
+        # Only score restaurants near the user (needs "_id" as a filter field in the Atlas index)
+        distances = dict(nearby)
+        search.update({
+            "filter": {"_id": {"$in": list(distances)}},
+            "numCandidates": min(len(distances), 1000),
+            "limit": min(len(distances), fetch),
+        })
+    pipeline = [{"$vectorSearch": search}, {"$project": projection}]
+    budget = deadline.remaining(cfg["SEARCH_TIMEOUT_S"])
+
+    def run_search():
+        opts = {"maxTimeMS": max(1, int(budget * 1000))} if budget is not None else {}
+        return list(partition.collection.aggregate(pipeline, **opts))
+
+    try:
+        with span("search"):
+            results = _breakers["mongo"].call(
+                hedged, [run_search, run_search], budget, op="search", default_delay=0.2)
     except Exception as e:
         logger.error(f"Error in MongoDB vector search: {str(e)}")
-        return []
+        raise
+
+    near = None
+    if nearby:
+        km = np.array([distances.get(r.get("_id"), cfg["GEO_RADIUS_KM"]) for r in results])
+        for r, d in zip(results, km):
+            r["distance_km"] = round(float(d), 2)
+        near = proximity(km, cfg["GEO_RADIUS_KM"])
+    if nearby or fetch > limit:
+        with span("rerank"):
+            results = rerank(query, results, limit, diversity=cfg["RERANK_DIVERSITY"],
+                             proximity=near, proximity_weight=cfg["GEO_WEIGHT"],
+                             boosts=partition.domain.rerank_boosts)
+    logger.info("Vector search returned %d candidates", len(results))
+    sampled_debug(logger, "Vector search candidates: %s", results)
+    return results
+
+# -----------------------------------------------------------------------------
+#  Domain partitions
+# -----------------------------------------------------------------------------
+
+_partitions = None
+_partitions_lock = threading.Lock()
+
+
+def _domain_collection(domain):
+    # The default domain is the collection configured in extensions.py
+    if domain is DEFAULT_DOMAIN:
+        return mongo_col
+    if mongo_client is None:
+        return None
+    return mongo_client[domain.database][domain.collection]
+
+
+def get_partition(domain=DEFAULT_DOMAIN):
+    """Search partition (collection + in-memory indexes) for ``domain``, opened on first use."""
+    global _partitions
+    with _partitions_lock:
+        if _partitions is None:
+            _partitions = PartitionManager(
+                _domain_collection,
+                budget_bytes=int(current_app.config["DOMAIN_PARTITION_BUDGET_MB"] * 2 ** 20))
+    partition = _partitions.get(domain)
+    if partition is not None and not partition.dim_checked:
+        # Once per partition: stored vectors must match the query embedding size
+        partition.dim_checked = True
+        check_catalog_dim(partition.collection, configured_dim() or FULL_DIM, f"Domain {domain.key}")
+    return partition
+
+
+def current_domain():
+    """The interest domain the signed-in user picked on the select-domain page."""
+    return get_domain(getattr(current_user, "domain", None))
+
+# -----------------------------------------------------------------------------
+#  Location-aware search
+# -----------------------------------------------------------------------------
+
+# Nearby candidates fetched by similarity before distance reorders them
+_GEO_FETCH_LIMIT = 20
+
+
+def nearby_restaurants(partition, lat: float, lng: float):
+    """Restaurants within ``GEO_RADIUS_KM`` as ``[(id, km)]``, or ``None`` if there are none."""
+    try:
+        with span("geo_filter"):
+            nearby = partition.geo.nearby(lat, lng, current_app.config["GEO_RADIUS_KM"],
+                                          limit=current_app.config["GEO_MAX_CANDIDATES"])
+    except Exception as e:
+        logger.warning("Geo lookup failed, searching without location: %s", e)
+        return None
+    if not nearby:
+        logger.info("No restaurants within %.1f km of the user; searching without location",
+                    current_app.config["GEO_RADIUS_KM"])
+    return nearby or None
+
+# -----------------------------------------------------------------------------
+#  Restaurant name resolution
+# -----------------------------------------------------------------------------
+
+def get_name_index(domain=DEFAULT_DOMAIN):
+    """The domain's name index (built lazily from its catalog, rebuilt hourly)."""
+    partition = get_partition(domain)
+    if partition is None or partition.names is None:
+        return None
+    return partition.names.get()
+
+
+def narrow_to_mentioned(user_msg: str, candidates, domain=DEFAULT_DOMAIN):
+    """Restrict ``candidates`` to the restaurants the user names, if any.
+
+    A named restaurant that is in the catalog but not among the cached
+    candidates is fetched directly, so the prompt covers what was asked about.
+    """
+    index = get_name_index(domain)
+    if index is None or not candidates:
+        return candidates
+    with span("name_resolve"):
+        mentions = index.resolve(user_msg)
+    if not mentions:
+        return candidates
+    names = {normalize_name(index.names[key]) for key, _ in mentions}
+    narrowed = [c for c in candidates if normalize_name(c.get("name", "")) in names]
+    if narrowed:
+        return narrowed
+    try:
+        scores = dict(mentions)
+        docs = list(get_partition(domain).collection.find(
+            {"_id": {"$in": list(scores)}}, {**domain.projection, "_id": 1}, limit=len(scores)))
+        for doc in docs:
+            doc["score"] = scores.get(doc.get("_id"), 0.0)
+        return docs or candidates
+    except Exception as e:
+        logger.warning("Could not fetch mentioned restaurants: %s", e)
+        return candidates
+
+# -----------------------------------------------------------------------------
+#  Prompt helper
+# -----------------------------------------------------------------------------
+
+def build_prompt(user_msg: str, candidates, intent=None, domain=DEFAULT_DOMAIN):
+    """Build the Gemini prompt for ``user_msg`` from the retrieved candidates."""
+    role = f"You are {domain.assistant}.\n"
+    if candidates:
+        ctx = "\n".join(
+            f"- {domain.describe(c)} — "
+            f"Score: {c.get('score', 'N/A'):.2f}"
+            + (f" — Distance: {c['distance_km']:.1f} km" if "distance_km" in c else "")
+            for c in candidates)
+        # Detect intent for follow-up questions (restaurant-style domains only)
+        intent = (intent or detect_intent(user_msg)) if domain.intents else None
+        if intent == "address":
+            prompt = (
+                f"{role}"
+                f"User: {user_msg}\n"
+                f"Here are the {domain.item_noun} to consider:\n{ctx}\n"
+                f"Provide the address of the restaurant(s) mentioned in the user query, or all addresses if no specific restaurant is mentioned, using only this data."
+            )
+        elif intent == "price":
+            prompt = (
+                f"{role}"
+                f"User: {user_msg}\n"
+                f"Here are the {domain.item_noun} to consider:\n{ctx}\n"
+                f"Provide the price range of the restaurant(s) mentioned, or all price ranges if no specific restaurant is mentioned, using only this data."
+            )
+        elif intent == "rating":
+            prompt = (
+                f"{role}"
+                f"User: {user_msg}\n"
+                f"Here are the {domain.item_noun} to consider:\n{ctx}\n"
+                f"Provide the star rating of the restaurant(s) mentioned, or all ratings if no specific restaurant is mentioned, using only this data."
+            )
+        elif intent == "tv":
+            prompt = (
+                f"{role}"
+                f"User: {user_msg}\n"
+                f"Here are the {domain.item_noun} to consider:\n{ctx}\n"
+                f"Indicate if the restaurant(s) mentioned have TV information available (note: TV data is not present in this dataset, so respond accordingly), or check all restaurants if no specific one is mentioned, using only this data."
+            )
+        elif intent == "family":
+            prompt = (
+                f"{role}"
+                f"User: {user_msg}\n"
+                f"Here are the {domain.item_noun} to consider:\n{ctx}\n"
+                f"Assess if the restaurant(s) mentioned are suitable for families with children (consider outdoor seating and general ambiance inferred from stars), or evaluate all restaurants if no specific one is mentioned, using only this data."
+            )
+        else:
+            prompt = (
+                f"{role}"
+                f"User: {user_msg}\n"
+                f"Here are the {domain.item_noun} to consider:\n{ctx}\n"
+                f"Recommend the best match based solely on this data"
+                f"If no exact match, suggest the closest match "
+                f"and explain why, using the score as a relevance indicator."
+            )
+    else:
+        prompt = (f"You are {domain.assistant}. User asks: '{user_msg}'. "
+                  f"No matching {domain.item_noun} found — politely ask for more details.")
+    return prompt
+
+
+class AIServiceError(RuntimeError):
+    pass
+
+
+def generate_answer(prompt: str, deadline: Deadline, priority: Priority = Priority.INTERACTIVE) -> str:
+    """Send ``prompt`` to Gemini within the request deadline and return the reply text."""
+    text_model = current_app.config["TEXT_MODEL"]
+    client = get_genai_client()
+    if client is None:
+        raise AIServiceError("AI service not initialized")
+
+    with span("generate"):
+        genai_limiter.acquire(priority)
+        started = time.perf_counter()
+
+        def release(exc=None):
+            genai_limiter.finish("generate", started, exc)
+
+        # The slot is held until Gemini answers, even if this request stops
+        # waiting at its deadline, so abandoned calls still count against the limit.
+        try:
+            response = _breakers["generate"].call(
+                run_with_timeout,
+                lambda: client.models.generate_content(
+                    model=text_model,
+                    contents=[{"role": "user", "parts": [{"text": prompt}]}]
+                ),
+                deadline.remaining(),
+                op="generate",
+                on_done=release,
+            )
+        except CircuitOpen:
+            release()
+            raise
+
+    # Extract the response text
+    if hasattr(response, 'text'):
+        return response.text
+    if hasattr(response, 'candidates') and response.candidates:
+        return response.candidates[0].content.parts[0].text
+    raise AIServiceError("Unexpected response format from AI service")
+
+
+# Answers by model, domain, normalized message, intent, nearby flag, and candidate
+# ids with the distances the prompt shows.  The prompt also holds the raw message
+# and each candidate's details and score; those differ only in case and spacing,
+# or follow from the query and catalog, so identical searches share an answer
+# until it expires (catalog edits can take up to RESPONSE_CACHE_TTL_S to show).
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    """The answer cache, or ``None`` when ``RESPONSE_CACHE_TTL_S`` is 0."""
+    global _answer_cache
+    ttl = current_app.config["RESPONSE_CACHE_TTL_S"]
+    if ttl <= 0:
+        return None
+    with _answer_cache_lock:
+        if _answer_cache is None:
+            _answer_cache = LRUCache(maxsize=current_app.config["RESPONSE_CACHE_SIZE"], ttl=ttl)
+    return _answer_cache
+
+
+def answer_key(domain, user_msg: str, intent, candidates, nearby: bool = False):
+    return (current_app.config["TEXT_MODEL"], domain.key, normalize_query(user_msg), intent, nearby,
+            tuple((str(c.get("_id")), round(c["distance_km"], 1) if "distance_km" in c else None)
+                  for c in candidates or ()))
+
+
+def cached_answer(prompt: str, key, deadline: Deadline, priority: Priority = Priority.INTERACTIVE):
+    """``(answer, from_cache)`` for ``prompt``, generating and caching it under ``key`` on a miss."""
+    cache = get_answer_cache()
+    answer = cache.get(key) if cache is not None else None
+    if answer is not None:
+        return answer, True
+    answer = generate_answer(prompt, deadline, priority)
+    if cache is not None:
+        cache.put(key, answer)
+    return answer, False
+
+
+def log_query(domain, user_msg, intent, follow_up, nearby, path, candidates):
+    """Append this request to the query log, if ``QUERY_LOG_PATH`` is set."""
+    query_log = current_app.extensions.get("query_log")
+    if query_log is None:
+        return
+    start = g.get("request_start")
+    try:
+        query_log.write(query_record(
+            domain.key, user_msg, intent, follow_up, nearby, path, candidates,
+            g.get("stage_timings"), time.perf_counter() - start if start is not None else None))
+    except Exception as e:
+        logger.warning("Could not write query log record: %s", e)
+
+# In-process caches reported by /admin/caches
+register_cache("conversation_context", lambda: globals().get("conversation_context", {}))
+register_cache("candidates", lambda: _candidate_cache)
+register_cache("query_vectors", lambda: _query_vectors)
+register_cache("answers", lambda: _answer_cache)
+register_cache("domain_partitions", lambda: _partitions)
 
 # -----------------------------------------------------------------------------
 #  Routes
@@ -139,111 +577,103 @@ def chat_api():
         if not user_msg:
             return jsonify({"success": False, "error": "Empty message"}), 400
 
+        deadline = g.deadline = Deadline(current_app.config["REQUEST_DEADLINE_S"])
         session_id = str(current_user.id)  # Use user ID as session identifier
-        history = get_chat_history(current_user.id)
+        with span("history_read"):
+            history = get_chat_history(
+                current_user.id, timeout=deadline.remaining(current_app.config["HISTORY_TIMEOUT_S"]))
+        # History is optional for answering; if it could not be read, answer
+        # without it and do not overwrite the stored copy afterwards.
+        history_ok = history is not None
+        if not history_ok:
+            DEGRADED.inc(stage="history_read")
+            history = []
+
+        # Searches only cover the domain the user picked
+        domain = current_domain()
 
         # Initialize or retrieve conversation context for this session
         if 'conversation_context' not in globals():
             globals()['conversation_context'] = {}
-        if session_id not in conversation_context:
-            conversation_context[session_id] = {'candidates': None}
+        if conversation_context.get(session_id, {}).get('domain') != domain.key:
+            conversation_context[session_id] = {'candidates': None, 'domain': domain.key}
 
         # Perform vector search for new queries or reuse candidates for follow-ups
-        if any(keyword in user_msg.lower() for keyword in ["address", "price", "reviews", "tv", "family", "kids", "expensive", "cheap", "rating"]) and conversation_context[session_id]['candidates']:
-            candidates = conversation_context[session_id]['candidates']
+        intent = detect_intent(user_msg) if domain.intents else None
+        follow_up = is_follow_up(user_msg, intent, conversation_context[session_id]['candidates'])
+        location = None
+        if follow_up:
+            # Narrow to the restaurant(s) the user names: smaller prompt, faster answer
+            candidates = narrow_to_mentioned(user_msg, conversation_context[session_id]['candidates'], domain)
         else:
-            candidates = vector_search(user_msg)
+            # "near me" style queries search around the location the client sent
+            location = parse_location(data.get("location")) if is_nearby_query(user_msg) else None
+            candidates = vector_search(user_msg, location, domain)
             conversation_context[session_id]['candidates'] = candidates
 
-        logger.info(f"Candidates from vector search: {candidates}")
-
-        # Generate prompt with detailed context
-        if candidates:
-            ctx = "\n".join(
-                f"- {c['name']} ({c['cuisine']}), ⭐{c.get('stars', 'N/A')} — "
-                f"Address: {c.get('address', {}).get('street', 'N/A')}, {c.get('address', {}).get('zipcode', 'N/A')} — "
-                f"Price Range: {c.get('priceRange', 'N/A')} — "
-                f"Outdoor Seating: {c.get('OutdoorSeating', 'N/A')} — "
-                f"Dogs Allowed: {c.get('DogsAllowed', 'N/A')} — "
-                f"Score: {c.get('score', 'N/A'):.2f}"
-                for c in candidates)
-            # Detect intent for follow-up questions
-            if "address" in user_msg.lower():
-                prompt = (
-                    f"You are a helpful restaurant assistant.\n"
-                    f"User: {user_msg}\n"
-                    f"Here are the restaurants to consider:\n{ctx}\n"
-                    f"Provide the address of the restaurant(s) mentioned in the user query, or all addresses if no specific restaurant is mentioned, using only this data."
-                )
-            elif any(keyword in user_msg.lower() for keyword in ["price", "expensive", "cheap"]):
-                prompt = (
-                    f"You are a helpful restaurant assistant.\n"
-                    f"User: {user_msg}\n"
-                    f"Here are the restaurants to consider:\n{ctx}\n"
-                    f"Provide the price range of the restaurant(s) mentioned, or all price ranges if no specific restaurant is mentioned, using only this data."
-                )
-            elif "reviews" in user_msg.lower() or "rating" in user_msg.lower():
-                prompt = (
-                    f"You are a helpful restaurant assistant.\n"
-                    f"User: {user_msg}\n"
-                    f"Here are the restaurants to consider:\n{ctx}\n"
-                    f"Provide the star rating of the restaurant(s) mentioned, or all ratings if no specific restaurant is mentioned, using only this data."
-                )
-            elif "tv" in user_msg.lower():
-                prompt = (
-                    f"You are a helpful restaurant assistant.\n"
-                    f"User: {user_msg}\n"
-                    f"Here are the restaurants to consider:\n{ctx}\n"
-                    f"Indicate if the restaurant(s) mentioned have TV information available (note: TV data is not present in this dataset, so respond accordingly), or check all restaurants if no specific one is mentioned, using only this data."
-                )
-            elif any(keyword in user_msg.lower() for keyword in ["family", "kids", "children"]):
-                prompt = (
-                    f"You are a helpful restaurant assistant.\n"
-                    f"User: {user_msg}\n"
-                    f"Here are the restaurants to consider:\n{ctx}\n"
-                    f"Assess if the restaurant(s) mentioned are suitable for families with children (consider outdoor seating and general ambiance inferred from stars), or evaluate all restaurants if no specific one is mentioned, using only this data."
-                )
-            else:
-                prompt = (
-                    f"You are a helpful restaurant assistant.\n"
-                    f"User: {user_msg}\n"
-                    f"Here are the restaurants to consider:\n{ctx}\n"
-                    f"Recommend the best match based solely on this data"
-                    f"If no exact match, suggest the closest match "
-                    f"and explain why, using the score as a relevance indicator."
-                )
-        else:
-            prompt = (f"You are a helpful restaurant assistant. User asks: '{user_msg}'. "
-                      f"No matching restaurants found — politely ask for more details.")
-
-        logger.info(f"Generated prompt: {prompt}")
-        text_model = current_app.config["TEXT_MODEL"]
-        client = get_genai_client()
-        if client is None:
-            return jsonify({"success": False, "error": "AI service not initialized"}), 500
-        
-        response = client.models.generate_content(
-            model=text_model,
-            contents=[{"role": "user", "parts": [{"text": prompt}]}]
-        )
-        
-        # Extract the response text
-        if hasattr(response, 'text'):
-            answer = response.text
-        elif hasattr(response, 'candidates') and response.candidates:
-            answer = response.candidates[0].content.parts[0].text
+        sampled_debug(logger, "Candidates for prompt: %s", candidates)
+
+        # Structured follow-ups (address, price, rating, ...) are answered from
+        # the cached candidates without an LLM round trip.
+        fast_mode = current_app.config["FAST_ANSWERS"]
+        fast_answer = None
+        if follow_up and fast_mode != "off":
+            with span("fast_answer"):
+                fast_answer = render_answer(user_msg, candidates, intent)
+
+        if fast_answer is not None and fast_mode == "on":
+            answer, path = fast_answer, "template"
         else:
-            return jsonify({"success": False, "error": "Unexpected response format from AI service"}), 500
-            
+            # Generate prompt with detailed context
+            with span("prompt_build"):
+                prompt = build_prompt(user_msg, candidates, intent, domain)
+            sampled_debug(logger, "Generated prompt: %s", prompt)
+            started = time.perf_counter()
+            answer, from_cache = cached_answer(
+                prompt, answer_key(domain, user_msg, intent, candidates, location is not None), deadline)
+            path = "cache" if from_cache else "llm"
+            if fast_answer is not None and not from_cache:
+                # FAST_ANSWERS=compare: serve the LLM answer, log what the template would have saved
+                logger.info("Fast answer for intent %r would have saved %.0f ms",
+                            intent, (time.perf_counter() - started) * 1000)
+                sampled_debug(logger, "Fast answer: %r | LLM answer: %r", fast_answer, answer)
+
         # Append and save history
         history += [
             {"role": "user", "content": user_msg, "timestamp": datetime.utcnow().isoformat()},
             {"role": "assistant", "content": answer, "timestamp": datetime.utcnow().isoformat()},
         ]
-        save_chat_history(current_user.id, history)
+        if history_ok:
+            with span("history_write"):
+                # The answer is already paid for: save it even if the deadline is spent
+                save_chat_history(current_user.id, history,
+                                  timeout=max(deadline.remaining(current_app.config["HISTORY_TIMEOUT_S"]),
+                                              current_app.config["HISTORY_WRITE_MIN_S"]))
 
+        ANSWER_PATH.inc(path=path)
+        log_query(domain, user_msg, intent, follow_up, location is not None, path, candidates)
         return jsonify({"success": True, "response": answer})
         
+    except Overloaded as e:
+        logger.warning("Shedding chat request: %s", e)
+        resp = jsonify({"success": False, "busy": True,
+                        "error": "The assistant is busy right now, please try again in a moment."})
+        resp.headers["Retry-After"] = str(int(e.retry_after))
+        return resp, 503
+
+    except DeadlineExceeded as e:
+        logger.warning("Chat request exceeded its deadline: %s", e)
+        return jsonify({"success": False,
+                        "error": "The assistant took too long to answer, please try again."}), 504
+
+    except AIServiceError as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    except CircuitOpen as e:
+        logger.warning("Chat request failed fast: %s", e)
+        return jsonify({"success": False, "busy": True,
+                        "error": "The assistant is temporarily unavailable, please try again shortly."}), 503
+
     except Exception as e:
         logger.error(f"Error in chat_api: {str(e)}")
         return jsonify({"success": False, "error": f"Server error: {str(e)}"}), 500
\ No newline at end of file
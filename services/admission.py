@@ -0,0 +1,225 @@
+"""
+Adaptive admission control for calls to Gemini.
+
+``AdaptiveLimiter`` caps the number of concurrent upstream calls with an AIMD
+limit: it grows by roughly one slot per limit's worth of healthy calls and is
+cut multiplicatively when Gemini answers 429/RESOURCE_EXHAUSTED or when the
+smoothed latency of an operation drifts well above its long-run average, so a
+single slow call does not count as congestion.  Waiting callers are admitted in priority order (cheap embeds, then
+interactive chat, then background jobs), and callers that would have to wait
+longer than their priority allows are rejected immediately with
+``Overloaded`` so the web tier can answer "busy" instead of timing out.
+
+The limiter is per process, and so are its priorities: a batch job in another
+process (``reeebrand.py``, ``migrate_embeddings.py``) does not queue behind web
+traffic.  With several gunicorn workers, set ``GENAI_MAX_CONCURRENCY`` to the
+web tier's total budget and it is divided evenly across ``WEB_CONCURRENCY``
+workers.  Batch scripts use ``batch_limiter``, capped at
+``GENAI_BATCH_MAX_CONCURRENCY``; keep the two budgets within the project quota
+so chat keeps headroom while a job runs.  Both back off on 429s, the only
+signal they share.
+"""
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Dict, Optional
+
+from services.telemetry import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    EMBED = 0
+    INTERACTIVE = 1
+    BACKGROUND = 2
+
+
+class Overloaded(Exception):
+    """Raised when a call is shed instead of queued."""
+
+    def __init__(self, message="Upstream AI service is busy", retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+try:
+    from google.api_core.exceptions import ResourceExhausted, TooManyRequests
+    _QUOTA_ERRORS = (ResourceExhausted, TooManyRequests)
+except ImportError:  # pragma: no cover - google-api-core ships with the Google clients
+    _QUOTA_ERRORS = ()
+
+try:
+    from google.genai.errors import APIError as GenAIError
+except ImportError:  # pragma: no cover
+    GenAIError = None
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    """True for Gemini/Vertex quota errors (HTTP 429 / RESOURCE_EXHAUSTED)."""
+    if _QUOTA_ERRORS and isinstance(exc, _QUOTA_ERRORS):
+        return True
+    if GenAIError is not None and isinstance(exc, GenAIError):
+        return exc.code == 429 or exc.status == "RESOURCE_EXHAUSTED"
+    # HTTP client errors (httpx/requests wrappers) that carry the status code
+    return getattr(exc, "status_code", None) == 429
+
+
+LIMIT = REGISTRY.gauge("trendwave_genai_concurrency_limit", "Current adaptive concurrency limit.",
+                       labels=("limiter",))
+IN_USE = REGISTRY.gauge("trendwave_genai_in_flight", "Upstream calls currently admitted.",
+                        labels=("limiter",))
+SHED = REGISTRY.counter("trendwave_genai_shed_total", "Calls rejected by admission control.",
+                        labels=("limiter", "priority"))
+THROTTLED = REGISTRY.counter("trendwave_genai_rate_limited_total", "Upstream 429 responses observed.",
+                             labels=("limiter",))
+
+
+class AdaptiveLimiter:
+    # Longest a caller of each priority may queue before being shed (None = wait forever).
+    DEFAULT_MAX_WAIT = {Priority.EMBED: 2.0, Priority.INTERACTIVE: 5.0, Priority.BACKGROUND: None}
+
+    def __init__(self, name: str, initial: int = 8, min_limit: int = 1, max_limit: int = 64,
+                 backoff: float = 0.7, latency_tolerance: float = 2.0,
+                 background_share: float = 0.5, max_wait: Optional[Dict[Priority, Optional[float]]] = None):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.background_share = background_share
+        self.max_wait = {**self.DEFAULT_MAX_WAIT, **(max_wait or {})}
+
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self._in_flight = 0
+        self._waiters = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        # Per operation: [short EWMA, long EWMA, samples] of healthy call latency
+        self._latency: Dict[str, list] = {}
+        self._last_decrease = 0.0
+        LIMIT.set(self._limit, limiter=name)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    # -- admission ------------------------------------------------------------
+    def _cap_for(self, priority: Priority) -> int:
+        cap = max(self.min_limit, int(self._limit))
+        if priority == Priority.BACKGROUND:
+            cap = max(1, int(cap * self.background_share))
+        return cap
+
+    def acquire(self, priority: Priority = Priority.INTERACTIVE):
+        max_wait = self.max_wait.get(priority)
+        entry = (int(priority), next(self._seq))
+        with self._cond:
+            if max_wait is not None and max_wait <= 0 and self._in_flight >= self._cap_for(priority):
+                self._shed(priority)
+            heapq.heappush(self._waiters, entry)
+            deadline = None if max_wait is None else time.monotonic() + max_wait
+            try:
+                while not (self._waiters[0] == entry and self._in_flight < self._cap_for(priority)):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._shed(priority)
+                    self._cond.wait(remaining)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+            self._in_flight += 1
+            IN_USE.set(self._in_flight, limiter=self.name)
+
+    def _shed(self, priority: Priority):
+        SHED.inc(limiter=self.name, priority=priority.name.lower())
+        raise Overloaded(retry_after=max(1.0, self._in_flight / max(self._limit, 1.0)))
+
+    def release(self, op: str, latency: float, rate_limited: bool = False):
+        with self._cond:
+            self._in_flight -= 1
+            IN_USE.set(self._in_flight, limiter=self.name)
+            self._adjust(op, latency, rate_limited)
+            self._cond.notify_all()
+
+    # -- AIMD -----------------------------------------------------------------
+    SHORT_ALPHA = 0.2    # ~last 10 calls
+    LONG_ALPHA = 0.02    # ~last 100 calls
+    WARMUP_SAMPLES = 20
+
+    def _observe(self, op: str, latency: float):
+        """Update the smoothed latencies of ``op``; returns ``(short, long)`` once warmed up."""
+        stats = self._latency.get(op)
+        if stats is None:
+            self._latency[op] = [latency, latency, 1]
+            return None
+        stats[0] += self.SHORT_ALPHA * (latency - stats[0])
+        stats[1] += self.LONG_ALPHA * (latency - stats[1])
+        stats[2] += 1
+        return (stats[0], stats[1]) if stats[2] >= self.WARMUP_SAMPLES else None
+
+    def _adjust(self, op: str, latency: float, rate_limited: bool):
+        smoothed = None if rate_limited else self._observe(op, latency)
+        congested = rate_limited or (smoothed is not None and
+                                     smoothed[0] > smoothed[1] * self.latency_tolerance)
+        if congested:
+            now = time.monotonic()
+            baseline = smoothed[1] if smoothed else latency
+            # At most one multiplicative decrease per baseline latency window
+            if now - self._last_decrease > baseline:
+                self._limit = max(self.min_limit, self._limit * self.backoff)
+                self._last_decrease = now
+                logger.warning("%s limiter decreased to %d (%s)", self.name, self.limit,
+                               "rate limited" if rate_limited
+                               else f"latency {smoothed[0]:.2f}s vs {smoothed[1]:.2f}s")
+        else:
+            self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+        LIMIT.set(self._limit, limiter=self.name)
+
+    def finish(self, op: str, started: float, exc: Optional[BaseException] = None):
+        """Release a slot acquired at ``started`` (``time.perf_counter()``) for a
+        call that ended with ``exc`` (None on success)."""
+        rate_limited = exc is not None and is_rate_limited(exc)
+        if rate_limited:
+            THROTTLED.inc(limiter=self.name)
+        self.release(op, time.perf_counter() - started, rate_limited)
+
+    @contextmanager
+    def slot(self, priority: Priority = Priority.INTERACTIVE, op: str = "call"):
+        """Hold an admission slot for the duration of one upstream call."""
+        self.acquire(priority)
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as exc:
+            self.finish(op, start, exc)
+            raise
+        except BaseException:
+            self.finish(op, start)
+            raise
+        self.finish(op, start)
+
+
+def _per_worker(total: int) -> int:
+    workers = int(os.getenv("WEB_CONCURRENCY", os.getenv("GUNICORN_WORKERS", "1")) or 1)
+    return max(1, total // max(1, workers))
+
+
+genai_limiter = AdaptiveLimiter(
+    "genai",
+    initial=_per_worker(int(os.getenv("GENAI_INITIAL_CONCURRENCY", "16"))),
+    max_limit=_per_worker(int(os.getenv("GENAI_MAX_CONCURRENCY", "64"))),
+)
+
+# Batch scripts run in their own process, outside the web tier's budget
+batch_limiter = AdaptiveLimiter(
+    "genai_batch",
+    initial=min(4, int(os.getenv("GENAI_BATCH_MAX_CONCURRENCY", "8"))),
+    max_limit=int(os.getenv("GENAI_BATCH_MAX_CONCURRENCY", "8")),
+)
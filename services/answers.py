@@ -0,0 +1,130 @@
+"""
+Deterministic answers for structured follow-up questions.
+
+When a user asks about the address, price or rating of restaurants we already
+returned, the answer is a lookup in the cached candidates — no LLM round trip
+is needed.  ``render_answer`` handles those intents and returns ``None`` for
+anything open-ended, which then goes to Gemini as before.
+"""
+import re
+from typing import Dict, List, Optional
+
+from services.name_index import NameIndex
+
+# Follow-up intents, checked in order; a message matches when one of its words
+# starts with a keyword ("prices", "cheaper", "ratings", ...).
+INTENT_KEYWORDS = [
+    ("address", ("address",)),
+    ("price", ("price", "expensive", "cheap")),
+    ("rating", ("reviews", "rating")),
+    ("tv", ("tv",)),
+    ("family", ("family", "kids", "children")),
+]
+
+# Intents answered locally; the rest still need the model's judgement.
+TEMPLATED_INTENTS = {"address", "price", "rating", "tv"}
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def detect_intent(user_msg: str) -> Optional[str]:
+    words = _WORD_RE.findall(user_msg.lower())
+    for intent, keywords in INTENT_KEYWORDS:
+        if any(w.startswith(kw) for w in words for kw in keywords):
+            return intent
+    return None
+
+
+# Words that phrase a question about earlier results without asking for
+# anything new: "what are their prices", "is it good for kids"
+_QUESTION_WORDS = {
+    "what", "what's", "whats", "where", "which", "who", "how", "is", "are", "was", "were",
+    "do", "does", "did", "can", "could", "would", "will", "the", "a", "an", "of", "for",
+    "to", "at", "on", "in", "and", "or", "it", "its", "it's", "they", "them", "their",
+    "these", "those", "this", "that", "there", "here", "one", "ones", "both", "all",
+    "each", "any", "me", "my", "i", "we", "us", "you", "please", "tell", "give", "show",
+    "list", "about", "much", "many", "more", "less", "most", "very", "so", "with", "have",
+    "has", "got", "get", "good", "friendly", "ok", "okay", "allowed", "place", "places",
+    "restaurant", "restaurants", "spot", "spots", "option", "options", "again", "also",
+    "than", "really", "know", "info", "details", "then", "now",
+}
+
+
+def _is_intent_word(word: str) -> bool:
+    return any(word.startswith(kw) for _, keywords in INTENT_KEYWORDS for kw in keywords)
+
+
+def is_follow_up(user_msg: str, intent: Optional[str], candidates: Optional[List[Dict]]) -> bool:
+    """True when ``user_msg`` asks about ``candidates`` instead of starting a new search.
+
+    It needs an intent and either names one of the candidates, or has no words
+    beyond the intent keywords and question phrasing: "what are their prices"
+    is a follow-up, "cheap pizza in Brooklyn" is a new search.
+    """
+    if intent is None or not candidates:
+        return False
+    if resolve_mentions(user_msg, candidates):
+        return True
+    words = _WORD_RE.findall(user_msg.lower())
+    return all(w in _QUESTION_WORDS or _is_intent_word(w) for w in words)
+
+
+def resolve_mentions(user_msg: str, candidates: List[Dict]) -> List[Dict]:
+    """Candidates the user refers to by name, matched the same way as names
+    across the catalog (``NameIndex``).  Best matches only."""
+    index = NameIndex().build({"_id": i, "name": c.get("name")} for i, c in enumerate(candidates))
+    mentions = index.resolve(user_msg, limit=len(candidates))
+    if not mentions:
+        return []
+    best = mentions[0][1]
+    named = {i for i, score in mentions if score >= best}
+    return [c for i, c in enumerate(candidates) if i in named]
+
+
+def _address(c: Dict) -> str:
+    addr = c.get("address") or {}
+    street = " ".join(p for p in (addr.get("building"), addr.get("street")) if p)
+    parts = [p for p in (street, c.get("borough"), addr.get("zipcode")) if p]
+    return ", ".join(parts) if parts else "address not available"
+
+
+def _price(c: Dict) -> str:
+    price = c.get("priceRange")
+    if isinstance(price, (int, float)) and price > 0:
+        return "$" * int(price)
+    return str(price) if price else "price range not available"
+
+
+def _rating(c: Dict) -> str:
+    stars = c.get("stars")
+    return f"⭐ {stars}" if stars is not None else "no rating available"
+
+
+_LINE_FORMATTERS = {
+    "address": lambda c: f"{c['name']}: {_address(c)}",
+    "price": lambda c: f"{c['name']}: {_price(c)}",
+    "rating": lambda c: f"{c['name']}: {_rating(c)}",
+}
+_NOUNS = {
+    "address": ("address", "addresses"),
+    "price": ("price range", "price ranges"),
+    "rating": ("star rating", "star ratings"),
+}
+
+
+def render_answer(user_msg: str, candidates: List[Dict], intent: Optional[str] = None) -> Optional[str]:
+    """Answer a structured follow-up from ``candidates``, or ``None`` if it needs the LLM."""
+    intent = intent or detect_intent(user_msg)
+    if intent not in TEMPLATED_INTENTS or not candidates:
+        return None
+    targets = resolve_mentions(user_msg, candidates) or candidates
+
+    if intent == "tv":
+        names = ", ".join(c["name"] for c in targets)
+        return (f"Sorry, I don't have information about TVs for {names} — "
+                f"that detail isn't included in my restaurant data.")
+
+    plural = len(targets) > 1
+    header = f"Here {'are' if plural else 'is'} the {_NOUNS[intent][plural]}:"
+    lines = [f"- {_LINE_FORMATTERS[intent](c)}" for c in targets]
+    return "\n".join([header] + lines)
@@ -0,0 +1,114 @@
+"""
+Small thread-safe in-process caches.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """Least-recently-used cache with an optional per-entry time-to-live."""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or (self.ttl is not None and entry[1] < time.monotonic()):
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any):
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def items(self):
+        """Snapshot of ``(key, value)`` pairs, least recently used first."""
+        with self._lock:
+            return [(key, entry[0]) for key, entry in self._data.items()]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class Refreshing:
+    """A value built by ``build()`` and rebuilt every ``ttl`` seconds.
+
+    The first ``get`` builds it on the calling thread (concurrent callers wait
+    for that one build).  Later rebuilds run on a background thread while
+    ``get`` keeps returning the old value.  After a failed build the next
+    attempt waits ``retry_after`` seconds; until then ``get`` returns the old
+    value, or ``None`` if there never was one.  ``on_built(value)`` is called
+    after each successful build.
+    """
+
+    def __init__(self, build: Callable[[], Any], ttl: float, retry_after: float = 60.0,
+                 name: str = "index", on_built: Optional[Callable[[Any], None]] = None):
+        self.build = build
+        self.on_built = on_built
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self.name = name
+        self.value = None
+        self._next_build = 0.0   # time.monotonic() of the next (re)build
+        self._rebuilding = False
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        value = self.value
+        if time.monotonic() < self._next_build:
+            return value
+        if value is None:
+            with self._lock:
+                if self.value is None and time.monotonic() >= self._next_build:
+                    self._rebuild()
+                return self.value
+        with self._lock:
+            if self._rebuilding or time.monotonic() < self._next_build:
+                return value
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild_in_background, name=f"rebuild-{self.name}",
+                         daemon=True).start()
+        return value
+
+    def _rebuild_in_background(self):
+        try:
+            self._rebuild()
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def _rebuild(self):
+        try:
+            value = self.build()
+        except Exception as exc:
+            logger.error("Failed to build %s, retrying in %.0fs: %s", self.name, self.retry_after, exc)
+            self._next_build = time.monotonic() + self.retry_after
+            return
+        self.value = value
+        self._next_build = time.monotonic() + self.ttl
+        if self.on_built is not None:
+            self.on_built(value)
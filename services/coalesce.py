@@ -0,0 +1,91 @@
+"""
+Single-flight request coalescing.
+
+Concurrent callers asking for the same key share one in-flight computation:
+the first caller (the leader) runs the function, everyone else waits for and
+receives the leader's result (or exception).  Nothing is cached once the call
+completes — this only collapses *simultaneous* work.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from services.telemetry import REGISTRY
+
+COALESCE_CALLS = REGISTRY.counter(
+    "trendwave_singleflight_calls_total",
+    "Calls through a single-flight group, by whether they ran or joined an in-flight call.",
+    labels=("group", "outcome"),
+)
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Thread-safe (and asyncio-friendly) duplicate call suppression."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Tuple[int, Hashable], asyncio.Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs):
+        """Run ``fn(*args, **kwargs)`` unless a call for ``key`` is already in flight.
+
+        ``timeout`` bounds how long a follower waits for the leader's result.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            COALESCE_CALLS.inc(group=self.name, outcome="coalesced")
+            if not call.event.wait(timeout):
+                raise TimeoutError(f"{self.name}: in-flight call for {key!r} did not finish in time")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        COALESCE_CALLS.inc(group=self.name, outcome="leader")
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    async def do_async(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs):
+        """Async variant: callers on the same event loop share one task per ``key``."""
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            leader = task is None
+            if leader:
+                task = self._tasks[task_key] = loop.create_task(fn(*args, **kwargs))
+                task.add_done_callback(lambda _t: self._forget(task_key))
+        COALESCE_CALLS.inc(group=self.name, outcome="leader" if leader else "coalesced")
+        # shield: one cancelled caller must not cancel the shared call for everyone else
+        return await asyncio.shield(task)
+
+    def _forget(self, task_key):
+        with self._lock:
+            self._tasks.pop(task_key, None)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls) + len(self._tasks)
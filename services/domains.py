@@ -0,0 +1,238 @@
+"""
+Interest domains and their search partitions.
+
+A ``Domain`` ties a choice on the select-domain page to its own MongoDB
+collection and Atlas vector index, the text its documents are embedded from,
+and how its documents are described to the model.  ``PartitionManager`` opens a
+domain's collection and in-memory lookups (name and geo indexes) the first time
+one of its users searches, and evicts the least recently used partitions once
+their indexes exceed a memory budget, so each search only touches the chosen
+domain's data and adding domains does not grow every search.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from services.embeddings import restaurant_embed_text
+from services.geo import CatalogGeoIndex
+from services.name_index import CatalogNameIndex
+from services.telemetry import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+PARTITION_BYTES = REGISTRY.gauge(
+    "trendwave_domain_partition_bytes",
+    "Estimated memory held by a domain partition's in-memory indexes.",
+    labels=("domain",),
+)
+PARTITION_EVICTIONS = REGISTRY.counter(
+    "trendwave_domain_partition_evictions_total",
+    "Domain partitions evicted to stay within the memory budget.",
+    labels=("domain",),
+)
+
+
+class _Fields(dict):
+    """Document view for ``str.format_map``: missing fields render as ``default``."""
+
+    def __init__(self, doc, default=""):
+        super().__init__(doc or {})
+        self.default = default
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if isinstance(value, dict):
+            return _Fields(value, self.default)
+        return self.default if value is None or value == "" else value
+
+    def __format__(self, spec):
+        return self.default
+
+
+class Domain:
+    def __init__(self, key: str, label: str, database: str, collection: str,
+                 vector_index: str = "vector_index_1", embed_template: str = "{name}",
+                 embed_fn: Optional[Callable[[Dict], str]] = None,
+                 describe_template: str = "{name}", projection: Optional[Dict] = None,
+                 assistant: str = "a helpful assistant", item_noun: str = "items",
+                 intents: bool = False, geo: bool = False, name_lookup: bool = False,
+                 rerank_boosts: bool = False):
+        self.key = key
+        self.label = label
+        self.database = database
+        self.collection = collection
+        self.vector_index = vector_index
+        # str.format templates over document fields, e.g. "{name} {address[street]}"
+        self.embed_template = embed_template
+        # ... or a function, for catalogs whose stored vectors were built by one
+        self.embed_fn = embed_fn
+        self.describe_template = describe_template
+        self.projection = projection or {"name": 1, "_id": 0}
+        self.assistant = assistant
+        self.item_noun = item_noun
+        # Restaurant-style follow-ups (address/price/rating), "near me" search
+        # and name resolution only make sense for some catalogs
+        self.intents = intents
+        self.geo = geo
+        self.name_lookup = name_lookup
+        # Star rating and requested attributes (outdoor seating, price, ...) in reranking
+        self.rerank_boosts = rerank_boosts
+
+    def embed_text(self, doc) -> str:
+        """Text a document of this domain is embedded from."""
+        if self.embed_fn is not None:
+            return self.embed_fn(doc)
+        return " ".join(self.embed_template.format_map(_Fields(doc)).split())
+
+    def describe(self, doc) -> str:
+        """One-line description of a search result for the prompt."""
+        return self.describe_template.format_map(_Fields(doc, default="N/A"))
+
+    def __repr__(self):
+        return f"Domain({self.key!r}, {self.database}.{self.collection})"
+
+
+_ARTICLE_PROJECTION = {"title": 1, "summary": 1, "source": 1, "published_at": 1, "tags": 1, "_id": 0}
+
+DOMAINS: Dict[str, Domain] = {}
+
+
+def register_domain(domain: Domain) -> Domain:
+    DOMAINS[domain.key] = domain
+    return domain
+
+
+DEFAULT_DOMAIN = register_domain(Domain(
+    "Restaurants", "Restaurants", "whatscooking", "restaurants",
+    vector_index="vector_index_1",
+    embed_fn=restaurant_embed_text,   # what reeebrand.py embedded the catalog from
+    describe_template=("{name} ({cuisine}), ⭐{stars} — "
+                       "Address: {address[street]}, {address[zipcode]} — "
+                       "Price Range: {priceRange} — "
+                       "Outdoor Seating: {OutdoorSeating} — "
+                       "Dogs Allowed: {DogsAllowed}"),
+    projection={"name": 1, "cuisine": 1, "address": 1, "stars": 1,
+                "priceRange": 1, "OutdoorSeating": 1, "DogsAllowed": 1, "_id": 0},
+    assistant="a helpful restaurant assistant",
+    item_noun="restaurants",
+    intents=True, geo=True, name_lookup=True, rerank_boosts=True,
+))
+for _key, _label, _collection, _assistant in (
+        ("AI", "AI & Tech", "ai_trends", "an AI and technology trends analyst"),
+        ("Sports", "Sports", "sports_trends", "a sports news analyst"),
+        ("Finance", "Finance", "finance_trends", "a markets and finance analyst")):
+    register_domain(Domain(
+        _key, _label, "trendwave", _collection,
+        vector_index=f"{_collection}_vector_index",
+        embed_template="{title} {summary} {tags}",
+        describe_template="{title} ({source}, {published_at}) — {summary}",
+        projection=_ARTICLE_PROJECTION,
+        assistant=_assistant,
+        item_noun="articles",
+    ))
+
+
+def get_domain(key: Optional[str]) -> Domain:
+    """The registered domain for ``key``, or the default (restaurants)."""
+    return DOMAINS.get(key or "", DEFAULT_DOMAIN)
+
+
+# -----------------------------------------------------------------------------
+#  Partitions
+# -----------------------------------------------------------------------------
+
+class Partition:
+    """A domain's collection handle and its lazily built in-memory indexes.
+
+    ``nbytes`` is measured once per index build; ``on_resize(partition, delta)``
+    is called with the change.
+    """
+
+    def __init__(self, domain: Domain, collection,
+                 on_resize: Optional[Callable[["Partition", int], None]] = None):
+        self.domain = domain
+        self.collection = collection
+        self.on_resize = on_resize
+        self.nbytes = 0
+        self._sizes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.names = (CatalogNameIndex(collection, on_built=lambda index: self._built("names", index))
+                      if domain.name_lookup else None)
+        self.geo = (CatalogGeoIndex(collection, on_built=lambda index: self._built("geo", index))
+                    if domain.geo else None)
+        self.last_used = time.monotonic()
+        self.dim_checked = False
+
+    def _built(self, kind: str, index):
+        size = index.nbytes
+        with self._lock:
+            delta = size - self._sizes.get(kind, 0)
+            self._sizes[kind] = size
+            self.nbytes += delta
+        if self.on_resize is not None:
+            self.on_resize(self, delta)
+
+
+class PartitionManager:
+    """Opens domain partitions on demand and keeps their indexes within ``budget_bytes``.
+
+    ``resolve(domain)`` returns the domain's collection (or ``None`` if it is
+    unavailable).  The default domain is never evicted.  The budget is checked
+    whenever a partition's index is (re)built, against a running total.
+    """
+
+    def __init__(self, resolve: Callable[[Domain], object], budget_bytes: int):
+        self.resolve = resolve
+        self.budget_bytes = budget_bytes
+        self._partitions: "OrderedDict[str, Partition]" = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def get(self, domain: Domain) -> Optional[Partition]:
+        with self._lock:
+            partition = self._partitions.get(domain.key)
+            if partition is None:
+                collection = self.resolve(domain)
+                if collection is None:
+                    return None
+                partition = Partition(domain, collection, on_resize=self._resized)
+                self._partitions[domain.key] = partition
+                logger.info("Opened search partition for domain %s", domain)
+            self._partitions.move_to_end(domain.key)
+            partition.last_used = time.monotonic()
+            return partition
+
+    def _resized(self, partition: Partition, delta: int):
+        key = partition.domain.key
+        with self._lock:
+            if self._partitions.get(key) is not partition:
+                return   # evicted while its index was building
+            self._total += delta
+            PARTITION_BYTES.set(partition.nbytes, domain=key)
+            self._enforce_budget(keep=key)
+
+    def _enforce_budget(self, keep: str):
+        for key in list(self._partitions):   # least recently used first
+            if self._total <= self.budget_bytes:
+                break
+            if key in (keep, DEFAULT_DOMAIN.key):
+                continue
+            size = self._partitions.pop(key).nbytes
+            self._total -= size
+            PARTITION_BYTES.set(0, domain=key)
+            PARTITION_EVICTIONS.inc(domain=key)
+            logger.info("Evicted search partition %s (%.1f MB) to stay within %.0f MB",
+                        key, size / 2 ** 20, self.budget_bytes / 2 ** 20)
+
+    def loaded(self):
+        with self._lock:
+            return list(self._partitions)
+
+    def __len__(self):
+        return len(self._partitions)
+
+    @property
+    def nbytes(self) -> int:
+        return self._total
@@ -0,0 +1,114 @@
+"""
+Dynamic micro-batching of embedding requests.
+
+Texts submitted by concurrent request threads are collected for a short window
+(or until ``max_batch`` texts are queued) and sent upstream as a single
+``embed_content(contents=[...])`` call; each caller then receives its own
+vector.  Under load this trades a few milliseconds of queueing for far fewer
+upstream calls against the embedding quota.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Sequence
+
+from services.telemetry import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+EmbedFn = Callable[[Sequence[str]], List[List[float]]]
+
+BATCH_SIZE = REGISTRY.histogram(
+    "trendwave_embed_batch_size",
+    "Number of texts sent per upstream embed call.",
+    labels=("batcher",),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 250),
+)
+BATCH_WAIT = REGISTRY.histogram(
+    "trendwave_embed_batch_wait_seconds",
+    "Time a text spent queued before its batch was sent.",
+    labels=("batcher",),
+)
+UPSTREAM_CALLS = REGISTRY.counter(
+    "trendwave_embed_upstream_calls_total",
+    "Upstream embed calls issued by a batcher.",
+    labels=("batcher",),
+)
+
+
+class EmbedBatcher:
+    """Collects texts from many threads and embeds them in batched calls."""
+
+    def __init__(self, embed_fn: EmbedFn, window_ms: float = 10, max_batch: int = 32,
+                 name: str = "default"):
+        self.embed_fn = embed_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.name = name
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    # -- public API -----------------------------------------------------------
+    def submit(self, text: str) -> Future:
+        fut: Future = Future()
+        if self.window <= 0:
+            # Batching disabled: embed inline on the caller's thread.
+            self._dispatch([(text, fut, time.perf_counter())])
+            return fut
+        self._ensure_started()
+        self._queue.put((text, fut, time.perf_counter()))
+        return fut
+
+    def embed(self, text: str, timeout: Optional[float] = None) -> List[float]:
+        return self.submit(text).result(timeout=timeout)
+
+    # -- worker ---------------------------------------------------------------
+    def _ensure_started(self):
+        # Started lazily so each gunicorn worker gets its own thread after fork.
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name=f"embed-batcher-{self.name}", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        # Every future in the batch is resolved whatever fails here, otherwise
+        # callers waiting without a timeout would hang and the thread would die.
+        try:
+            now = time.perf_counter()
+            for _, _, queued_at in batch:
+                BATCH_WAIT.observe(now - queued_at, batcher=self.name)
+            BATCH_SIZE.observe(len(batch), batcher=self.name)
+            UPSTREAM_CALLS.inc(batcher=self.name)
+            vectors = self.embed_fn([text for text, _, _ in batch])
+            if len(vectors) != len(batch):
+                raise RuntimeError(f"embed_fn returned {len(vectors)} vectors for {len(batch)} texts")
+            for (_, fut, _), vec in zip(batch, vectors):
+                if not fut.done():
+                    fut.set_result(vec)
+        except BaseException as exc:
+            logger.error("Batched embed of %d texts failed: %s", len(batch), exc)
+            for _, fut, _ in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+            if not isinstance(exc, Exception):
+                raise
@@ -0,0 +1,70 @@
+"""
+Embedding dimensionality helpers.
+
+``gemini-embedding-001`` is trained Matryoshka-style: the leading components of
+its 3072-d output carry most of the signal, so vectors can be cut to a prefix
+(e.g. 768) and renormalised with little loss in retrieval quality.  The API can
+do the truncation (``output_dimensionality``) but does not renormalise, so
+reduced vectors always go through ``truncate_normalize`` as well.
+
+Stored documents record the size of their vector in ``embedding_dim``.
+``check_catalog_dim`` compares it with the query size when a domain's search
+partition is opened, and ``migrate_embeddings.py`` uses it to resume.
+"""
+import logging
+import os
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FULL_DIM = 3072
+DIM_FIELD = "embedding_dim"
+
+
+def configured_dim() -> Optional[int]:
+    """Output dimensionality from ``EMBED_DIM``; ``None`` means the model's full size."""
+    value = os.getenv("EMBED_DIM", "").strip()
+    if not value:
+        return None
+    dim = int(value)
+    return None if dim >= FULL_DIM else dim
+
+
+def truncate_normalize(vec: Sequence[float], dim: Optional[int]) -> List[float]:
+    """Keep the first ``dim`` components and rescale to unit length.
+
+    With ``dim=None`` the vector is returned unchanged.
+    """
+    if not dim:
+        return list(vec)
+    arr = np.asarray(vec[:dim], dtype=np.float64)
+    norm = np.linalg.norm(arr)
+    return (arr / norm if norm else arr).tolist()
+
+
+def check_catalog_dim(collection, dim: int, label: str = "catalog") -> bool:
+    """False (and an error logged) if documents in ``collection`` store vectors
+    of another size than ``dim``, the size queries are embedded with.
+
+    Documents without ``embedding_dim`` (written before it existed) are not checked.
+    """
+    try:
+        doc = collection.find_one({DIM_FIELD: {"$exists": True, "$ne": dim}},
+                                  {"_id": 1, DIM_FIELD: 1}, max_time_ms=2000)
+    except Exception as exc:
+        logger.warning("Could not check the embedding size of %s: %s", label, exc)
+        return True
+    if doc is None:
+        return True
+    logger.error("%s has %s-d embeddings but queries are embedded with %d dimensions; "
+                 "finish `migrate_embeddings.py --dim %d` or set EMBED_DIM to match",
+                 label, doc.get(DIM_FIELD), dim, dim)
+    return False
+
+
+def restaurant_embed_text(doc) -> str:
+    """Text embedded for a restaurant document (see reeebrand.py)."""
+    return (f"{doc.get('name', '')} {doc.get('cuisine', '')} "
+            f"{(doc.get('address') or {}).get('street', '')} {doc.get('borough', '')}")
@@ -0,0 +1,209 @@
+"""
+Location-aware retrieval helpers.
+
+``GeoIndex`` is an in-memory uniform grid over restaurant coordinates: a
+radius query only visits the grid cells overlapping the circle and computes
+exact haversine distances for the restaurants in them, so "near me" lookups
+touch a few hundred points instead of the whole catalog.  ``CatalogGeoIndex``
+builds it lazily from MongoDB, rebuilds it in the background, and falls back
+to a ``$nearSphere`` query on the ``location`` 2dsphere index (see
+``ensure_geo_index``) when it is unavailable.
+
+Coordinates are read from GeoJSON ``location`` points or the legacy
+``address.coord`` pair, both ``[longitude, latitude]``.
+"""
+import logging
+import math
+import re
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from services.cache import Refreshing
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+_KM_PER_DEG_LAT = 111.32
+
+# Messages asking for something close to the user.  "close" only counts with
+# what it is close to, so "when does it close" is not a location query, and
+# "near" only with the user as the reference point.
+_SELF = r"(me|here|us|where i am)"
+_NEARBY_RE = re.compile(
+    rf"\b(near {_SELF}|nearby|nearest|closest|close ?by|close to {_SELF}|"
+    r"around here|around me|walking distance|in my area)\b",
+    re.IGNORECASE,
+)
+# ... unless they name another place: "pizza near Union Square", "closest bar to the Met"
+_ELSEWHERE_RE = re.compile(
+    rf"\b(near|close to|walking distance (of|from)|(nearest|closest)\b.*?\b(to|near))\s+(?!{_SELF}\b)\w",
+    re.IGNORECASE,
+)
+
+
+def is_nearby_query(message: str) -> bool:
+    """True if ``message`` asks for places near the user (and so needs their location)."""
+    message = message or ""
+    return bool(_NEARBY_RE.search(message)) and not _ELSEWHERE_RE.search(message)
+
+
+def parse_location(value) -> Optional[Tuple[float, float]]:
+    """``(lat, lng)`` from a client ``{"lat": .., "lng": ..}`` object, or ``None`` if invalid."""
+    if not isinstance(value, dict):
+        return None
+    try:
+        lat = float(value.get("lat"))
+        lng = float(value.get("lng", value.get("lon")))
+    except (TypeError, ValueError):
+        return None
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lng <= 180.0):
+        return None
+    return lat, lng
+
+
+def doc_coordinates(doc: Dict) -> Optional[Tuple[float, float]]:
+    """``(lat, lng)`` of a restaurant document, if it has coordinates."""
+    coords = (doc.get("location") or {}).get("coordinates") or (doc.get("address") or {}).get("coord")
+    if not coords or len(coords) != 2:
+        return None
+    try:
+        lng, lat = float(coords[0]), float(coords[1])
+    except (TypeError, ValueError):
+        return None
+    return lat, lng
+
+
+def haversine_km(lat: float, lng: float, lats, lngs) -> np.ndarray:
+    """Great-circle distances in km from one point to arrays of points."""
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def proximity(distances_km, radius_km: float) -> np.ndarray:
+    """Distance decay in [0, 1]: 1 at the user's location, ~0.37 at ``radius_km``."""
+    return np.exp(-np.asarray(distances_km, dtype=np.float64) / max(radius_km, 1e-6))
+
+
+class GeoIndex:
+    def __init__(self, cell_km: float = 0.5):
+        self.cell_km = cell_km
+        self.ids: List[object] = []
+        self._lats = np.empty(0)
+        self._lngs = np.empty(0)
+        self._cells: Dict[Tuple[int, int], np.ndarray] = {}
+        self._dlat = cell_km / _KM_PER_DEG_LAT
+        self._dlng = self._dlat
+        self.built_at = 0.0
+
+    def build(self, docs: Iterable[Dict]) -> "GeoIndex":
+        """Index ``docs`` (dicts with ``_id`` and coordinates)."""
+        ids, lats, lngs = [], [], []
+        for doc in docs:
+            point = doc_coordinates(doc)
+            if point is None:
+                continue
+            ids.append(doc.get("_id"))
+            lats.append(point[0])
+            lngs.append(point[1])
+        self.ids = ids
+        self._lats = np.asarray(lats, dtype=np.float64)
+        self._lngs = np.asarray(lngs, dtype=np.float64)
+        # Cells are square in km at the catalog's mean latitude (fine at city scale)
+        mean_lat = float(self._lats.mean()) if ids else 0.0
+        self._dlng = self._dlat / max(math.cos(math.radians(mean_lat)), 0.01)
+        buckets = defaultdict(list)
+        for row, cell in enumerate(zip(self._cell_rows(self._lats), self._cell_cols(self._lngs))):
+            buckets[cell].append(row)
+        self._cells = {cell: np.asarray(rows, dtype=np.int64) for cell, rows in buckets.items()}
+        self.built_at = time.time()
+        return self
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory footprint (for domain partition budgets)."""
+        cells = sum(rows.nbytes for rows in self._cells.values())
+        return self._lats.nbytes + self._lngs.nbytes + cells + 64 * len(self.ids)
+
+    def _cell_rows(self, lats):
+        return np.floor(np.asarray(lats) / self._dlat).astype(np.int64).tolist()
+
+    def _cell_cols(self, lngs):
+        return np.floor(np.asarray(lngs) / self._dlng).astype(np.int64).tolist()
+
+    def nearby(self, lat: float, lng: float, radius_km: float,
+               limit: Optional[int] = None) -> List[Tuple[object, float]]:
+        """Restaurants within ``radius_km`` of ``(lat, lng)`` as ``(id, km)``, nearest first."""
+        if not self.ids:
+            return []
+        reach = int(math.ceil(radius_km / self.cell_km))
+        row0, col0 = self._cell_rows([lat])[0], self._cell_cols([lng])[0]
+        parts = [self._cells[(r, c)]
+                 for r in range(row0 - reach, row0 + reach + 1)
+                 for c in range(col0 - reach, col0 + reach + 1)
+                 if (r, c) in self._cells]
+        if not parts:
+            return []
+        rows = np.concatenate(parts)
+        dist = haversine_km(lat, lng, self._lats[rows], self._lngs[rows])
+        keep = dist <= radius_km
+        rows, dist = rows[keep], dist[keep]
+        order = np.argsort(dist, kind="stable")[:limit]
+        return [(self.ids[r], float(d)) for r, d in zip(rows[order], dist[order])]
+
+
+def ensure_geo_index(collection):
+    """Create the 2dsphere index on ``location`` used by the ``$nearSphere`` fallback."""
+    return collection.create_index([("location", "2dsphere")], name="location_2dsphere")
+
+
+class CatalogGeoIndex:
+    """``GeoIndex`` over a MongoDB collection, rebuilt in the background every ``ttl`` seconds."""
+
+    def __init__(self, collection, ttl: float = 3600.0, retry_after: float = 60.0,
+                 on_built: Optional[Callable[[GeoIndex], None]] = None):
+        self.collection = collection
+        self._index = Refreshing(self._build, ttl, retry_after, name="restaurant geo index",
+                                 on_built=on_built)
+
+    @property
+    def built(self) -> Optional[GeoIndex]:
+        """The current index, without building it."""
+        return self._index.value
+
+    def get(self) -> Optional[GeoIndex]:
+        return self._index.get()
+
+    def _build(self) -> GeoIndex:
+        started = time.perf_counter()
+        index = GeoIndex().build(self.collection.find({}, {"_id": 1, "location": 1, "address.coord": 1}))
+        logger.info("Built restaurant geo index: %d points in %.0f ms",
+                    len(index), (time.perf_counter() - started) * 1000)
+        return index
+
+    def nearby(self, lat: float, lng: float, radius_km: float, limit: int) -> List[Tuple[object, float]]:
+        index = self.get()
+        if index:
+            return index.nearby(lat, lng, radius_km, limit)
+        # No in-memory index (build failed or no coordinates): ask the 2dsphere index
+        cursor = self.collection.find(
+            {"location": {"$nearSphere": {
+                "$geometry": {"type": "Point", "coordinates": [lng, lat]},
+                "$maxDistance": radius_km * 1000,
+            }}},
+            {"_id": 1, "location": 1},
+        ).limit(limit)
+        hits = []
+        for doc in cursor:
+            point = doc_coordinates(doc)
+            if point is not None:
+                hits.append((doc["_id"], float(haversine_km(lat, lng, [point[0]], [point[1]])[0])))
+        return hits
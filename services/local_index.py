@@ -0,0 +1,164 @@
+"""
+In-process vector indexes over restaurant embeddings.
+
+All indexes store L2-normalised vectors and score by cosine similarity, so their
+results are directly comparable with each other and with exact search:
+
+* ``ExactIndex``     – brute-force float32 matrix product (the recall baseline).
+* ``QuantizedIndex`` – int8 scalar quantisation, ~4x less memory than float32.
+* ``IVFIndex``       – inverted-file ANN: k-means coarse partitions, only the
+  ``nprobe`` nearest partitions are scanned per query.
+
+Each index exposes ``build(ids, vectors)``, ``search(query, k)``,
+``search_batch(queries, k)`` and ``nbytes``.
+"""
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+Hit = Tuple[object, float]
+
+
+def normalize(vectors) -> np.ndarray:
+    """Return ``vectors`` as a float32 array with unit-length rows."""
+    mat = np.asarray(vectors, dtype=np.float32)
+    if mat.ndim == 1:
+        norm = np.linalg.norm(mat)
+        return mat / norm if norm else mat
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    return mat / np.where(norms == 0, 1, norms)
+
+
+def topk(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` highest scores along the last axis, best first."""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+    part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    part_scores = np.take_along_axis(scores, part, axis=-1)
+    order = np.argsort(-part_scores, axis=-1, kind="stable")
+    return np.take_along_axis(part, order, axis=-1)
+
+
+class ExactIndex:
+    name = "exact"
+
+    def __init__(self):
+        self.ids: List[object] = []
+        self.matrix = np.empty((0, 0), dtype=np.float32)
+
+    def build(self, ids: Sequence, vectors, normalized: bool = False) -> "ExactIndex":
+        """Index ``vectors``; with ``normalized=True`` a float32 matrix of unit
+        rows is used as is, without a copy."""
+        self.ids = list(ids)
+        self.matrix = np.asarray(vectors, dtype=np.float32) if normalized else normalize(vectors)
+        return self
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes
+
+    def scores(self, queries) -> np.ndarray:
+        return normalize(queries) @ self.matrix.T
+
+    def search_batch(self, queries, k: int) -> List[List[Hit]]:
+        if not self.ids:
+            return [[] for _ in range(len(queries))]
+        scores = self.scores(queries)
+        idx = topk(scores, k)
+        return [[(self.ids[j], float(scores[i, j])) for j in row] for i, row in enumerate(idx)]
+
+    def search(self, query, k: int) -> List[Hit]:
+        return self.search_batch(np.asarray(query)[None, :], k)[0]
+
+
+class QuantizedIndex(ExactIndex):
+    """int8 codes with one float32 scale per vector."""
+    name = "int8"
+
+    # Rows dequantised at a time, bounds the temporary float32 buffer.
+    chunk_rows = 16384
+
+    def build(self, ids, vectors) -> "QuantizedIndex":
+        self.ids = list(ids)
+        mat = normalize(vectors)
+        scale = np.abs(mat).max(axis=1, keepdims=True) / 127.0
+        scale[scale == 0] = 1.0
+        self.codes = np.round(mat / scale).astype(np.int8)
+        self.scale = scale.astype(np.float32).ravel()
+        self.matrix = np.empty((0, mat.shape[1]), dtype=np.float32)
+        return self
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.scale.nbytes
+
+    def scores(self, queries) -> np.ndarray:
+        q = normalize(queries)
+        if q.ndim == 1:
+            q = q[None, :]
+        out = np.empty((q.shape[0], self.codes.shape[0]), dtype=np.float32)
+        for start in range(0, self.codes.shape[0], self.chunk_rows):
+            block = self.codes[start:start + self.chunk_rows].astype(np.float32)
+            out[:, start:start + len(block)] = (q @ block.T) * self.scale[start:start + len(block)]
+        return out
+
+
+class IVFIndex(ExactIndex):
+    """Inverted-file index: scan only the ``nprobe`` closest k-means cells."""
+    name = "ivf"
+
+    def __init__(self, nlist: int = 0, nprobe: int = 8, iterations: int = 10, seed: int = 0):
+        super().__init__()
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.seed = seed
+
+    def build(self, ids, vectors) -> "IVFIndex":
+        mat = normalize(vectors)
+        n = mat.shape[0]
+        nlist = self.nlist or max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(self.seed)
+
+        # Spherical k-means on a sample keeps build time roughly linear in n.
+        sample = mat[rng.choice(n, size=min(n, nlist * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=min(nlist, len(sample)), replace=False)]
+        for _ in range(self.iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            empty = ~np.any(sums, axis=1)
+            sums[empty] = centroids[empty]
+            centroids = normalize(sums)
+
+        assign = np.argmax(mat @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        self.centroids = centroids
+        self.matrix = mat[order]
+        self.ids = [ids[i] for i in order]
+        self.offsets = np.searchsorted(assign[order], np.arange(len(centroids) + 1))
+        return self
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes + self.centroids.nbytes + self.offsets.nbytes
+
+    def search_batch(self, queries, k: int) -> List[List[Hit]]:
+        q = normalize(queries)
+        if q.ndim == 1:
+            q = q[None, :]
+        probes = topk(q @ self.centroids.T, self.nprobe)
+        results = []
+        for qi, cells in zip(q, probes):
+            rows = np.concatenate([np.arange(self.offsets[c], self.offsets[c + 1]) for c in cells])
+            if rows.size == 0:
+                results.append([])
+                continue
+            sims = self.matrix[rows] @ qi
+            best = topk(sims, k)
+            results.append([(self.ids[rows[j]], float(sims[j])) for j in best])
+        return results
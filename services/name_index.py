@@ -0,0 +1,154 @@
+"""
+Restaurant name resolution.
+
+``NameIndex`` is an in-memory inverted index over the normalised words of every
+restaurant name in the catalog, plus a character-trigram index over the word
+vocabulary for typo-tolerant lookups.  ``resolve(message)`` returns the
+restaurants a chat message refers to by name, scored by the IDF-weighted share
+of each name's words that appear in the message, in microseconds per message.
+"""
+import logging
+import math
+import re
+import time
+import unicodedata
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from services.cache import Refreshing
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_name(text: str) -> str:
+    """Lowercase, strip accents and punctuation: "Café Habana!" -> "cafe habana"."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(_WORD_RE.findall(text.lower().replace("'", "")))
+
+
+def _trigrams(word: str) -> Set[str]:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    def __init__(self, min_score: float = 0.6, fuzzy_threshold: float = 0.5, max_df: float = 0.01):
+        self.min_score = min_score
+        self.fuzzy_threshold = fuzzy_threshold
+        # A name only counts as mentioned if at least one matched word is rarer
+        # than this share of the catalog ("pizza" alone never identifies one).
+        self.max_df = max_df
+        self.names: Dict[object, str] = {}                 # id -> display name
+        self._tokens: Dict[object, Tuple[str, ...]] = {}   # id -> name words
+        self._postings: Dict[str, Set[object]] = defaultdict(set)
+        self._grams: Dict[str, Set[str]] = defaultdict(set)
+        self._idf: Dict[str, float] = {}
+        self.built_at = 0.0
+
+    def build(self, docs: Iterable[Dict]) -> "NameIndex":
+        """Index ``docs`` (dicts with ``_id`` and ``name``)."""
+        for doc in docs:
+            name = doc.get("name")
+            if not name:
+                continue
+            key = doc.get("_id", name)
+            tokens = tuple(normalize_name(name).split())
+            if not tokens:
+                continue
+            self.names[key] = name
+            self._tokens[key] = tokens
+            for tok in set(tokens):
+                self._postings[tok].add(key)
+        n = max(1, len(self.names))
+        self._distinctive_df = max(2, int(n * self.max_df))
+        for tok, ids in self._postings.items():
+            self._idf[tok] = math.log(1 + n / len(ids))
+            for gram in _trigrams(tok):
+                self._grams[gram].add(tok)
+        self.built_at = time.time()
+        return self
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def nbytes(self) -> int:
+        """Rough memory footprint (for domain partition budgets)."""
+        postings = sum(len(ids) for ids in self._postings.values())
+        grams = sum(len(toks) for toks in self._grams.values())
+        return 200 * len(self.names) + 80 * (postings + grams)
+
+    def _expand(self, word: str) -> List[Tuple[str, float]]:
+        """Vocabulary words matching ``word``, exactly or within a typo."""
+        if word in self._postings:
+            return [(word, 1.0)]
+        if len(word) < 4:
+            return []
+        grams = _trigrams(word)
+        overlap: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for tok in self._grams.get(gram, ()):
+                overlap[tok] += 1
+        matches = []
+        for tok, shared in overlap.items():
+            sim = shared / (len(grams) + len(_trigrams(tok)) - shared)
+            if sim >= self.fuzzy_threshold:
+                matches.append((tok, sim))
+        return matches
+
+    def resolve(self, message: str, limit: int = 5) -> List[Tuple[object, float]]:
+        """Restaurants named in ``message`` as ``(id, score)``, best first."""
+        hits: Dict[str, float] = {}   # vocabulary word -> best match similarity
+        for word in set(normalize_name(message).split()):
+            for tok, sim in self._expand(word):
+                hits[tok] = max(hits.get(tok, 0.0), sim)
+
+        # Only names containing a distinctive matched word are candidates, which
+        # keeps common words ("pizza", "cafe") from fanning out over the catalog.
+        keys = set()
+        for tok in hits:
+            postings = self._postings[tok]
+            if len(postings) <= self._distinctive_df:
+                keys |= postings
+
+        scored = []
+        for key in keys:
+            tokens = set(self._tokens[key])
+            total = sum(self._idf[t] for t in tokens)
+            score = sum(self._idf[t] * hits[t] for t in tokens if t in hits) / total
+            if score >= self.min_score:
+                scored.append((key, score))
+        scored.sort(key=lambda kv: (-kv[1], -len(self._tokens[kv[0]])))
+        return scored[:limit]
+
+    def resolve_names(self, message: str, limit: int = 5) -> Set[str]:
+        """Normalised names of the restaurants referred to in ``message``."""
+        return {normalize_name(self.names[key]) for key, _ in self.resolve(message, limit)}
+
+
+class CatalogNameIndex:
+    """``NameIndex`` over a MongoDB collection, rebuilt in the background every ``ttl`` seconds."""
+
+    def __init__(self, collection, ttl: float = 3600.0, retry_after: float = 60.0,
+                 on_built: Optional[Callable[[NameIndex], None]] = None):
+        self.collection = collection
+        self._index = Refreshing(self._build, ttl, retry_after, name="restaurant name index",
+                                 on_built=on_built)
+
+    @property
+    def built(self) -> Optional[NameIndex]:
+        """The current index, without building it."""
+        return self._index.value
+
+    def get(self) -> Optional[NameIndex]:
+        return self._index.get()
+
+    def _build(self) -> NameIndex:
+        started = time.perf_counter()
+        index = NameIndex().build(self.collection.find({}, {"_id": 1, "name": 1}))
+        logger.info("Built restaurant name index: %d names in %.0f ms",
+                    len(index), (time.perf_counter() - started) * 1000)
+        return index
@@ -0,0 +1,183 @@
+"""
+On-demand diagnostics for a live worker process.
+
+Nothing here runs until an admin endpoint (``routes/admin.py``) asks for it:
+
+* ``sample_stacks`` samples every thread's Python stack with
+  ``sys._current_frames()`` for a few seconds and returns them in the
+  collapsed format read by ``flamegraph.pl``, speedscope and inferno;
+* ``allocation_snapshot`` traces allocations with ``tracemalloc`` for a few
+  seconds and returns the largest allocation sites;
+* ``cache_sizes`` reports entries and approximate memory of the in-process
+  caches registered with ``register_cache``.
+
+Only one stack or allocation capture runs per process at a time.
+"""
+import functools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Mapping, Sized
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from services.cache import LRUCache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_capture_lock = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    """Another capture is already running in this process."""
+
+
+@functools.lru_cache(maxsize=4096)
+def _source(filename: str):
+    """``(short path, is application code)`` for a code object's file name."""
+    path = os.path.abspath(filename) if not filename.startswith("<") else filename
+    for marker in ("site-packages" + os.sep, "dist-packages" + os.sep):
+        if marker in path:
+            return path.split(marker, 1)[1], False
+    if path.startswith(ROOT + os.sep):
+        return os.path.relpath(path, ROOT), True
+    # Standard library and frozen modules
+    return os.path.basename(path), False
+
+
+def _collapse(frame, app_only: bool) -> Optional[str]:
+    labels, in_app = [], False
+    while frame is not None:
+        code = frame.f_code
+        path, is_app = _source(code.co_filename)
+        in_app = in_app or is_app
+        labels.append(f"{code.co_name} ({path})")
+        frame = frame.f_back
+    if app_only and not in_app:
+        return None
+    return ";".join(reversed(labels))
+
+
+def sample_stacks(seconds: float, interval: float = 0.01, app_only: bool = True) -> Dict:
+    """Sample all other threads' stacks every ``interval`` for ``seconds``.
+
+    With ``app_only``, stacks without a frame from this repository (idle
+    worker threads, gunicorn's own loop) are dropped.  ``collapsed`` holds one
+    ``"root;...;leaf count"`` line per distinct stack, most frequent first.
+    """
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfilerBusy("a profile is already running in this process")
+    try:
+        me = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = _collapse(frame, app_only)
+                if stack:
+                    stacks[stack] += 1
+            samples += 1
+            time.sleep(interval)
+    finally:
+        _capture_lock.release()
+    return {
+        "samples": samples,
+        "collapsed": "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()),
+    }
+
+
+def _stat(stat, diff: bool) -> Dict:
+    frame = stat.traceback[0]
+    row = {"file": _source(frame.filename)[0], "line": frame.lineno,
+           "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+    if diff:
+        row.update(size_diff_kb=round(stat.size_diff / 1024, 1), count_diff=stat.count_diff)
+    return row
+
+
+def allocation_snapshot(seconds: float, top: int = 25, group: str = "lineno") -> Dict:
+    """Largest live allocation sites after tracing for ``seconds``.
+
+    If ``tracemalloc`` was not already tracing (``PYTHONTRACEMALLOC``), it is
+    started for the window only, so ``top`` covers memory allocated during it
+    and still alive; ``growth`` is the change over the window either way.
+    """
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfilerBusy("a profile is already running in this process")
+    started = not tracemalloc.is_tracing()
+    try:
+        if started:
+            tracemalloc.start()
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__),
+                  tracemalloc.Filter(False, "<frozen importlib._bootstrap>")]
+        before = tracemalloc.take_snapshot().filter_traces(ignore)
+        time.sleep(seconds)
+        after = tracemalloc.take_snapshot().filter_traces(ignore)
+        traced, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started:
+            tracemalloc.stop()
+        _capture_lock.release()
+    return {
+        "tracing_started": started,
+        "traced_mb": round(traced / 2 ** 20, 2),
+        "peak_mb": round(peak / 2 ** 20, 2),
+        "top": [_stat(s, diff=False) for s in after.statistics(group)[:top]],
+        "growth": [_stat(s, diff=True) for s in after.compare_to(before, group)[:top]],
+    }
+
+# -----------------------------------------------------------------------------
+#  In-process caches
+# -----------------------------------------------------------------------------
+
+_caches: Dict[str, Callable[[], object]] = {}
+
+
+def register_cache(name: str, get: Callable[[], object]):
+    """Report ``get()`` (an ``LRUCache``, container, or object with ``nbytes``) in ``cache_sizes``."""
+    _caches[name] = get
+
+
+def deep_sizeof(obj, _seen=None) -> int:
+    """Approximate bytes held by ``obj`` and the containers inside it."""
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return max(sys.getsizeof(obj), obj.nbytes)   # views do not own their data
+    size = sys.getsizeof(obj)
+    if isinstance(obj, Mapping):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in list(obj.items()))
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in list(obj))
+    return size
+
+
+def cache_stats(obj) -> Dict:
+    if obj is None:
+        return {"entries": 0, "bytes": 0}
+    if isinstance(obj, LRUCache):
+        return {"entries": len(obj), "maxsize": obj.maxsize, "hits": obj.hits,
+                "misses": obj.misses, "bytes": deep_sizeof(obj.items())}
+    stats = {"entries": len(obj)} if isinstance(obj, Sized) else {}
+    stats["bytes"] = obj.nbytes if hasattr(obj, "nbytes") else deep_sizeof(obj)
+    return stats
+
+
+def cache_sizes() -> Dict[str, Dict]:
+    """Entries and approximate memory of every registered cache."""
+    out = {}
+    for name, get in sorted(_caches.items()):
+        try:
+            out[name] = cache_stats(get())
+        except Exception as exc:
+            out[name] = {"error": str(exc)}
+    return out
@@ -0,0 +1,204 @@
+"""
+Privacy-scrubbed log of answered chat queries.
+
+Every answered ``/api/chat`` request appends one JSON line to
+``QUERY_LOG_PATH`` (unset disables the log)::
+
+    {"ts": "2024-05-01T12:00:00", "domain": "Restaurants", "query": "cheap pizza in brooklyn",
+     "intent": null, "follow_up": false, "nearby": false, "path": "llm",
+     "candidates": ["5eb3d668b31de5d588f4292a", ...],
+     "stages_ms": {"history_read": 12.1, "embed": 95.3, ...}, "total_ms": 1480.2}
+
+Nothing identifies the user: no user id, location or answer is written, and
+e-mail addresses, URLs, phone numbers and long digit runs in the query are
+masked.  Lines are written from a background thread (``QueueHandler``), so the
+request never waits on the disk, and the file rotates by size.  All gunicorn
+workers share the file; writes and rollovers hold an ``flock`` on a sidecar
+lock file.
+
+``top_queries`` reads the current and rotated files back for the cache
+warm-up (``services/warmup.py``).
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import re
+from collections import Counter
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process dev server only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAX_QUERY_CHARS = 256
+
+# -----------------------------------------------------------------------------
+#  Scrubbing
+# -----------------------------------------------------------------------------
+
+_SCRUB_RULES = [
+    (re.compile(r"[\w.+-]+@[\w-]+(\.[\w-]+)+"), "<email>"),
+    (re.compile(r"\b(https?://|www\.)\S+"), "<url>"),
+    (re.compile(r"\+?\d[\d\s().-]{7,}\d"), "<phone>"),
+    # Zip codes and house numbers stay; card, account and id numbers go
+    (re.compile(r"\d{6,}"), "<number>"),
+]
+
+
+def scrub(text: str) -> str:
+    """Lower-cased, whitespace-normalized ``text`` with personal data masked."""
+    text = " ".join((text or "").lower().split())
+    for pattern, mask in _SCRUB_RULES:
+        text = pattern.sub(mask, text)
+    return text[:MAX_QUERY_CHARS]
+
+# -----------------------------------------------------------------------------
+#  Writing
+# -----------------------------------------------------------------------------
+
+class _SharedRotatingFileHandler(RotatingFileHandler):
+    """``RotatingFileHandler`` that several processes can append to.
+
+    Each emit holds an exclusive lock on ``<path>.lock`` and reopens the file
+    first if another process has rotated it away.
+    """
+
+    def __init__(self, filename, max_bytes, backups):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backups,
+                         encoding="utf-8", delay=True)
+        self._lock_file = open(self.baseFilename + ".lock", "a") if fcntl else None
+
+    def _rotated_elsewhere(self) -> bool:
+        try:
+            return os.fstat(self.stream.fileno()).st_ino != os.stat(self.baseFilename).st_ino
+        except FileNotFoundError:
+            return True
+
+    def emit(self, record):
+        if self._lock_file is None:
+            return super().emit(record)
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            if self.stream is not None and self._rotated_elsewhere():
+                self.stream.close()
+                self.stream = None
+            super().emit(record)
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def close(self):
+        super().close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+class QueryLog:
+    """Appends JSON records to a rotating file from a background thread."""
+
+    def __init__(self, path: str, max_bytes: int = 10 * 2 ** 20, backups: int = 5):
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._handler = _SharedRotatingFileHandler(self.path, max_bytes, backups)
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+        self._queue = queue.Queue(maxsize=10000)
+        self._listener = QueueListener(self._queue, self._handler)
+        self._logger = logging.Logger("trendwave.query_log")
+        self._logger.addHandler(_DroppingQueueHandler(self._queue))
+        self._listener.start()
+
+    def write(self, record: Dict):
+        self._logger.info(json.dumps(record, separators=(",", ":"), default=str))
+
+    def close(self):
+        self._listener.stop()
+        self._handler.close()
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """Drops records instead of blocking when the writer thread falls behind."""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def init_app(app):
+    """Open ``QUERY_LOG_PATH`` (if set) as ``app.extensions["query_log"]``."""
+    path = app.config.get("QUERY_LOG_PATH")
+    if not path:
+        return None
+    try:
+        query_log = QueryLog(path, int(app.config["QUERY_LOG_MAX_MB"] * 2 ** 20),
+                             app.config["QUERY_LOG_BACKUPS"])
+    except OSError as exc:
+        logger.error("Query log disabled, cannot open %s: %s", path, exc)
+        return None
+    app.extensions["query_log"] = query_log
+    atexit.register(query_log.close)   # flush queued lines on shutdown
+    logger.info("Logging chat queries to %s", query_log.path)
+    return query_log
+
+
+def query_record(domain: str, query: str, intent: Optional[str], follow_up: bool, nearby: bool,
+                 path: str, candidates: Sequence[Dict], stage_timings: Dict[str, float],
+                 total_s: Optional[float]) -> Dict:
+    """The log line for one answered chat request (timings in seconds)."""
+    return {
+        "ts": datetime.utcnow().isoformat(timespec="seconds"),
+        "domain": domain,
+        "query": scrub(query),
+        "intent": intent,
+        "follow_up": follow_up,
+        "nearby": nearby,
+        "path": path,
+        "candidates": [str(c["_id"]) for c in candidates or () if c.get("_id") is not None],
+        "stages_ms": {stage: round(s * 1000, 1) for stage, s in (stage_timings or {}).items()},
+        "total_ms": round(total_s * 1000, 1) if total_s is not None else None,
+    }
+
+# -----------------------------------------------------------------------------
+#  Reading
+# -----------------------------------------------------------------------------
+
+def log_files(path: str) -> List[str]:
+    """The log and its rotated backups, oldest first."""
+    path = os.path.abspath(path)
+    backups = [p for p in glob.glob(path + ".*") if p.rsplit(".", 1)[-1].isdigit()]
+    backups.sort(key=lambda p: int(p.rsplit(".", 1)[-1]), reverse=True)
+    return backups + ([path] if os.path.exists(path) else [])
+
+
+def read_records(path: str) -> Iterator[Dict]:
+    """Records from the log and its backups; malformed lines are skipped."""
+    for name in log_files(path):
+        with open(name, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def top_queries(path: str, n: int) -> List[Tuple[str, str, int]]:
+    """The ``n`` most frequent replayable queries as ``(domain, query, count)``.
+
+    Follow-ups and "near me" searches depend on the conversation or the
+    user's location, so only standalone searches are counted.
+    """
+    counts = Counter(
+        (r.get("domain"), r["query"])
+        for r in read_records(path)
+        if r.get("query") and not r.get("follow_up") and not r.get("nearby")
+    )
+    return [(domain, query, count) for (domain, query), count in counts.most_common(n)]
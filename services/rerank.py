@@ -0,0 +1,139 @@
+"""
+Post-retrieval reranking and diversification.
+
+``$vectorSearch`` orders candidates by similarity alone, so a query for "pizza"
+tends to fill every slot with near-identical pizzerias (often the same chain).
+``rerank`` over-fetched candidates in two vectorised steps:
+
+1. relevance = blend of similarity, star rating and how many attributes the
+   query asks for that the restaurant has (outdoor seating, dogs, price, cuisine),
+   optionally mixed with proximity for "near me" searches.  Catalogs without
+   ratings or those attributes (``boosts=False``) rank by similarity alone;
+2. maximal marginal relevance (MMR) over the candidate embedding matrix picks
+   ``k`` results, each time penalising similarity to what is already chosen.
+   Restaurants with the same name count as identical.
+"""
+import re
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from services.local_index import normalize
+from services.name_index import normalize_name
+
+# Weights of the relevance components (they sum to 1)
+SIMILARITY_WEIGHT = 0.7
+STARS_WEIGHT = 0.15
+ATTRIBUTE_WEIGHT = 0.15
+
+
+def _price_level(c: Dict) -> Optional[int]:
+    price = c.get("priceRange")
+    if isinstance(price, (int, float)):
+        return int(price)
+    if isinstance(price, str) and price.strip("$ ") == "":
+        return len(price.strip()) or None
+    return None
+
+
+# Attributes a query can ask for, and how a candidate satisfies them
+_ATTRIBUTE_RULES = [
+    (re.compile(r"\b(outdoors?|outside|patio|terrace|al fresco)\b"),
+     lambda c: c.get("OutdoorSeating") is True),
+    (re.compile(r"\b(dogs?|pets?|dog[- ]friendly)\b"),
+     lambda c: c.get("DogsAllowed") is True),
+    (re.compile(r"\b(cheap|budget|inexpensive|affordable)\b"),
+     lambda c: (_price_level(c) or 99) <= 2),
+    (re.compile(r"\b(upscale|fancy|fine dining|luxury|expensive)\b"),
+     lambda c: (_price_level(c) or 0) >= 3),
+]
+
+
+def attribute_scores(query: str, candidates: Sequence[Dict]) -> np.ndarray:
+    """Share of the attributes asked for in ``query`` that each candidate has.
+
+    The candidate's cuisine appearing in the query counts as one more attribute.
+    """
+    text = (query or "").lower()
+    rules = [match for pattern, match in _ATTRIBUTE_RULES if pattern.search(text)]
+    words = set(re.findall(r"[a-z]+", text))
+    hits = np.zeros(len(candidates))
+    for i, c in enumerate(candidates):
+        cuisine = set(re.findall(r"[a-z]+", str(c.get("cuisine", "")).lower()))
+        hits[i] = sum(match(c) for match in rules) + bool(cuisine & words)
+    return hits / (len(rules) + 1)
+
+
+def star_scores(candidates: Sequence[Dict]) -> np.ndarray:
+    """Stars scaled to [0, 1]; unrated restaurants get a neutral 0.5."""
+    stars = np.array([c.get("stars") if isinstance(c.get("stars"), (int, float)) else np.nan
+                      for c in candidates], dtype=np.float64)
+    return np.nan_to_num(np.clip(stars / 5.0, 0.0, 1.0), nan=0.5)
+
+
+def _embedding_matrix(candidates: Sequence[Dict], field: str) -> np.ndarray:
+    """Unit-length candidate embeddings; rows without a usable vector are zero."""
+    dims = {len(c[field]) for c in candidates if c.get(field)}
+    if len(dims) != 1:
+        return np.zeros((len(candidates), 1), dtype=np.float32)
+    dim = dims.pop()
+    mat = np.zeros((len(candidates), dim), dtype=np.float32)
+    for i, c in enumerate(candidates):
+        if c.get(field):
+            mat[i] = c[field]
+    return normalize(mat)
+
+
+def redundancy_matrix(candidates: Sequence[Dict], field: str = "embedding") -> np.ndarray:
+    """Pairwise cosine similarity of candidates; same-named restaurants are 1."""
+    emb = _embedding_matrix(candidates, field)
+    sim = emb @ emb.T
+    names = np.array([normalize_name(c.get("name") or "") for c in candidates])
+    # Unnamed candidates (e.g. articles) are only compared by embedding
+    sim[(names[:, None] == names[None, :]) & (names != "")[:, None]] = 1.0
+    return sim
+
+
+def mmr(relevance: np.ndarray, redundancy: np.ndarray, k: int, diversity: float) -> List[int]:
+    """Greedy maximal marginal relevance: indices of ``k`` picks, in order."""
+    n = len(relevance)
+    chosen: List[int] = []
+    available = np.ones(n, dtype=bool)
+    closest = np.zeros(n)   # max similarity to anything already chosen
+    for _ in range(min(k, n)):
+        gain = (1 - diversity) * relevance - diversity * closest
+        gain[~available] = -np.inf
+        best = int(np.argmax(gain))
+        chosen.append(best)
+        available[best] = False
+        closest = np.maximum(closest, redundancy[best])
+    return chosen
+
+
+def rerank(query: str, candidates: List[Dict], k: int, diversity: float = 0.3,
+           proximity: Optional[np.ndarray] = None, proximity_weight: float = 0.0,
+           field: str = "embedding", boosts: bool = True) -> List[Dict]:
+    """The ``k`` best candidates by blended relevance and MMR diversity.
+
+    Each returned candidate's ``score`` is its blended relevance; ``field`` is
+    removed from every candidate.  With ``boosts=False`` relevance is the
+    similarity alone (no star or attribute components).
+    """
+    if not candidates:
+        return []
+    sims = np.array([c.get("score") or 0.0 for c in candidates], dtype=np.float64)
+    relevance = sims
+    if boosts:
+        relevance = (SIMILARITY_WEIGHT * sims
+                     + STARS_WEIGHT * star_scores(candidates)
+                     + ATTRIBUTE_WEIGHT * attribute_scores(query, candidates))
+    if proximity is not None:
+        relevance = (1 - proximity_weight) * relevance + proximity_weight * proximity
+    picks = mmr(relevance, redundancy_matrix(candidates, field), k, diversity)
+    out = []
+    for i in picks:
+        c = candidates[i]
+        c.pop(field, None)
+        c["score"] = float(relevance[i])
+        out.append(c)
+    return out
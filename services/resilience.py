@@ -0,0 +1,264 @@
+"""
+Tail-latency controls for upstream calls: request deadlines, timeouts, hedged
+requests and circuit breakers.
+
+* ``Deadline`` – an absolute per-request budget; every stage derives its
+  timeout from what is left of it.
+* ``run_with_timeout`` – run a blocking call on the shared upstream pool and
+  stop waiting for it once its budget is spent.
+* ``hedged`` – for idempotent calls: if the primary attempt has not answered
+  after the recent p95 latency, fire a backup attempt (optionally in another
+  region) and take whichever answers first.  Attempts run on a separate pool.
+* ``CircuitBreaker`` – after repeated failures, fail fast for a cool-down
+  period instead of piling more requests onto a struggling dependency.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional, Sequence
+
+from flask import g, has_request_context
+
+from services.telemetry import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Request threads per worker process; gunicorn.conf.py exports the gthread count.
+_REQUEST_THREADS = int(os.getenv("GUNICORN_THREADS", "32"))
+
+_pool = ThreadPoolExecutor(max_workers=int(os.getenv("UPSTREAM_POOL_SIZE", "64")),
+                           thread_name_prefix="upstream")
+# Hedged attempts run on their own threads, so a backup never queues behind the
+# slow primaries (or generate calls) it is meant to overtake: room for a primary
+# and a backup from every request thread.
+_hedge_pool = ThreadPoolExecutor(max_workers=int(os.getenv("HEDGE_POOL_SIZE", str(2 * _REQUEST_THREADS))),
+                                 thread_name_prefix="hedge")
+
+HEDGES = REGISTRY.counter("trendwave_hedged_requests_total", "Backup attempts fired by hedging.",
+                          labels=("op", "winner"))
+TIMEOUTS = REGISTRY.counter("trendwave_upstream_timeouts_total", "Upstream calls abandoned at their deadline.",
+                            labels=("op",))
+BREAKER_STATE = REGISTRY.gauge("trendwave_circuit_open", "1 while a dependency's circuit is open.",
+                               labels=("dependency",))
+DEGRADED = REGISTRY.counter("trendwave_degraded_responses_total",
+                            "Requests served with a fallback for a failed stage.", labels=("stage",))
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class CircuitOpen(RuntimeError):
+    pass
+
+
+# -----------------------------------------------------------------------------
+#  Deadlines
+# -----------------------------------------------------------------------------
+
+class Deadline:
+    def __init__(self, seconds: Optional[float]):
+        self.expires_at = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self, cap: Optional[float] = None) -> Optional[float]:
+        """Seconds left (never negative), optionally capped at ``cap``."""
+        if self.expires_at is None:
+            return cap
+        left = max(0.0, self.expires_at - time.monotonic())
+        return left if cap is None else min(left, cap)
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+
+def current_deadline() -> Deadline:
+    """The deadline of the current request, or an unbounded one outside requests."""
+    if has_request_context() and "deadline" in g:
+        return g.deadline
+    return Deadline(None)
+
+
+def run_with_timeout(fn: Callable, timeout: Optional[float], op: str = "call",
+                     on_done: Optional[Callable[[Optional[BaseException]], None]] = None):
+    """Run ``fn`` on the upstream pool; raise ``DeadlineExceeded`` after ``timeout``.
+
+    The call itself is not cancelled — we only stop waiting for it.  ``on_done``
+    is called exactly once with the call's exception (or None) when it has
+    really finished, which may be after we gave up on it.
+    """
+    if timeout is not None and timeout <= 0:
+        TIMEOUTS.inc(op=op)
+        if on_done is not None:
+            on_done(None)
+        raise DeadlineExceeded(f"{op}: no time left in request budget")
+    fut = _pool.submit(fn)
+    if on_done is not None:
+        fut.add_done_callback(lambda f: on_done(None if f.cancelled() else f.exception()))
+    done, _ = wait([fut], timeout=timeout)
+    if not done:
+        TIMEOUTS.inc(op=op)
+        raise DeadlineExceeded(f"{op} did not finish within {timeout:.2f}s")
+    return fut.result()
+
+
+# -----------------------------------------------------------------------------
+#  Hedging
+# -----------------------------------------------------------------------------
+
+class LatencyWindow:
+    """Rolling window of recent latencies for one operation."""
+
+    def __init__(self, size: int = 256):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float, default: float) -> float:
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < 20:
+            return default
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+_latencies = {}
+_latencies_lock = threading.Lock()
+
+
+def latency_window(op: str) -> LatencyWindow:
+    with _latencies_lock:
+        return _latencies.setdefault(op, LatencyWindow())
+
+
+def hedged(attempts: Sequence[Callable], timeout: Optional[float], op: str,
+           default_delay: float = 0.5, min_delay: float = 0.02):
+    """Run ``attempts[0]``; after the p95 delay start the next attempt, and so on.
+
+    Returns the first successful result.  Only use for idempotent calls.
+    """
+    if timeout is not None and timeout <= 0:
+        TIMEOUTS.inc(op=op)
+        raise DeadlineExceeded(f"{op}: no time left in request budget")
+    window = latency_window(op)
+    delay = max(min_delay, window.quantile(0.95, default_delay))
+    start = time.monotonic()
+    end = None if timeout is None else start + timeout
+
+    queue = list(attempts)
+    pending = {}
+    launched = 0
+    last_error = None
+
+    def launch():
+        nonlocal launched
+        pending[_hedge_pool.submit(queue.pop(0))] = launched
+        if launched:
+            HEDGES.inc(op=op, winner="fired")
+        launched += 1
+
+    launch()
+    while pending:
+        wait_for = None if end is None else max(0.0, end - time.monotonic())
+        if queue:
+            wait_for = delay if wait_for is None else min(delay, wait_for)
+        done, _ = wait(list(pending), timeout=wait_for, return_when=FIRST_COMPLETED)
+        for fut in done:
+            idx = pending.pop(fut)
+            try:
+                result = fut.result()
+            except Exception as exc:
+                last_error = exc
+                continue
+            window.record(time.monotonic() - start)
+            if idx:
+                HEDGES.inc(op=op, winner="hedge")
+            return result
+        if end is not None and time.monotonic() >= end:
+            TIMEOUTS.inc(op=op)
+            raise DeadlineExceeded(f"{op} did not finish within {timeout:.2f}s")
+        if queue:
+            # Fire the next attempt: the delay elapsed, or an attempt failed.
+            launch()
+    raise last_error
+
+
+# -----------------------------------------------------------------------------
+#  Circuit breaker
+# -----------------------------------------------------------------------------
+
+class CircuitBreaker:
+    """Closed → open after ``failure_threshold`` consecutive failures; half-open
+    after ``reset_timeout`` seconds, letting a single probe through.
+
+    Exceptions listed in ``ignore`` (e.g. our own load shedding) pass through
+    without counting against the dependency.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 ignore: tuple = ()):
+        self.name = name
+        self.ignore = ignore
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+        BREAKER_STATE.set(0, dependency=name)
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+            BREAKER_STATE.set(0, dependency=self.name)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("Circuit for %s opened after %d failures", self.name, self._failures)
+                self._opened_at = time.monotonic()
+                BREAKER_STATE.set(1, dependency=self.name)
+
+    def call(self, fn: Callable, *args, **kwargs):
+        if not self.allow():
+            raise CircuitOpen(f"{self.name} circuit is open")
+        try:
+            result = fn(*args, **kwargs)
+        except self.ignore:
+            with self._lock:
+                self._probing = False
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
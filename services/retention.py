@@ -0,0 +1,183 @@
+"""
+Retention for Firestore chat data.
+
+``chat_sessions`` documents carry an ``expire_at`` timestamp, refreshed on
+every save (``session_expiry``), for a Firestore TTL policy to delete
+conversations nobody has touched for ``CHAT_SESSION_TTL_DAYS``::
+
+    gcloud firestore fields ttls update expire_at --collection-group=chat_sessions --enable-ttl
+    gcloud firestore fields ttls update expire_at --collection-group=chat_archives --enable-ttl
+
+TTL deletion is a backstop.  ``compact_sessions`` (run by ``compact_sessions.py``
+on a schedule) acts first.  It replaces each session that has been idle for
+``older_than_days`` with a small ``chat_archives`` record: message counts, first
+and last timestamps, and the user's first few questions, scrubbed.  It works in
+write batches of ``batch_size`` sessions and re-queries after each batch, so
+long runs never hold a query stream open.
+A session that gets a new message while the job runs fails the delete
+precondition and is kept.
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from google.api_core.exceptions import FailedPrecondition
+from google.cloud import firestore
+
+from services.query_log import scrub
+from services.telemetry import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SESSIONS = "chat_sessions"
+ARCHIVES = "chat_archives"
+
+# Two writes (archive + delete) per session; Firestore allows 500 per batch
+MAX_BATCH_SIZE = 250
+ARCHIVED_QUERIES = 5
+
+DOCS = REGISTRY.counter(
+    "trendwave_retention_documents_total",
+    "Chat session documents handled by the compaction job.",
+    labels=("action",),
+)
+LAST_RUN_DOCS = REGISTRY.gauge(
+    "trendwave_retention_last_run_documents",
+    "Documents scanned/archived/deleted/skipped by the latest compaction run.",
+    labels=("action",),
+)
+RUN_SECONDS = REGISTRY.histogram(
+    "trendwave_retention_run_seconds",
+    "Duration of compaction runs.",
+    buckets=(1, 5, 15, 60, 300, 900, 3600),
+)
+LAST_RUN_TIMESTAMP = REGISTRY.gauge(
+    "trendwave_retention_last_run_timestamp_seconds",
+    "Unix time the latest compaction run finished.",
+)
+DRY_RUN_DOCS = REGISTRY.gauge(
+    "trendwave_retention_dry_run_documents",
+    "Sessions the latest dry run found eligible for compaction.",
+)
+
+
+def session_expiry(ttl_days: float) -> datetime:
+    """``expire_at`` for a session saved now."""
+    return datetime.utcnow() + timedelta(days=ttl_days)
+
+
+def summarize_session(user_id: str, data: Dict) -> Dict:
+    """Compact archive record for a chat session document."""
+    messages = data.get("messages") or []
+    asked = [m.get("content", "") for m in messages if m.get("role") == "user"]
+    stamps = sorted(m["timestamp"] for m in messages if m.get("timestamp"))
+    return {
+        "user_id": user_id,
+        "started_at": stamps[0] if stamps else None,
+        "ended_at": stamps[-1] if stamps else None,
+        "message_count": len(messages),
+        "user_message_count": len(asked),
+        "queries": [scrub(q)[:120] for q in asked[:ARCHIVED_QUERIES]],
+        "last_updated": data.get("updated_at"),
+    }
+
+
+def _archive_id(user_id: str, data: Dict) -> str:
+    updated = data.get("updated_at")
+    stamp = int(updated.timestamp()) if hasattr(updated, "timestamp") else int(time.time())
+    return f"{user_id}-{stamp}"
+
+
+def _stage(db, batch, snap, archive_ttl_days):
+    """Add ``snap``'s archive record and its guarded delete to ``batch``."""
+    data = snap.to_dict() or {}
+    record = summarize_session(snap.id, data)
+    record["archived_at"] = firestore.SERVER_TIMESTAMP
+    if archive_ttl_days:
+        record["expire_at"] = session_expiry(archive_ttl_days)
+    batch.set(db.collection(ARCHIVES).document(_archive_id(snap.id, data)), record)
+    # Fails the commit if a message was saved after we read the session
+    batch.delete(snap.reference, option=db.write_option(last_update_time=snap.update_time))
+
+
+def _commit_individually(db, snaps, archive_ttl_days) -> List[str]:
+    """Commit each session on its own; returns the ids kept because they changed."""
+    kept = []
+    for snap in snaps:
+        batch = db.batch()
+        _stage(db, batch, snap, archive_ttl_days)
+        try:
+            batch.commit()
+        except FailedPrecondition:
+            logger.info("Session %s changed during compaction; kept", snap.id)
+            kept.append(snap.id)
+    return kept
+
+
+def compact_sessions(db, older_than_days: float, batch_size: int = 200,
+                     archive_ttl_days: Optional[float] = 365, dry_run: bool = False,
+                     max_docs: Optional[int] = None) -> Dict[str, float]:
+    """Archive and delete chat sessions idle for ``older_than_days``.
+
+    Returns counts of documents scanned, archived, deleted and skipped
+    (changed during the run), plus batches committed and seconds taken.
+    ``max_docs`` bounds one run.  With ``dry_run`` nothing is written and only
+    ``matching`` (sessions that would be compacted) and ``seconds`` are
+    returned; dry runs leave the job's run metrics alone.
+    """
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    stale = db.collection(SESSIONS).where("updated_at", "<", cutoff)
+    started = time.perf_counter()
+
+    if dry_run:
+        matching = sum(1 for _ in (stale.limit(max_docs) if max_docs else stale).stream())
+        DRY_RUN_DOCS.set(matching)
+        stats = {"matching": matching, "seconds": round(time.perf_counter() - started, 3)}
+        logger.info("Chat session compaction (dry run): %s", stats)
+        return stats
+
+    stats = {"scanned": 0, "archived": 0, "deleted": 0, "skipped": 0, "batches": 0}
+    kept: Set[str] = set()
+
+    def count(action, n):
+        stats[action] += n
+        DOCS.inc(n, action=action)
+
+    while max_docs is None or stats["scanned"] < max_docs:
+        limit = batch_size if max_docs is None else min(batch_size, max_docs - stats["scanned"])
+        # Compacted sessions no longer match, so each query returns the next batch
+        snaps = list(stale.limit(limit).stream())
+        if not snaps:
+            break
+        if all(snap.id in kept for snap in snaps):
+            # Only sessions that already failed their precondition are left at
+            # the head of the query (changed without a newer updated_at)
+            logger.warning("Stopping: %d sessions keep changing during compaction", len(snaps))
+            break
+        count("scanned", len(snaps))
+        batch = db.batch()
+        for snap in snaps:
+            _stage(db, batch, snap, archive_ttl_days)
+        try:
+            batch.commit()
+            changed = []
+        except FailedPrecondition:
+            # Someone chatted meanwhile: retry one at a time, keeping changed sessions
+            changed = _commit_individually(db, snaps, archive_ttl_days)
+            kept.update(changed)
+        count("archived", len(snaps) - len(changed))
+        count("deleted", len(snaps) - len(changed))
+        count("skipped", len(changed))
+        stats["batches"] += 1
+        if len(snaps) < limit:
+            break
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    RUN_SECONDS.observe(stats["seconds"])
+    LAST_RUN_TIMESTAMP.set(time.time())
+    for action in ("scanned", "archived", "deleted", "skipped"):
+        LAST_RUN_DOCS.set(stats[action], action=action)
+    logger.info("Chat session compaction: %s", stats)
+    return stats
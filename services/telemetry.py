@@ -0,0 +1,306 @@
+"""
+Lightweight in-process telemetry: Prometheus-style metrics, per-stage timing
+spans, request-ID log correlation and sampled debug logging.
+
+Metrics live in a process-wide registry and are rendered in the Prometheus text
+exposition format by the ``/metrics`` route.  When the ``opentelemetry`` package
+is installed and ``OTEL_ENABLED`` is set, every span is mirrored to an OTel span
+as well.
+"""
+import ipaddress
+import logging
+import os
+import random
+import secrets
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import g, has_request_context, request
+
+try:  # optional dependency
+    from opentelemetry import trace as _otel_trace
+except ImportError:  # pragma: no cover - exercised only without OTel installed
+    _otel_trace = None
+
+OTEL_ENABLED = _otel_trace is not None and os.getenv("OTEL_ENABLED", "").lower() in ("1", "true", "yes")
+_tracer = _otel_trace.get_tracer("trendwave") if OTEL_ENABLED else None
+
+# Latency buckets (seconds) covering cache hits up to slow LLM generations.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+# -----------------------------------------------------------------------------
+#  Metric types
+# -----------------------------------------------------------------------------
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(l, "")) for l in self.labels)
+
+    def _fmt_labels(self, key: Tuple[str, ...], extra: Optional[Dict[str, str]] = None) -> str:
+        pairs = list(zip(self.labels, key)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        body = ",".join(f'{k}="{v}"' for k, v in pairs)
+        return "{" + body + "}"
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self):
+        yield from super().render()
+        with self._lock:
+            items = list(self._values.items())
+        for key, val in items:
+            yield f"{self.name}{self._fmt_labels(key)} {val:g}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [bucket counts..., +Inf count], sum
+        self._counts: Dict[Tuple[str, ...], list] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[idx] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Estimate the q-quantile from bucket counts (upper bucket bound)."""
+        counts = self._counts.get(self._key(labels))
+        if not counts:
+            return None
+        total = sum(counts)
+        target = q * total
+        running = 0
+        for bound, c in zip(self.buckets + (float("inf"),), counts):
+            running += c
+            if running >= target:
+                return bound
+        return None
+
+    def render(self):
+        yield from super().render()
+        with self._lock:
+            items = [(k, list(v), self._sums[k]) for k, v in self._counts.items()]
+        for key, counts, total in items:
+            running = 0
+            for bound, c in zip(self.buckets, counts):
+                running += c
+                yield f"{self.name}_bucket{self._fmt_labels(key, {'le': f'{bound:g}'})} {running}"
+            running += counts[-1]
+            yield f"{self.name}_bucket{self._fmt_labels(key, {'le': '+Inf'})} {running}"
+            yield f"{self.name}_sum{self._fmt_labels(key)} {total:g}"
+            yield f"{self.name}_count{self._fmt_labels(key)} {running}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, help_text, labels=()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text, labels=()) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, labels, buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for m in metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "trendwave_chat_stage_seconds",
+    "Time spent in each stage of the chat pipeline.",
+    labels=("stage",),
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "trendwave_http_request_seconds",
+    "End-to-end HTTP request latency.",
+    labels=("endpoint", "status"),
+)
+IN_FLIGHT = REGISTRY.gauge(
+    "trendwave_http_requests_in_flight",
+    "Requests currently being served by this process.",
+)
+
+
+@contextmanager
+def span(stage: str):
+    """Time a pipeline stage and record it in ``STAGE_SECONDS``."""
+    start = time.perf_counter()
+    otel_cm = _tracer.start_as_current_span(f"chat.{stage}") if _tracer else None
+    if otel_cm is not None:
+        otel_cm.__enter__()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if has_request_context():
+            g.setdefault("stage_timings", {})[stage] = elapsed
+        if otel_cm is not None:
+            otel_cm.__exit__(None, None, None)
+
+
+# -----------------------------------------------------------------------------
+#  Request IDs & logging
+# -----------------------------------------------------------------------------
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+
+def current_request_id() -> str:
+    if has_request_context():
+        return g.get("request_id", "-")
+    return "-"
+
+
+class RequestIdFilter(logging.Filter):
+    """Attach the current request ID to every log record as ``request_id``."""
+
+    def filter(self, record):
+        record.request_id = current_request_id()
+        return True
+
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(request_id)s] — %(message)s"
+
+
+def install_request_logging():
+    """Add request IDs to the formatter of every root handler."""
+    for handler in logging.getLogger().handlers:
+        if not any(isinstance(f, RequestIdFilter) for f in handler.filters):
+            handler.addFilter(RequestIdFilter())
+            handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+
+def init_app(app):
+    """Wire request IDs, request latency and in-flight tracking into ``app``."""
+    install_request_logging()
+
+    @app.before_request
+    def _start_request():
+        g.request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+        g.request_start = time.perf_counter()
+        IN_FLIGHT.inc()
+
+    @app.after_request
+    def _finish_request(response):
+        response.headers[REQUEST_ID_HEADER] = g.get("request_id", "")
+        g.response_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _teardown_request(exc):
+        start = g.pop("request_start", None)
+        if start is None:
+            return
+        IN_FLIGHT.dec()
+        # Handlers such as chat_api turn their own failures into 5xx responses,
+        # so label by status class rather than by uncaught exceptions
+        status = "5xx" if exc is not None else f"{g.get('response_status', 500) // 100}xx"
+        REQUEST_SECONDS.observe(time.perf_counter() - start,
+                                endpoint=request.endpoint or "unknown", status=status)
+
+
+# -----------------------------------------------------------------------------
+#  Scrape access
+# -----------------------------------------------------------------------------
+
+def parse_networks(spec: str) -> List:
+    """Comma-separated CIDRs, e.g. ``"127.0.0.1/32,10.0.0.0/8"``."""
+    return [ipaddress.ip_network(n.strip(), strict=False) for n in (spec or "").split(",") if n.strip()]
+
+
+def metrics_allowed(remote_addr: Optional[str], authorization: Optional[str],
+                    token: str, networks) -> bool:
+    """Whether a ``/metrics`` scrape may proceed: bearer ``token`` (if set) or a source in ``networks``."""
+    if token and secrets.compare_digest((authorization or "").encode(), f"Bearer {token}".encode()):
+        return True
+    try:
+        addr = ipaddress.ip_address(remote_addr or "")
+    except ValueError:
+        return False
+    return any(addr in net for net in networks)
+
+
+# -----------------------------------------------------------------------------
+#  Sampled debug logging
+# -----------------------------------------------------------------------------
+
+DEBUG_LOG_SAMPLE_RATE = float(os.getenv("DEBUG_LOG_SAMPLE_RATE", "0.05"))
+
+
+def sampled_debug(log: logging.Logger, msg: str, *args):
+    """Log large per-request payloads at DEBUG for a sample of requests only."""
+    if log.isEnabledFor(logging.DEBUG) and random.random() < DEBUG_LOG_SAMPLE_RATE:
+        log.debug(msg, *args)
@@ -1,11 +1,146 @@
+import asyncio
+import logging
 import os
-from typing import List, Dict, Any, Optional
+import time
+from typing import AsyncIterator, List, Dict, Any, Optional, Sequence, Tuple
+
+import numpy as np
 from pymongo import MongoClient
 from pymongo.collection import Collection
-import google.generativeai as genai
+from google import genai
+from google.genai import types
 from config import settings
+from services.cache import LRUCache
+from services.coalesce import SingleFlight
+from services.embed_batcher import EmbedBatcher
+from services.embeddings import FULL_DIM, configured_dim, truncate_normalize
+from services.local_index import ExactIndex
+
+logger = logging.getLogger(__name__)
+
+
+_client: Optional[genai.Client] = None
+
+
+def _genai_client() -> genai.Client:
+    """Gemini client for the sync ``VectorStore``, created on first use."""
+    global _client
+    if _client is None:
+        _client = genai.Client(api_key=settings.GEMINI_API_KEY)
+    return _client
+
+
+def _embed_texts(texts):
+    """Embed a batch of search queries in one Gemini call."""
+    dim = configured_dim()
+    response = _genai_client().models.embed_content(
+        model=settings.EMBED_MODEL,
+        contents=list(texts),
+        config=types.EmbedContentConfig(task_type="RETRIEVAL_QUERY", output_dimensionality=dim),
+    )
+    return [truncate_normalize(e.values, dim) for e in response.embeddings]
+
+
+RESULT_PROJECTION = {
+    "_id": 1,
+    "name": 1,
+    "cuisine": 1,
+    "address": 1,
+    "rating": 1,
+    "price_range": 1,
+    "stars": 1,
+    "priceRange": 1,
+    "description": 1,
+}
+
+
+def search_pipeline(query_embedding: List[float], limit: int) -> List[Dict[str, Any]]:
+    """``$vectorSearch`` aggregation returning the ``limit`` closest restaurants."""
+    return [
+        {
+            "$vectorSearch": {
+                "index": settings.VECTOR_INDEX,
+                "path": "embedding",
+                "queryVector": query_embedding,
+                "numCandidates": max(50, 10 * limit),
+                "limit": limit,
+            }
+        },
+        {
+            "$project": {
+                **RESULT_PROJECTION,
+                "score": {"$meta": "vectorSearchScore"}
+            }
+        }
+    ]
+
+
+def recommendation_prompt(query: str, search_results: List[Dict]) -> str:
+    """Gemini prompt asking for a recommendation among ``search_results``."""
+    results_str = "\n".join([
+        f"- {r['name']} ({r['cuisine']}): {r.get('description', 'No description')} "
+        f"Rating: {r.get('rating', r.get('stars', 'N/A'))}, Price: {r.get('price_range', r.get('priceRange', 'N/A'))}"
+        for r in search_results
+    ])
+
+    return f"""
+            Based on the following restaurant search results, provide a personalized recommendation:
+            
+            User query: {query}
+            
+            Search results:
+            {results_str}
+            
+            Please provide a friendly, natural response that:
+            1. Acknowledges the user's preferences
+            2. Recommends 1-3 restaurants with reasons why they're a good match
+            3. Includes key details like cuisine, price range, and rating
+            4. Is concise and engaging
+            """
+
+
+# Most texts the embedding API accepts in one request
+EMBED_REQUEST_LIMIT = 100
+# Seconds before retrying a failed reload of the batch-scoring matrix
+CATALOG_RETRY_S = 60
+
+def _format_address(address) -> str:
+    if not isinstance(address, dict):
+        return address or ""
+    street = " ".join(p for p in (address.get("building"), address.get("street")) if p)
+    return ", ".join(p for p in (street, address.get("zipcode")) if p)
+
+
+def public_result(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-safe restaurant in the shape ``templates/index.html`` renders."""
+    return {
+        "id": str(doc.get("_id", "")),
+        "name": doc.get("name"),
+        "cuisine": doc.get("cuisine"),
+        "address": _format_address(doc.get("address")),
+        "rating": doc.get("rating", doc.get("stars")),
+        "price_range": doc.get("price_range", doc.get("priceRange")),
+        "description": doc.get("description"),
+        "score": doc.get("score"),
+    }
+
+
+def public_response(response: Dict[str, Any]) -> Dict[str, Any]:
+    return {**response, "results": [public_result(r) for r in response.get("results", [])]}
+
+
+FALLBACK_RECOMMENDATION = "I'm sorry, I couldn't generate a recommendation at the moment. Please try again later."
+
 
 class VectorStore:
+    # Shared by every VectorStore in the process so concurrent requests batch together
+    _embedder = EmbedBatcher(
+        _embed_texts,
+        window_ms=settings.EMBED_BATCH_WINDOW_MS,
+        max_batch=settings.EMBED_BATCH_MAX_SIZE,
+        name="vector_store",
+    )
+
     def __init__(self):
         """Initialize MongoDB connection and Gemini AI."""
         self.client = MongoClient(settings.MONGODB_URI)
@@ -13,18 +148,13 @@ class VectorStore:
         self.collection: Collection = self.db[settings.COLLECTION_NAME]
         
         # Initialize Gemini
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        self.genai = _genai_client()
     
     def get_embedding(self, text: str) -> List[float]:
         """Generate embedding for the given text using Gemini."""
         try:
-            # Generate embedding using Gemini
-            response = self.model.embed_content(
-                content=text,
-                task_type="retrieval_document"
-            )
-            return response['embedding']
+            # Generate embedding using Gemini, batched with concurrent callers
+            return self._embedder.embed(text)
         except Exception as e:
             print(f"Error generating embedding: {e}")
             raise
@@ -36,31 +166,7 @@ class VectorStore:
             query_embedding = self.get_embedding(query)
             
             # Vector search pipeline
-            pipeline = [
-                {
-                    "$vectorSearch": {
-                        "index": settings.VECTOR_INDEX,
-                        "path": "embedding",
-                        "queryVector": query_embedding,
-                        "numCandidates": 50,
-                        "limit": limit,
-                    }
-                },
-                {
-                    "$project": {
-                        "_id": 1,
-                        "name": 1,
-                        "cuisine": 1,
-                        "address": 1,
-                        "rating": 1,
-                        "price_range": 1,
-                        "description": 1,
-                        "score": {"$meta": "vectorSearchScore"}
-                    }
-                }
-            ]
-            
-            results = list(self.collection.aggregate(pipeline))
+            results = list(self.collection.aggregate(search_pipeline(query_embedding, limit)))
             return results
             
         except Exception as e:
@@ -70,34 +176,15 @@ class VectorStore:
     def generate_recommendation(self, query: str, search_results: List[Dict]) -> str:
         """Generate a natural language recommendation using Gemini."""
         try:
-            # Format search results for the prompt
-            results_str = "\n".join([
-                f"- {r['name']} ({r['cuisine']}): {r.get('description', 'No description')} "
-                f"Rating: {r.get('rating', 'N/A')}, Price: {r.get('price_range', 'N/A')}"
-                for r in search_results
-            ])
-            
-            prompt = f"""
-            Based on the following restaurant search results, provide a personalized recommendation:
-            
-            User query: {query}
-            
-            Search results:
-            {results_str}
-            
-            Please provide a friendly, natural response that:
-            1. Acknowledges the user's preferences
-            2. Recommends 1-3 restaurants with reasons why they're a good match
-            3. Includes key details like cuisine, price range, and rating
-            4. Is concise and engaging
-            """
-            
-            response = self.model.generate_content(prompt)
+            response = self.genai.models.generate_content(
+                model=settings.RECOMMEND_MODEL,
+                contents=recommendation_prompt(query, search_results),
+            )
             return response.text
             
         except Exception as e:
             print(f"Error generating recommendation: {e}")
-            return "I'm sorry, I couldn't generate a recommendation at the moment. Please try again later."
+            return FALLBACK_RECOMMENDATION
     
     def get_recommendations(self, query: str, limit: int = 3) -> Dict[str, Any]:
         """Get restaurant recommendations based on natural language query."""
@@ -128,3 +215,228 @@ class VectorStore:
                 "message": "An error occurred while processing your request.",
                 "results": []
             }
+
+
+class AsyncVectorStore:
+    """asyncio counterpart of ``VectorStore`` for the recommendation API.
+
+    Uses Motor and the ``google-genai`` async client, so one instance serves
+    every request of an event loop.  Query embeddings and whole responses are
+    cached, and identical concurrent requests share one upstream call.
+    """
+
+    def __init__(self, response_ttl: float = None, collection=None, genai_client=None):
+        """``collection`` (Motor-style) and ``genai_client`` default to the configured services."""
+        self.client = None
+        if collection is None:
+            from motor.motor_asyncio import AsyncIOMotorClient
+
+            self.client = AsyncIOMotorClient(settings.MONGODB_URI)
+            collection = self.client[settings.DB_NAME][settings.COLLECTION_NAME]
+        self.collection = collection
+        self.genai = genai_client or genai.Client(api_key=settings.GEMINI_API_KEY)
+        self._embeddings = LRUCache(maxsize=4096)
+        ttl = settings.RECOMMEND_CACHE_TTL_S if response_ttl is None else response_ttl
+        self._responses = LRUCache(maxsize=1024, ttl=ttl)
+        self._flight = SingleFlight("recommend")
+        # Whole-catalog embedding matrix for batch scoring, loaded on first use
+        self._catalog: Optional[Tuple[ExactIndex, List[Dict]]] = None
+        self._catalog_expires = 0.0
+        self._catalog_task: Optional[asyncio.Future] = None
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+
+    @staticmethod
+    def _key(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    async def embed_many(self, texts: Sequence[str]) -> List[List[float]]:
+        """Embed ``texts``, sending only the uncached ones in a single batched call."""
+        keys = [self._key(t) for t in texts]
+        vectors = {k: self._embeddings.get(k) for k in set(keys)}
+        missing = [k for k, v in vectors.items() if v is None]
+        dim = configured_dim()
+        config = types.EmbedContentConfig(task_type="RETRIEVAL_QUERY", output_dimensionality=dim)
+        chunks = [missing[i:i + EMBED_REQUEST_LIMIT] for i in range(0, len(missing), EMBED_REQUEST_LIMIT)]
+        responses = await asyncio.gather(*(
+            self.genai.aio.models.embed_content(model=settings.EMBED_MODEL, contents=chunk, config=config)
+            for chunk in chunks
+        ))
+        for chunk, response in zip(chunks, responses):
+            for k, e in zip(chunk, response.embeddings):
+                vectors[k] = truncate_normalize(e.values, dim)
+                self._embeddings.put(k, vectors[k])
+        return [vectors[k] for k in keys]
+
+    async def get_embedding(self, text: str) -> List[float]:
+        return (await self._flight.do_async(("embed", self._key(text)), self.embed_many, [text]))[0]
+
+    async def search(self, query_embedding: List[float], limit: int = 5) -> List[Dict[str, Any]]:
+        cursor = self.collection.aggregate(search_pipeline(query_embedding, limit))
+        return await cursor.to_list(length=limit)
+
+    async def vector_search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        return await self.search(await self.get_embedding(query), limit)
+
+    async def generate_recommendation(self, query: str, search_results: List[Dict]) -> str:
+        try:
+            response = await self.genai.aio.models.generate_content(
+                model=settings.RECOMMEND_MODEL,
+                contents=recommendation_prompt(query, search_results),
+            )
+            return response.text
+        except Exception as e:
+            print(f"Error generating recommendation: {e}")
+            return FALLBACK_RECOMMENDATION
+
+    async def _recommend(self, query: str, limit: int, generate: bool,
+                         embedding: Optional[List[float]] = None) -> Dict[str, Any]:
+        if embedding is None:
+            embedding = await self.get_embedding(query)
+        search_results = await self.search(embedding, limit)
+        if not search_results:
+            return {
+                "success": False,
+                "message": "No restaurants found matching your criteria.",
+                "results": []
+            }
+        response = {"success": True, "results": search_results}
+        if generate:
+            response["recommendation"] = await self.generate_recommendation(query, search_results)
+        return response
+
+    async def get_recommendations(self, query: str, limit: int = 3, generate: bool = True,
+                                  embedding: Optional[List[float]] = None) -> Dict[str, Any]:
+        """Same response shape as ``VectorStore.get_recommendations``, cached per query."""
+        key = (self._key(query), limit, generate)
+        cached = self._responses.get(key)
+        if cached is not None:
+            return cached
+        try:
+            response = await self._flight.do_async(key, self._recommend, query, limit, generate, embedding)
+        except Exception as e:
+            print(f"Error in get_recommendations: {e}")
+            return {
+                "success": False,
+                "message": "An error occurred while processing your request.",
+                "results": []
+            }
+        if response["success"]:
+            self._responses.put(key, response)
+        return response
+
+    async def catalog_index(self) -> Tuple[ExactIndex, List[Dict]]:
+        """Exact index over every restaurant embedding, rebuilt after ``RECOMMEND_MATRIX_TTL_S``.
+
+        A rebuild runs as a single background task while callers keep using the
+        previous index; only calls made before the first load wait for it.
+        """
+        catalog = self._catalog
+        if catalog is not None and time.time() < self._catalog_expires:
+            return catalog
+        if self._catalog_task is None:
+            self._catalog_task = asyncio.ensure_future(self._load_catalog())
+            self._catalog_task.add_done_callback(self._catalog_loaded)
+        if catalog is not None:
+            return catalog
+        return await asyncio.shield(self._catalog_task)
+
+    async def _load_catalog(self) -> Tuple[ExactIndex, List[Dict]]:
+        started = time.perf_counter()
+        dim = configured_dim() or FULL_DIM
+        flt = {"embedding": {"$exists": True}}
+        matrix = _CatalogMatrix(dim, await self.collection.count_documents(flt))
+        # Only the first ``dim`` components leave the server, written straight into the matrix
+        async for doc in self.collection.find(flt, {**RESULT_PROJECTION, "embedding": {"$slice": dim}}):
+            matrix.add(doc)
+        catalog = await asyncio.to_thread(matrix.build)
+        self._catalog = catalog
+        self._catalog_expires = time.time() + settings.RECOMMEND_MATRIX_TTL_S
+        logger.info("Loaded %d restaurant embeddings for batch scoring in %.1fs",
+                    len(catalog[1]), time.perf_counter() - started)
+        return catalog
+
+    def _catalog_loaded(self, task: asyncio.Future):
+        self._catalog_task = None
+        if task.cancelled() or task.exception() is None:
+            return
+        logger.error("Failed to load restaurant embeddings: %s", task.exception())
+        # Keep serving the old matrix (if any) and retry in a minute
+        self._catalog_expires = time.time() + CATALOG_RETRY_S
+
+    async def iter_recommendations_batch(self, queries: Sequence[str], limit: int = 3, generate: bool = True,
+                                         concurrency: int = 8) -> AsyncIterator[Dict[str, Any]]:
+        """Recommendations for many queries, yielded as each one is ready.
+
+        Queries are embedded ``EMBED_REQUEST_LIMIT`` at a time and scored against
+        the whole catalog matrix with one matrix product and top-k per chunk;
+        generation (if wanted) runs ``concurrency`` prompts at a time.  Each item
+        carries the ``index`` of its query.
+        """
+        index, docs = await self.catalog_index()
+        gate = asyncio.Semaphore(concurrency)
+
+        async def finish(i, query, results):
+            item = {"index": i, "query": query, "success": bool(results), "results": results}
+            if not results:
+                item["message"] = "No restaurants found matching your criteria."
+            elif generate:
+                async with gate:
+                    item["recommendation"] = await self.generate_recommendation(query, results)
+            return item
+
+        for start in range(0, len(queries), EMBED_REQUEST_LIMIT):
+            chunk = list(queries[start:start + EMBED_REQUEST_LIMIT])
+            vectors = np.asarray(await self.embed_many(chunk), dtype=np.float32)
+            hits = await asyncio.to_thread(index.search_batch, vectors, limit)
+            # Same [0, 1] scale as Atlas vectorSearchScore for cosine
+            results = [[{**docs[row], "score": (1 + score) / 2} for row, score in h] for h in hits]
+            pending = [finish(start + j, q, r) for j, (q, r) in enumerate(zip(chunk, results))]
+            for done in asyncio.as_completed(pending):
+                yield await done
+
+    async def get_recommendations_batch(self, queries: Sequence[str], limit: int = 3,
+                                        generate: bool = True, concurrency: int = 8) -> List[Dict[str, Any]]:
+        """``iter_recommendations_batch`` collected in query order."""
+        items = [item async for item in self.iter_recommendations_batch(queries, limit, generate, concurrency)]
+        return sorted(items, key=lambda item: item["index"])
+
+
+class _CatalogMatrix:
+    """Restaurant embeddings cut to ``dim``, streamed into a preallocated float32 matrix.
+
+    Documents whose embedding is shorter than ``dim`` (mid-migration) are skipped.
+    """
+
+    def __init__(self, dim: int, expected: int):
+        self.dim = dim
+        self.matrix = np.empty((max(expected, 1), dim), dtype=np.float32)
+        self.docs: List[Dict] = []
+        self.skipped = 0
+
+    def add(self, doc: Dict):
+        vec = doc.pop("embedding", None)
+        if vec is None or len(vec) < self.dim:
+            self.skipped += 1
+            return
+        row = len(self.docs)
+        if row == len(self.matrix):   # documents added since they were counted
+            grown = np.empty((2 * row, self.dim), dtype=np.float32)
+            grown[:row] = self.matrix
+            self.matrix = grown
+        self.matrix[row] = vec[:self.dim]
+        self.docs.append(doc)
+
+    def build(self) -> Tuple[ExactIndex, List[Dict]]:
+        if self.skipped:
+            logger.warning("Skipped %d restaurants without a %d-d embedding", self.skipped, self.dim)
+        n = len(self.docs)
+        matrix, self.matrix = self.matrix, None
+        # Drop the unused tail, then normalise in place: the catalog is never held twice
+        matrix.resize((n, self.dim), refcheck=False)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        np.divide(matrix, norms, out=matrix)
+        return ExactIndex().build(range(n), matrix, normalized=True), self.docs
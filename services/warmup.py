@@ -0,0 +1,135 @@
+"""
+Cache warm-up from the query log.
+
+Caches are per process and empty after a deploy or worker recycle, so the
+first users of every worker pay for the query embed, ``$vectorSearch`` and
+generation.  ``warm_up`` replays the most frequent standalone searches from
+the query log (``services/query_log.py``) through the chat pipeline, filling
+the query-embedding, candidate and answer caches, and stops when its time
+budget runs out.
+
+Gunicorn workers run it in a background thread as they start (the
+``post_worker_init`` hook in ``gunicorn.conf.py``), so they serve traffic
+while warming.  To see what would be replayed, or how long it takes::
+
+    flask --app main warm-cache --list
+    flask --app main warm-cache --top 100 --budget 60 --no-generate
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import click
+from flask import g
+
+from services.admission import Priority
+from services.answers import detect_intent
+from services.domains import DOMAINS
+from services.query_log import top_queries
+from services.resilience import Deadline
+from services.telemetry import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+WARMED = REGISTRY.counter(
+    "trendwave_warmup_queries_total",
+    "Query-log queries replayed at startup, by outcome.",
+    labels=("outcome",),
+)
+
+
+def _replay(app, domain, query: str, budget: Deadline, generate: bool) -> str:
+    # Late import: routes.chat imports the app's extensions
+    from routes.chat import answer_key, build_prompt, cached_answer, vector_search
+
+    if budget.expired():
+        return "skipped"
+    with app.test_request_context("/api/chat", method="POST"):
+        g.deadline = Deadline(min(budget.remaining(), app.config["REQUEST_DEADLINE_S"]))
+        candidates = vector_search(query, None, domain)
+        if not candidates:
+            # Search failed or timed out; do not cache a "nothing found" answer
+            return "failed"
+        if generate and not budget.expired():
+            # Same prompt and key as chat_api builds for this message
+            intent = detect_intent(query) if domain.intents else None
+            # Background priority: real users get the Gemini quota first
+            cached_answer(build_prompt(query, candidates, intent, domain),
+                          answer_key(domain, query, intent, candidates), g.deadline,
+                          priority=Priority.BACKGROUND)
+    return "warmed"
+
+
+def warm_up(app, queries: List[Tuple[str, str, int]], budget_s: float,
+            generate: bool = True, concurrency: int = 4) -> Dict[str, int]:
+    """Replay ``queries`` (``(domain, query, count)``) within ``budget_s`` seconds."""
+    budget = Deadline(budget_s)
+    started = time.perf_counter()
+    outcomes = {"warmed": 0, "skipped": 0, "failed": 0}
+
+    def run(item):
+        domain_key, query, _count = item
+        if domain_key not in DOMAINS:
+            return "skipped"
+        try:
+            return _replay(app, DOMAINS[domain_key], query, budget, generate)
+        except Exception as exc:
+            logger.warning("Warm-up query %r failed: %s", query, exc)
+            return "failed"
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="warmup") as pool:
+        for outcome in pool.map(run, queries):
+            outcomes[outcome] += 1
+            WARMED.inc(outcome=outcome)
+    logger.info("Cache warm-up: %d warmed, %d skipped, %d failed in %.1fs",
+                outcomes["warmed"], outcomes["skipped"], outcomes["failed"],
+                time.perf_counter() - started)
+    return outcomes
+
+
+def start_warm_up(app):
+    """Warm ``app``'s caches from the query log in a daemon thread (if configured)."""
+    path, top = app.config.get("QUERY_LOG_PATH"), app.config["WARMUP_QUERIES"]
+    if not path or top <= 0:
+        return None
+    try:
+        queries = top_queries(path, top)
+    except OSError as exc:
+        logger.warning("Skipping cache warm-up, cannot read %s: %s", path, exc)
+        return None
+    if not queries:
+        return None
+    thread = threading.Thread(
+        target=warm_up, name="cache-warmup", daemon=True,
+        args=(app, queries, app.config["WARMUP_BUDGET_S"]),
+        kwargs={"generate": app.config["WARMUP_GENERATE"],
+                "concurrency": app.config["WARMUP_CONCURRENCY"]},
+    )
+    thread.start()
+    return thread
+
+
+def init_app(app):
+    """Register the ``flask warm-cache`` command."""
+
+    @app.cli.command("warm-cache")
+    @click.option("--top", type=int, default=None, help="queries to replay (default WARMUP_QUERIES)")
+    @click.option("--budget", type=float, default=None, help="seconds (default WARMUP_BUDGET_S)")
+    @click.option("--no-generate", is_flag=True, help="only warm embeddings and candidates")
+    @click.option("--list", "list_only", is_flag=True, help="print the queries and exit")
+    def warm_cache(top, budget, no_generate, list_only):
+        """Replay the most frequent logged queries through the chat pipeline."""
+        path = app.config.get("QUERY_LOG_PATH")
+        if not path:
+            raise click.UsageError("QUERY_LOG_PATH is not set")
+        queries = top_queries(path, top or app.config["WARMUP_QUERIES"])
+        if list_only:
+            for domain, query, count in queries:
+                click.echo(f"{count:6d}  {domain:12s}  {query}")
+            return
+        outcomes = warm_up(app, queries, budget or app.config["WARMUP_BUDGET_S"],
+                           generate=app.config["WARMUP_GENERATE"] and not no_generate,
+                           concurrency=app.config["WARMUP_CONCURRENCY"])
+        click.echo(", ".join(f"{k}: {v}" for k, v in outcomes.items()))
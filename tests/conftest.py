@@ -0,0 +1,19 @@
+import argparse
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def chat_app():
+    """The Flask app wired to the in-memory fakes from ``benchmarks.fakes``."""
+    from benchmarks.chat_load import build_app
+
+    app, genai_client, _ = build_app(argparse.Namespace(
+        firestore_emulator=False, embed_ms=0, generate_ms=0, jitter=0, dim=64, seed=1,
+        restaurants=200, firestore_ms=0))
+    app.config["FAST_ANSWERS"] = "on"
+    return app, genai_client
@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+from services.admission import AdaptiveLimiter, Overloaded, Priority
+
+
+class QuotaError(Exception):
+    status_code = 429
+
+
+def _limiter(name, **kwargs):
+    return AdaptiveLimiter(f"test_{name}", **kwargs)
+
+
+def _succeed(limiter, n, latency=0.01, op="call"):
+    for _ in range(n):
+        limiter.acquire()
+        limiter.release(op, latency)
+
+
+def test_additive_increase_on_success():
+    limiter = _limiter("increase", initial=4, max_limit=64)
+    _succeed(limiter, 4)
+    # +1/limit per healthy call: about one slot per limit's worth of calls
+    assert limiter.limit == 4 and limiter._limit == pytest.approx(4.94, abs=0.02)
+    _succeed(limiter, 1)
+    assert limiter.limit == 5
+
+
+def test_multiplicative_decrease_on_rate_limit():
+    limiter = _limiter("quota", initial=10, backoff=0.5)
+    limiter.acquire()
+    limiter.finish("call", time.perf_counter() - 1.0, QuotaError())
+    assert limiter.limit == 5
+    # A second 429 within the same latency window does not cut again
+    limiter.acquire()
+    limiter.finish("call", time.perf_counter() - 1.0, QuotaError())
+    assert limiter.limit == 5
+
+
+def test_multiplicative_decrease_on_latency_drift():
+    limiter = _limiter("latency", initial=20, backoff=0.5)
+    _succeed(limiter, AdaptiveLimiter.WARMUP_SAMPLES, latency=0.001, op="generate")
+    grown = limiter._limit
+    # One slow call is not congestion ...
+    _succeed(limiter, 1, latency=0.004, op="generate")
+    assert limiter._limit > grown
+    # ... a sustained rise of the smoothed latency is
+    _succeed(limiter, 10, latency=0.05, op="generate")
+    assert limiter._limit < grown * 0.6
+    # Other operations keep their own baseline
+    assert set(limiter._latency) == {"generate"}
+
+
+def test_limit_stays_within_bounds():
+    limiter = _limiter("bounds", initial=3, min_limit=2, max_limit=4)
+    _succeed(limiter, 100)
+    assert limiter.limit == 4
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release("call", 0.0, rate_limited=True)
+    assert limiter.limit == 2
+    assert _limiter("clamped", initial=100, max_limit=8).limit == 8
+
+
+def test_waiters_admitted_in_priority_order():
+    limiter = _limiter("priority", initial=1, max_limit=1,
+                       max_wait={Priority.EMBED: 2, Priority.INTERACTIVE: 2})
+    limiter.acquire()
+    admitted = []
+
+    def wait_for_slot(priority):
+        limiter.acquire(priority)
+        admitted.append(priority)
+        limiter.release("call", 0.0)
+
+    threads = []
+    for priority in (Priority.BACKGROUND, Priority.INTERACTIVE, Priority.EMBED):
+        t = threading.Thread(target=wait_for_slot, args=(priority,))
+        t.start()
+        threads.append(t)
+        while len(limiter._waiters) < len(threads):
+            time.sleep(0.001)
+    limiter.release("call", 0.0)
+    for t in threads:
+        t.join(2)
+    assert admitted == [Priority.EMBED, Priority.INTERACTIVE, Priority.BACKGROUND]
+
+
+def test_background_share_and_shedding():
+    limiter = _limiter("shed", initial=4, max_limit=4,
+                       max_wait={Priority.BACKGROUND: 0, Priority.INTERACTIVE: 0.02})
+    limiter.acquire(Priority.BACKGROUND)
+    limiter.acquire(Priority.BACKGROUND)
+    # Background work may only use half the slots ...
+    with pytest.raises(Overloaded):
+        limiter.acquire(Priority.BACKGROUND)
+    # ... the rest stay free for interactive calls, which are shed once they would wait too long
+    limiter.acquire(Priority.INTERACTIVE)
+    limiter.acquire(Priority.INTERACTIVE)
+    started = time.monotonic()
+    with pytest.raises(Overloaded) as info:
+        limiter.acquire(Priority.INTERACTIVE)
+    assert time.monotonic() - started >= 0.02
+    assert info.value.retry_after >= 1.0
+    assert limiter._waiters == []
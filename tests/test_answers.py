@@ -0,0 +1,94 @@
+import pytest
+
+from services.answers import detect_intent, is_follow_up, render_answer
+
+CANDIDATES = [
+    {"_id": 1, "name": "Joe's Shanghai", "borough": "Manhattan", "priceRange": 2, "stars": 4.5,
+     "address": {"building": "46", "street": "Bowery", "zipcode": "10013"}},
+    {"_id": 2, "name": "Lucali", "borough": "Brooklyn", "priceRange": 3, "stars": 4.8,
+     "address": {"building": "575", "street": "Henry St", "zipcode": "11231"}},
+]
+
+
+@pytest.mark.parametrize("message, intent", [
+    ("What is the address?", "address"),
+    ("which one is cheaper", "price"),
+    ("how expensive is it?", "price"),
+    ("any good reviews?", "rating"),
+    ("do they have a TV", "tv"),
+    ("is it good for kids?", "family"),
+    ("romantic italian dinner", None),
+])
+def test_detect_intent(message, intent):
+    assert detect_intent(message) == intent
+
+
+@pytest.mark.parametrize("message", [
+    "what are their prices?",
+    "how expensive is it?",
+    "is it good for kids?",
+    "what's the address of Lucali",
+    "the rating for joe's shanghai please",
+])
+def test_follow_ups_reuse_candidates(message):
+    assert is_follow_up(message, detect_intent(message), CANDIDATES)
+
+
+@pytest.mark.parametrize("message", [
+    "cheap pizza in Brooklyn",
+    "family friendly burgers in Queens",
+    "best rated sushi",
+    "romantic italian dinner",
+])
+def test_new_searches_are_not_follow_ups(message):
+    assert not is_follow_up(message, detect_intent(message), CANDIDATES)
+
+
+def test_follow_up_needs_earlier_candidates():
+    assert not is_follow_up("what are their prices?", "price", None)
+    assert not is_follow_up("what are their prices?", "price", [])
+
+
+def test_render_answer_for_named_restaurant():
+    answer = render_answer("what's the address of Lucali", CANDIDATES)
+    assert answer == "Here is the address:\n- Lucali: 575 Henry St, Brooklyn, 11231"
+
+
+def test_render_answer_covers_all_candidates():
+    answer = render_answer("how expensive are they?", CANDIDATES)
+    assert answer == "Here are the price ranges:\n- Joe's Shanghai: $$\n- Lucali: $$$"
+
+
+def test_render_answer_without_data():
+    assert render_answer("what is the rating?", [{"name": "Nowhere"}]) == \
+        "Here is the star rating:\n- Nowhere: no rating available"
+    assert "TVs" in render_answer("do they have a tv?", CANDIDATES)
+
+
+def test_render_answer_leaves_open_questions_to_the_model():
+    assert render_answer("is it good for kids?", CANDIDATES) is None   # family: not templated
+    assert render_answer("tell me more", CANDIDATES) is None
+    assert render_answer("what is the address?", []) is None
+
+
+def _chat(client, message):
+    resp = client.post("/api/chat", json={"message": message})
+    assert resp.status_code == 200, resp.get_json()
+    return resp.get_json()["response"]
+
+
+def test_chat_routes_new_search_with_intent_keyword_to_vector_search(chat_app):
+    from flask_login import FlaskLoginClient
+    from models.user import User
+
+    app, genai_client = chat_app
+    app.test_client_class = FlaskLoginClient
+    client = app.test_client(user=User.create("routing@example.com", "routing-password"))
+
+    _chat(client, "romantic italian dinner")
+    embeds = genai_client.embed_calls
+    assert _chat(client, "what are their prices?").startswith("Here are the price ranges:")
+    assert genai_client.embed_calls == embeds   # answered from the cached candidates
+
+    _chat(client, "cheap pizza in Brooklyn")
+    assert genai_client.embed_calls == embeds + 1   # a fresh search
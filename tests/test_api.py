@@ -0,0 +1,54 @@
+import importlib
+import sys
+
+import pytest
+
+
+@pytest.fixture
+def api_client(monkeypatch):
+    """The recommendation API under DEBUG, backed by the in-memory fakes."""
+    from fastapi.testclient import TestClient
+
+    from benchmarks.fakes import FakeAsyncCollection, FakeCollection, FakeGenAIClient, synthetic_restaurants
+    from config import settings
+
+    monkeypatch.setattr(settings, "DEBUG", True)
+    monkeypatch.setenv("EMBED_DIM", "64")
+    sys.modules.pop("api", None)
+    api = importlib.import_module("api")
+
+    collection = FakeAsyncCollection(FakeCollection(synthetic_restaurants(50, dim=64, seed=3)))
+    genai_client = FakeGenAIClient(embed_ms=0, generate_ms=0, jitter=0, dim=64)
+    store_cls = api.AsyncVectorStore
+    monkeypatch.setattr(api, "AsyncVectorStore",
+                        lambda: store_cls(collection=collection, genai_client=genai_client))
+    with TestClient(api.app) as client:
+        yield client, genai_client
+    sys.modules.pop("api", None)
+
+
+def test_api_refuses_default_credentials_without_debug(monkeypatch):
+    from config import settings
+
+    monkeypatch.setattr(settings, "DEBUG", False)
+    monkeypatch.setattr(settings, "API_PASSWORD", "admin")
+    sys.modules.pop("api", None)
+    with pytest.raises(RuntimeError, match="API_PASSWORD"):
+        importlib.import_module("api")
+    sys.modules.pop("api", None)
+
+
+def test_recommend_round_trip(api_client):
+    client, genai_client = api_client
+    assert client.get("/healthz").json()["status"] == "ok"
+    assert client.get("/api/recommend", params={"query": "pizza"}).status_code == 401
+    assert client.post("/token", data={"username": "admin", "password": "wrong"}).status_code == 401
+
+    token = client.post("/token", data={"username": "admin", "password": "admin"}).json()["access_token"]
+    response = client.get("/api/recommend", params={"query": "cheap pizza", "limit": 2},
+                          headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["results"]) == 2
+    assert body["recommendation"]
+    assert genai_client.embed_calls == 1 and genai_client.generate_calls == 1
@@ -0,0 +1,56 @@
+import threading
+import time
+
+from services.cache import LRUCache, Refreshing
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert [k for k, _ in cache.items()] == ["a", "c"]
+
+
+def test_refreshing_serves_old_value_while_rebuilding():
+    started, release = threading.Event(), threading.Event()
+    builds = []
+
+    def build():
+        builds.append(len(builds))
+        if len(builds) > 1:
+            started.set()
+            release.wait(5)
+        return len(builds)
+
+    value = Refreshing(build, ttl=0.01)
+    assert value.get() == 1
+    time.sleep(0.02)
+    t0 = time.perf_counter()
+    assert value.get() == 1              # stale: rebuild starts in the background
+    assert started.wait(5)
+    assert value.get() == 1              # still the old index, no second rebuild
+    assert time.perf_counter() - t0 < 1
+    value.ttl = 60
+    release.set()
+    for _ in range(100):
+        if value.value == 2:
+            break
+        time.sleep(0.01)
+    assert value.get() == 2
+    assert len(builds) == 2
+
+
+def test_refreshing_backs_off_after_a_failure():
+    calls = []
+
+    def build():
+        calls.append(1)
+        raise RuntimeError("mongo down")
+
+    value = Refreshing(build, ttl=60, retry_after=60)
+    assert value.get() is None
+    assert value.get() is None
+    assert len(calls) == 1
@@ -0,0 +1,43 @@
+from services.domains import DEFAULT_DOMAIN
+
+
+def test_answer_key_separates_nearby_searches_by_distance(chat_app):
+    from routes.chat import answer_key
+
+    app, _ = chat_app
+    plain = [{"_id": 1}, {"_id": 2}]
+    near = [{"_id": 1, "distance_km": 0.42}, {"_id": 2, "distance_km": 1.27}]
+    far = [{"_id": 1, "distance_km": 3.9}, {"_id": 2, "distance_km": 5.01}]
+    with app.app_context():
+        key = answer_key(DEFAULT_DOMAIN, "pizza near me", None, near, nearby=True)
+        assert key == answer_key(DEFAULT_DOMAIN, "Pizza  near me", None,
+                                 [{"_id": 1, "distance_km": 0.44}, {"_id": 2, "distance_km": 1.3}],
+                                 nearby=True)
+        assert key != answer_key(DEFAULT_DOMAIN, "pizza near me", None, far, nearby=True)
+        assert key != answer_key(DEFAULT_DOMAIN, "pizza near me", None, plain)
+        assert answer_key(DEFAULT_DOMAIN, "pizza", None, plain) != \
+            answer_key(DEFAULT_DOMAIN, "pizza", None, plain, nearby=True)
+
+
+def test_chat_uses_client_location_only_for_near_me(chat_app, monkeypatch):
+    import routes.chat
+    from flask_login import FlaskLoginClient
+    from models.user import User
+
+    app, _ = chat_app
+    searched = []
+    search = routes.chat.vector_search
+
+    def spy(query, location=None, domain=DEFAULT_DOMAIN):
+        searched.append((query, location))
+        return search(query, location, domain)
+
+    monkeypatch.setattr(routes.chat, "vector_search", spy)
+    app.test_client_class = FlaskLoginClient
+    client = app.test_client(user=User.create("nearby@example.com", "nearby-password"))
+    where = {"lat": 40.7359, "lng": -73.9911}
+    for message in ("pizza near me", "pizza near Union Square"):
+        resp = client.post("/api/chat", json={"message": message, "location": where})
+        assert resp.status_code == 200, resp.get_json()
+
+    assert searched == [("pizza near me", (40.7359, -73.9911)), ("pizza near Union Square", None)]
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services.coalesce import COALESCE_CALLS, SingleFlight
+
+
+def _start_followers(flight, key, fn, count):
+    """Start ``count`` threads calling ``flight.do`` and wait until all have joined the leader."""
+    outcomes = []
+
+    def follow():
+        try:
+            outcomes.append(("result", flight.do(key, fn, timeout=2)))
+        except Exception as exc:
+            outcomes.append(("error", exc))
+
+    threads = [threading.Thread(target=follow) for _ in range(count)]
+    for t in threads:
+        t.start()
+    deadline = time.monotonic() + 2
+    while COALESCE_CALLS.value(group=flight.name, outcome="coalesced") < count:
+        assert time.monotonic() < deadline, "followers did not join the in-flight call"
+        time.sleep(0.001)
+    return threads, outcomes
+
+
+def test_followers_get_the_leaders_result():
+    flight = SingleFlight("test_result")
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(2)
+        return {"answer": 42}
+
+    leader = []
+    leader_thread = threading.Thread(target=lambda: leader.append(flight.do("k", compute)))
+    leader_thread.start()
+    while flight.in_flight() == 0:
+        time.sleep(0.001)
+    threads, outcomes = _start_followers(flight, "k", compute, 3)
+    release.set()
+    for t in threads + [leader_thread]:
+        t.join(2)
+
+    assert calls == [1]
+    assert leader == [{"answer": 42}]
+    assert outcomes == [("result", {"answer": 42})] * 3
+    assert all(value is leader[0] for _, value in outcomes)
+
+
+def test_followers_see_the_leaders_exception_and_the_key_is_released():
+    flight = SingleFlight("test_error")
+    release = threading.Event()
+    calls = []
+
+    def fail():
+        calls.append(1)
+        release.wait(2)
+        raise ConnectionError("upstream down")
+
+    leader_errors = []
+
+    def lead():
+        try:
+            flight.do("k", fail)
+        except ConnectionError as exc:
+            leader_errors.append(exc)
+
+    leader_thread = threading.Thread(target=lead)
+    leader_thread.start()
+    while flight.in_flight() == 0:
+        time.sleep(0.001)
+    threads, outcomes = _start_followers(flight, "k", fail, 2)
+    release.set()
+    for t in threads + [leader_thread]:
+        t.join(2)
+
+    assert len(leader_errors) == 1
+    assert outcomes == [("error", leader_errors[0])] * 2
+    assert calls == [1]
+
+    # Nothing is remembered after the failure: the next call runs again
+    assert flight.in_flight() == 0
+    assert flight.do("k", lambda: "recovered") == "recovered"
+
+
+def test_follower_timeout():
+    flight = SingleFlight("test_timeout")
+    release = threading.Event()
+    leader_thread = threading.Thread(target=flight.do, args=("k", lambda: release.wait(2)))
+    leader_thread.start()
+    while flight.in_flight() == 0:
+        time.sleep(0.001)
+    try:
+        with pytest.raises(TimeoutError):
+            flight.do("k", lambda: "never", timeout=0.01)
+    finally:
+        release.set()
+        leader_thread.join(2)
+
+
+def test_do_async_shares_one_task_and_retries_after_failure():
+    flight = SingleFlight("test_async")
+    calls = []
+
+    async def compute(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        if value == "bad":
+            raise ValueError(value)
+        return value
+
+    async def run():
+        results = await asyncio.gather(*(flight.do_async("k", compute, "good") for _ in range(3)))
+        errors = await asyncio.gather(*(flight.do_async("e", compute, "bad") for _ in range(2)),
+                                      return_exceptions=True)
+        retry = await flight.do_async("e", compute, "good")
+        return results, errors, retry
+
+    results, errors, retry = asyncio.run(run())
+    assert results == ["good"] * 3
+    assert all(isinstance(e, ValueError) for e in errors) and len(errors) == 2
+    assert retry == "good"
+    assert calls == ["good", "bad", "good"]
@@ -0,0 +1,41 @@
+from benchmarks.fakes import FakeCollection, synthetic_restaurants
+from services.domains import DEFAULT_DOMAIN, Domain, PartitionManager
+
+
+def _manager(budget_bytes):
+    collection = FakeCollection(synthetic_restaurants(300, dim=8, seed=1))
+    return PartitionManager(lambda domain: collection, budget_bytes)
+
+
+def test_partition_size_is_measured_when_indexes_build():
+    manager = _manager(budget_bytes=2 ** 30)
+    partition = manager.get(DEFAULT_DOMAIN)
+    assert partition.nbytes == 0 and manager.nbytes == 0
+    names, geo = partition.names.get(), partition.geo.get()
+    assert partition.nbytes == names.nbytes + geo.nbytes
+    assert manager.nbytes == partition.nbytes
+
+
+def test_least_recently_used_partition_is_evicted_over_budget():
+    chains = [Domain(f"chain{i}", f"Chain {i}", "db", f"chain{i}", name_lookup=True) for i in range(2)]
+    manager = _manager(budget_bytes=0)
+    first = manager.get(chains[0])
+    first.names.get()
+    assert manager.loaded() == ["chain0"]   # the partition in use is kept
+    manager.get(chains[1]).names.get()
+    assert manager.loaded() == ["chain1"]
+    assert manager.nbytes == manager.get(chains[1]).nbytes
+
+    manager.get(DEFAULT_DOMAIN).names.get()
+    assert DEFAULT_DOMAIN.key in manager.loaded()
+
+
+def test_embed_text_matches_the_stored_catalog_vectors():
+    from services.domains import get_domain
+    from services.embeddings import restaurant_embed_text
+
+    restaurant = {"name": "Lucky Oven", "cuisine": "Pizza", "address": {"street": "Court Street"},
+                  "borough": "Brooklyn"}
+    assert DEFAULT_DOMAIN.embed_text(restaurant) == restaurant_embed_text(restaurant)
+    article = {"title": "Chips", "summary": "New  accelerators", "tags": None}
+    assert get_domain("AI").embed_text(article) == "Chips New accelerators"
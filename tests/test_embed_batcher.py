@@ -0,0 +1,65 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services.embed_batcher import EmbedBatcher
+
+
+class RecordingEmbed:
+    """Embeds ``"n"`` as ``[n, -n]``; fails batches that contain ``"fail"``."""
+
+    def __init__(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self.lock:
+            self.batches.append(list(texts))
+        if "fail" in texts:
+            raise ConnectionError("embed quota exceeded")
+        return [[float(t), -float(t)] for t in texts]
+
+
+def test_results_map_back_to_their_callers():
+    embed = RecordingEmbed()
+    batcher = EmbedBatcher(embed, window_ms=50, max_batch=8, name="test_mapping")
+    texts = [str(i) for i in range(40)]
+    with ThreadPoolExecutor(max_workers=40) as pool:
+        vectors = list(pool.map(lambda t: batcher.embed(t, timeout=2), texts))
+
+    assert vectors == [[float(t), -float(t)] for t in texts]
+    assert sorted(t for batch in embed.batches for t in batch) == sorted(texts)
+    assert len(embed.batches) < len(texts)                 # calls were actually batched
+    assert max(len(batch) for batch in embed.batches) <= 8
+
+
+def test_failed_batch_fails_every_caller_without_hanging():
+    embed = RecordingEmbed()
+    batcher = EmbedBatcher(embed, window_ms=200, max_batch=4, name="test_failure")
+    futures = [batcher.submit(t) for t in ("1", "fail", "3", "4")]
+
+    for fut in futures:
+        with pytest.raises(ConnectionError):
+            fut.result(timeout=2)
+    assert embed.batches == [["1", "fail", "3", "4"]]
+    # The worker thread survived and keeps serving
+    assert batcher.embed("5", timeout=2) == [5.0, -5.0]
+
+
+def test_short_response_fails_the_batch():
+    batcher = EmbedBatcher(lambda texts: [[1.0]], window_ms=200, max_batch=2, name="test_short")
+    futures = [batcher.submit("a"), batcher.submit("b")]
+    for fut in futures:
+        with pytest.raises(RuntimeError, match="1 vectors for 2 texts"):
+            fut.result(timeout=2)
+
+
+def test_zero_window_embeds_inline():
+    embed = RecordingEmbed()
+    batcher = EmbedBatcher(embed, window_ms=0, name="test_inline")
+    assert batcher.embed("7") == [7.0, -7.0]
+    with pytest.raises(ConnectionError):
+        batcher.embed("fail")
+    assert embed.batches == [["7"], ["fail"]]
+    assert batcher._thread is None
@@ -0,0 +1,18 @@
+import numpy as np
+
+from benchmarks.fakes import FakeCollection
+from services.embeddings import DIM_FIELD, check_catalog_dim, truncate_normalize
+
+
+def test_truncate_normalize_keeps_a_unit_prefix():
+    vec = truncate_normalize([3.0, 4.0, 12.0], 2)
+    assert np.allclose(vec, [0.6, 0.8])
+    assert truncate_normalize([3.0, 4.0], None) == [3.0, 4.0]
+
+
+def test_check_catalog_dim(caplog):
+    docs = [{"_id": 1, "embedding": [0.0] * 4, DIM_FIELD: 4}, {"_id": 2, "embedding": [0.0] * 4}]
+    assert check_catalog_dim(FakeCollection(docs), 4)
+    mixed = docs + [{"_id": 3, "embedding": [0.0] * 8, DIM_FIELD: 8}]
+    assert not check_catalog_dim(FakeCollection(mixed), 4, "Domain Restaurants")
+    assert "Domain Restaurants has 8-d embeddings" in caplog.text
@@ -0,0 +1,29 @@
+import pytest
+
+from services.geo import is_nearby_query, parse_location
+
+
+@pytest.mark.parametrize("message", [
+    "pizza near me", "closest sushi place", "anything close by?", "a cafe closeby",
+    "tacos close to me", "bars close to here", "brunch around here", "dinner in my area",
+    "nearest ramen to me", "anything within walking distance?",
+])
+def test_nearby_queries(message):
+    assert is_nearby_query(message)
+
+
+@pytest.mark.parametrize("message", [
+    "when does it close?", "what time do they close", "closed on mondays?",
+    "close friends dinner spot", "romantic italian dinner", "",
+    # Near somewhere else: the user's own position does not apply
+    "pizza near Union Square", "closest bar to Times Square", "brunch close to the park",
+    "sushi within walking distance of Grand Central",
+])
+def test_not_nearby_queries(message):
+    assert not is_nearby_query(message)
+
+
+def test_parse_location():
+    assert parse_location({"lat": 40.7, "lng": -74.0}) == (40.7, -74.0)
+    assert parse_location({"lat": 95, "lng": 0}) is None
+    assert parse_location("40.7,-74.0") is None
@@ -0,0 +1,30 @@
+import numpy as np
+
+from services.rerank import redundancy_matrix, rerank
+
+
+def _restaurants():
+    return [
+        {"name": "Plain Pizza", "cuisine": "Pizza", "stars": 2.0, "score": 0.80, "embedding": [1.0, 0.0]},
+        {"name": "Garden Patio", "cuisine": "Italian", "stars": 5.0, "OutdoorSeating": True,
+         "score": 0.78, "embedding": [0.0, 1.0]},
+    ]
+
+
+def test_star_and_attribute_boosts_reorder_restaurants():
+    picks = rerank("italian with outdoor seating", _restaurants(), k=2, diversity=0.0)
+    assert [p["name"] for p in picks] == ["Garden Patio", "Plain Pizza"]
+
+
+def test_without_boosts_similarity_decides():
+    picks = rerank("italian with outdoor seating", _restaurants(), k=2, diversity=0.0, boosts=False)
+    assert [p["name"] for p in picks] == ["Plain Pizza", "Garden Patio"]
+    assert picks[0]["score"] == 0.80
+    assert all("embedding" not in p for p in picks)
+
+
+def test_unnamed_candidates_are_compared_by_embedding_only():
+    articles = [{"title": "A", "embedding": [1.0, 0.0]}, {"title": "B", "embedding": [0.0, 1.0]}]
+    assert np.allclose(redundancy_matrix(articles), np.eye(2))
+    chain = [{"name": "Joe's Pizza", "embedding": [1.0, 0.0]}, {"name": "joes pizza", "embedding": [0.0, 1.0]}]
+    assert np.allclose(redundancy_matrix(chain), np.ones((2, 2)))
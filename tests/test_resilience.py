@@ -0,0 +1,176 @@
+import threading
+import time
+
+import pytest
+
+from services.resilience import CircuitBreaker, CircuitOpen, DeadlineExceeded, hedged, run_with_timeout
+
+
+def _blocked(release: threading.Event, value="primary"):
+    def attempt():
+        release.wait(5)
+        return value
+    return attempt
+
+
+# -----------------------------------------------------------------------------
+#  hedged
+# -----------------------------------------------------------------------------
+
+def test_hedged_backup_wins_when_primary_is_slow():
+    release = threading.Event()
+    threads = []
+
+    def backup():
+        threads.append(threading.current_thread().name)
+        return "backup"
+
+    try:
+        assert hedged([_blocked(release), backup], timeout=2, op="test_backup_wins",
+                      default_delay=0.01, min_delay=0.01) == "backup"
+    finally:
+        release.set()
+    # Attempts do not share threads with the upstream pool
+    assert threads[0].startswith("hedge")
+
+
+def test_hedged_primary_failure_fires_backup_immediately():
+    def primary():
+        raise ConnectionError("reset")
+
+    started = time.monotonic()
+    assert hedged([primary, lambda: "backup"], timeout=2, op="test_primary_fails",
+                  default_delay=1.0, min_delay=1.0) == "backup"
+    assert time.monotonic() - started < 0.5   # did not wait out the hedge delay
+
+
+def test_hedged_raises_last_error_when_every_attempt_fails():
+    def fail(message):
+        def attempt():
+            raise ConnectionError(message)
+        return attempt
+
+    with pytest.raises(ConnectionError, match="second"):
+        hedged([fail("first"), fail("second")], timeout=2, op="test_all_fail", default_delay=0.01)
+
+
+def test_hedged_deadline():
+    release = threading.Event()
+    try:
+        with pytest.raises(DeadlineExceeded):
+            hedged([_blocked(release), _blocked(release)], timeout=0.1, op="test_deadline",
+                   default_delay=0.01, min_delay=0.01)
+    finally:
+        release.set()
+
+    calls = []
+    with pytest.raises(DeadlineExceeded):
+        hedged([lambda: calls.append(1)], timeout=0, op="test_deadline")
+    assert calls == []
+
+
+# -----------------------------------------------------------------------------
+#  CircuitBreaker
+# -----------------------------------------------------------------------------
+
+def _fail():
+    raise ConnectionError("down")
+
+
+def test_circuit_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker("test_transitions", failure_threshold=2, reset_timeout=0.05)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(_fail)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen):
+        breaker.call(lambda: "ok")
+
+    time.sleep(0.06)
+    assert breaker.state == "half-open"
+    assert breaker.allow()          # the single probe
+    assert not breaker.allow()      # everyone else still fails fast
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.call(lambda: "ok") == "ok"
+
+
+def test_circuit_breaker_failed_probe_reopens():
+    breaker = CircuitBreaker("test_probe", failure_threshold=1, reset_timeout=0.05)
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+    time.sleep(0.06)
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+    assert breaker.state == "open"
+
+
+def test_circuit_breaker_ignores_listed_exceptions():
+    class Shed(Exception):
+        pass
+
+    def shed():
+        raise Shed()
+
+    breaker = CircuitBreaker("test_ignore", failure_threshold=1, reset_timeout=0.05, ignore=(Shed,))
+    for _ in range(3):
+        with pytest.raises(Shed):
+            breaker.call(shed)
+    assert breaker.state == "closed"
+
+    # An ignored exception during the probe frees it for the next caller
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+    time.sleep(0.06)
+    with pytest.raises(Shed):
+        breaker.call(shed)
+    assert breaker.state == "half-open"
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+
+
+# -----------------------------------------------------------------------------
+#  run_with_timeout
+# -----------------------------------------------------------------------------
+
+def _recorder():
+    calls = []
+    finished = threading.Event()
+
+    def on_done(exc):
+        calls.append(exc)
+        finished.set()
+    return calls, finished, on_done
+
+
+def test_run_with_timeout_on_done_after_success_and_failure():
+    calls, finished, on_done = _recorder()
+    assert run_with_timeout(lambda: 42, 1, on_done=on_done) == 42
+    finished.wait(1)
+    assert calls == [None]
+
+    calls, finished, on_done = _recorder()
+    with pytest.raises(ConnectionError):
+        run_with_timeout(_fail, 1, on_done=on_done)
+    finished.wait(1)
+    assert len(calls) == 1 and isinstance(calls[0], ConnectionError)
+
+
+def test_run_with_timeout_on_done_once_after_giving_up():
+    release = threading.Event()
+    calls, finished, on_done = _recorder()
+    with pytest.raises(DeadlineExceeded):
+        run_with_timeout(_blocked(release), 0.05, op="test_timeout", on_done=on_done)
+    assert calls == []              # the call is still running
+    release.set()
+    assert finished.wait(1)
+    time.sleep(0.05)
+    assert calls == [None]
+
+
+def test_run_with_timeout_on_done_once_without_budget():
+    ran = []
+    calls, _, on_done = _recorder()
+    with pytest.raises(DeadlineExceeded):
+        run_with_timeout(lambda: ran.append(1), 0, on_done=on_done)
+    assert calls == [None] and ran == []
@@ -0,0 +1,56 @@
+from datetime import datetime
+
+from benchmarks.fakes import FakeFirestore
+from benchmarks.retention_bench import seed_sessions
+from services.retention import ARCHIVES, DOCS, DRY_RUN_DOCS, SESSIONS, compact_sessions
+
+
+def _ids(db, collection):
+    return {snap.id for snap in db.collection(collection).stream()}
+
+
+def test_compaction_archives_and_deletes_idle_sessions():
+    db = FakeFirestore()
+    stale = seed_sessions(db, 40, stale=0.5, older_than_days=30, seed=3)
+    stats = compact_sessions(db, older_than_days=30, batch_size=7)
+    assert stats["deleted"] == stats["archived"] == len(stale)
+    assert not _ids(db, SESSIONS) & set(stale)
+    assert len(_ids(db, ARCHIVES)) == len(stale)
+
+
+def test_a_batch_of_changed_sessions_does_not_end_the_run():
+    db = FakeFirestore()
+    seed_sessions(db, 10, stale=1.0, older_than_days=30)
+    first = [snap.id for snap in db.collection(SESSIONS).limit(5).stream()]
+    real_batch, batches = db.batch, []
+
+    def batch():
+        b = real_batch()
+        if not batches:
+            real_commit = b.commit
+
+            def commit():
+                # Every session of the first batch gets a message before it commits
+                for uid in first:
+                    db.collection(SESSIONS).document(uid).update({"updated_at": datetime.utcnow()})
+                real_commit()
+            b.commit = commit
+        batches.append(b)
+        return b
+
+    db.batch = batch
+    stats = compact_sessions(db, older_than_days=30, batch_size=5)
+    assert stats["skipped"] == 5
+    assert stats["deleted"] == 5
+    assert _ids(db, SESSIONS) == set(first)
+
+
+def test_dry_run_is_reported_apart_from_real_runs():
+    db = FakeFirestore()
+    stale = seed_sessions(db, 20, stale=0.5, older_than_days=30, seed=5)
+    scanned = DOCS.value(action="scanned")
+    stats = compact_sessions(db, older_than_days=30, dry_run=True)
+    assert stats["matching"] == len(stale)
+    assert DRY_RUN_DOCS.value() == len(stale)
+    assert DOCS.value(action="scanned") == scanned
+    assert len(_ids(db, SESSIONS)) == 20
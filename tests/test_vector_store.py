@@ -0,0 +1,54 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from benchmarks.fakes import FakeAsyncCollection, FakeCollection, FakeGenAIClient, synthetic_restaurants
+
+
+@pytest.fixture
+def store(monkeypatch):
+    from services.vector_store import AsyncVectorStore
+
+    monkeypatch.setenv("EMBED_DIM", "64")
+    collection = FakeCollection(synthetic_restaurants(120, dim=64, seed=5))
+    genai_client = FakeGenAIClient(embed_ms=0, generate_ms=0, jitter=0, dim=64)
+    return AsyncVectorStore(collection=FakeAsyncCollection(collection), genai_client=genai_client)
+
+
+def test_batch_matches_vector_search(store):
+    queries = ["cheap pizza in Brooklyn", "sushi", "vegan brunch", "cheap pizza in brooklyn"]
+
+    async def run():
+        items = [item async for item in store.iter_recommendations_batch(queries, limit=3, generate=False)]
+        single = await store.vector_search("sushi", limit=3)
+        return items, single
+
+    items, single = asyncio.run(run())
+    assert sorted(item["index"] for item in items) == [0, 1, 2, 3]
+    by_index = {item["index"]: item for item in items}
+    assert all(item["success"] and len(item["results"]) == 3 for item in items)
+    assert "recommendation" not in by_index[1]
+    # Exact scoring over the catalog agrees with $vectorSearch
+    assert [r["name"] for r in by_index[1]["results"]] == [r["name"] for r in single]
+    assert [r["score"] for r in by_index[1]["results"]] == pytest.approx([r["score"] for r in single], abs=1e-5)
+    assert by_index[0]["results"] == by_index[3]["results"]
+    # One embed call for the whole batch; the single search reused its cached vector
+    assert store.genai.embed_calls == 1
+
+
+def test_catalog_matrix_is_normalised_and_skips_short_embeddings(store):
+    # One document mid-migration, still on a shorter embedding
+    store.collection.sync.insert_many([{"name": "Half Migrated", "embedding": [1.0] * 32}])
+    index, docs = asyncio.run(store.catalog_index())
+    assert len(index) == len(docs) == 120
+    assert index.matrix.shape == (120, 64) and index.matrix.dtype == np.float32
+    assert np.allclose(np.linalg.norm(index.matrix, axis=1), 1.0, atol=1e-5)
+    assert all("embedding" not in doc for doc in docs)
+
+
+def test_batch_generates_recommendations(store):
+    items = asyncio.run(store.get_recommendations_batch(["pizza", "tacos"], limit=2, concurrency=1))
+    assert [item["index"] for item in items] == [0, 1]
+    assert all(item["recommendation"] for item in items)
+    assert store.genai.generate_calls == 2